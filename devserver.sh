@@ -1,3 +1,6 @@
 #!/bin/sh
 source .venv/bin/activate
-python -u -m flask --app main run --debug
\ No newline at end of file
+# Jobs live in the worker process, so run one worker with many threads (SSE
+# streams hold a thread each); JOB_CONCURRENCY bounds the pipelines running at once.
+exec gunicorn --bind "0.0.0.0:${PORT:-3000}" --workers 1 --worker-class gthread \
+  --threads "${GUNICORN_THREADS:-32}" --timeout 0 --reload main:app
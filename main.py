@@ -1,14 +1,94 @@
+import json
 import os
+import re
+import sys
 
-from flask import Flask
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+sys.path.insert(0, SRC_DIR)
+# The agents read their Vertex AI settings at import time, as under `adk web`.
+load_dotenv(os.path.join(SRC_DIR, "sales_agent", ".env"))
+
+from sales_agent.jobs import JobManager, JobStoreFull  # noqa: E402
+from sales_agent.tracing import to_prometheus, tracer  # noqa: E402
 
 app = Flask(__name__)
+jobs = JobManager()
+
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
 
 @app.route("/")
-def hello_world():
-  """Example Hello World route."""
-  name = os.environ.get("NAME", "World")
-  return f"Hello {name}!"
+def index():
+  """Service status and job counts."""
+  return jsonify({"service": "comarch-sales-agent", **jobs.stats()})
+
+
+@app.get("/metrics")
+def metrics():
+  """Per-agent latency, token and tool-call metrics in Prometheus text format."""
+  return Response(to_prometheus(tracer.snapshot()), mimetype="text/plain; version=0.0.4")
+
+
+@app.post("/jobs")
+def submit_job():
+  """Queues a proposal job and returns its ID immediately (202)."""
+  payload = request.get_json(silent=True) or {}
+  if not isinstance(payload, dict):
+    return jsonify({"error": "The body must be a JSON object"}), 400
+  notes = payload.get("notes") or request.form.get("notes") or ""
+  try:
+    job = jobs.submit(notes, client_id=payload.get("client_id") or "", recompute=payload.get("recompute") or [])
+  except ValueError as e:
+    return jsonify({"error": str(e)}), 400
+  except JobStoreFull as e:
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+  return jsonify(job.to_dict()), 202, {"Location": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs/<job_id>")
+def get_job(job_id):
+  """Returns the job status."""
+  job = jobs.get(job_id)
+  if job is None:
+    return jsonify({"error": "Job not found"}), 404
+  return jsonify(job.to_dict())
+
+
+@app.get("/jobs/<job_id>/events")
+def job_events(job_id):
+  """Streams per-phase progress as Server-Sent Events until the job finishes."""
+  if jobs.get(job_id) is None:
+    return jsonify({"error": "Job not found"}), 404
+  after = request.headers.get("Last-Event-ID") or request.args.get("after") or "0"
+  if not after.strip().isdecimal():
+    return jsonify({"error": "Last-Event-ID and 'after' must be non-negative integers"}), 400
+  after = int(after)
+
+  def stream():
+    for index, record in jobs.stream(job_id, after=after):
+      if record is None:
+        yield ": keepalive\n\n"
+      else:
+        yield f"id: {index}\nevent: {record['type']}\ndata: {json.dumps(record)}\n\n"
+    yield "event: end\ndata: {}\n\n"
+
+  return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/jobs/<job_id>/docx")
+def download_docx(job_id):
+  """Downloads the finished proposal."""
+  job = jobs.get(job_id)
+  if job is None:
+    return jsonify({"error": "Job not found"}), 404
+  if job.docx is None:
+    return jsonify({"error": f"Job is {job.status}; no document available", "status": job.status}), 409
+  filename = re.sub(r"[^\w\-]+", "_", job.client_id or "Comarch") + "_Sales_Proposal.docx"
+  return Response(job.docx, mimetype=DOCX_MIMETYPE, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 
 if __name__ == "__main__":
-  app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 3000)))
\ No newline at end of file
+  app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 3000)), threaded=True)
@@ -0,0 +1,11 @@
+"""
+Offline performance benchmarks for the sales agent.
+
+Gemini, Vertex AI Search, Google Search and Imagen are replaced by
+deterministic fakes with configurable latency (see `fakes`), so runs cost no
+quota and are comparable across commits:
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json --threshold 0.15
+    python -m benchmarks imports --check
+"""
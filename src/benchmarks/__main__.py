@@ -0,0 +1,132 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+SCHEMA_VERSION = 1
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run(args) -> int:
+    # The agents build their (unused) genai clients at import time.
+    load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'sales_agent', '.env'))
+    from .fakes import FakeLatency
+    from .imports import import_suite
+    from .suites import artifact_suite, competitor_suite, docx_suite, pipeline_suite, memory_suite, regenerate_suite, resilience_suite, routing_suite, table_suite
+
+    latency = FakeLatency(llm_s=args.llm_latency, search_s=args.search_latency, imagen_s=args.imagen_latency)
+    results = []
+    if args.suite in ('all', 'imports'):
+        results += import_suite(args.repeat)
+    if args.suite in ('all', 'pipeline'):
+        results += pipeline_suite(latency, args.repeat)
+    if args.suite in ('all', 'regenerate'):
+        results += regenerate_suite(latency, args.repeat)
+    if args.suite in ('all', 'docx'):
+        results += docx_suite(args.repeat)
+    if args.suite in ('all', 'tables'):
+        results += table_suite(args.repeat)
+    if args.suite in ('all', 'artifacts'):
+        results += artifact_suite(args.repeat)
+    if args.suite in ('all', 'resilience'):
+        results += resilience_suite(latency, args.repeat)
+    if args.suite in ('all', 'routing'):
+        results += routing_suite(latency, args.repeat)
+    if args.suite in ('all', 'memory'):
+        results += memory_suite(args.repeat)
+    if args.suite in ('all', 'competitors'):
+        results += competitor_suite(args.repeat)
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'git_commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency': vars(latency),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    for result in results:
+        params = ', '.join(f'{k}={v}' for k, v in result['params'].items() if k != 'repeat')
+        print(f"{result['name']:<28} {params:<40} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms", file=sys.stderr)
+    if not args.output:
+        print(text)
+    return 0
+
+
+def imports_report(args) -> int:
+    from .imports import report
+    return report(args)
+
+
+def _key(result: dict) -> str:
+    return result['name'] + json.dumps({k: v for k, v in result['params'].items() if k != 'repeat'}, sort_keys=True)
+
+
+def compare(args) -> int:
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = {_key(r): r for r in json.load(f)['results']}
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    print(f"{'benchmark':<70} {'base p50':>10} {'new p50':>10} {'change':>8}")
+    for result in current:
+        before = baseline.get(_key(result))
+        if not before or not before['p50_ms']:
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1
+        regressed = change > args.threshold
+        regressions += regressed
+        print(f"{_key(result):<70} {before['p50_ms']:>10.2f} {result['p50_ms']:>10.2f} {change:>+7.1%}{'  REGRESSION' if regressed else ''}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Offline sales agent benchmarks.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the benchmarks and write a JSON report.")
+    run_parser.add_argument('--suite', choices=['all', 'imports', 'pipeline', 'regenerate', 'docx', 'tables', 'artifacts', 'resilience', 'routing', 'memory', 'competitors'], default='all')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--output', help="JSON report path (stdout if omitted).")
+    run_parser.add_argument('--llm-latency', type=float, default=0.05, help="Seconds per fake LLM call.")
+    run_parser.add_argument('--search-latency', type=float, default=0.03, help="Seconds per fake search.")
+    run_parser.add_argument('--imagen-latency', type=float, default=0.2, help="Seconds per fake Imagen call.")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help="Compare two reports; exit 1 on regressions.")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15, help="Allowed p50 slowdown (0.15 = 15%%).")
+    compare_parser.set_defaults(handler=compare)
+
+    imports_parser = commands.add_parser('imports', help="Show the cold-start import profile of sales_agent.")
+    imports_parser.add_argument('--module', default='sales_agent')
+    imports_parser.add_argument('--top', type=int, default=30)
+    imports_parser.add_argument('--check', action='store_true', help="Exit 1 if a deferred module is imported eagerly.")
+    imports_parser.set_defaults(handler=imports_report)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""
+Deterministic local stand-ins for Gemini, Vertex AI Search, Google Search and Imagen.
+
+Each fake sleeps for a configurable latency and returns the same output for
+the same input, so benchmark runs differ only in the code under test.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+import asyncio
+import functools
+import hashlib
+import io
+import random
+import re
+import time
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+@dataclass
+class FakeLatency:
+    """Seconds each fake back-end takes per call; optionally a slow tail and transient errors."""
+    llm_s: float = 0.05
+    llm_chunk_s: float = 0.002
+    search_s: float = 0.03
+    imagen_s: float = 0.2
+    tail_rate: float = 0.0  # fraction of calls that take `tail_s` longer
+    tail_s: float = 0.0
+    error_rate: float = 0.0  # fraction of calls that fail with a 503
+
+    def delay(self, seconds: float, rng) -> float:
+        if rng.random() < self.error_rate:
+            raise FakeServerError('503 UNAVAILABLE (injected)')
+        return seconds + (self.tail_s if rng.random() < self.tail_rate else 0.0)
+
+
+class FakeServerError(Exception):
+    """A transient back-end failure injected by FakeLatency.error_rate."""
+    code = 503
+
+
+_rng = random.Random(0)
+
+
+def reseed(seed: int = 0) -> None:
+    """Restarts the tail / error injection sequence, so runs with the same seed see the same faults."""
+    _rng.seed(seed)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _uses_google_search(llm_request) -> bool:
+    tools = (llm_request.config.tools if llm_request.config else None) or []
+    return any(getattr(tool, 'google_search', None) for tool in tools)
+
+
+def _request_text(llm_request) -> str:
+    for content in llm_request.contents:
+        if content.role == 'user' and content.parts and content.parts[0].text:
+            return content.parts[0].text
+    return ''
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Plays back a fixed script for one agent: a list of tool-call rounds followed by a final answer.
+
+    `rounds` is a list of rounds, each a list of (tool_name, args) pairs; tools the
+    agent does not have are skipped. `answer(request_text)` builds the final text.
+    When the request carries the built-in google_search tool (interview_analyzer,
+    or the google_search_agent ADK wraps it in), the call also waits for a web search;
+    the wrapper agent shares its parent's model and so answers with the parent's text.
+    """
+
+    rounds: list = []
+    answer: object = None
+    latency: FakeLatency = FakeLatency()
+
+    model_config = {'arbitrary_types_allowed': True}
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency.delay(self.latency.llm_s, _rng))
+        request_text = _request_text(llm_request)
+        prompt_tokens = sum(_tokens(p.text or '') for c in llm_request.contents for p in c.parts or [])
+
+        if _uses_google_search(llm_request):
+            await asyncio.sleep(self.latency.search_s)
+
+        done_rounds = sum(
+            1 for content in llm_request.contents
+            if content.role == 'model' and any(part.function_call for part in content.parts or [])
+        )
+        available = llm_request.tools_dict or {}
+        for index in range(done_rounds, len(self.rounds)):
+            calls = [
+                types.Part(function_call=types.FunctionCall(name=name, args=args(request_text) if callable(args) else args))
+                for name, args in self.rounds[index]
+                if name in available
+            ]
+            if calls:
+                yield LlmResponse(
+                    content=types.Content(role='model', parts=calls),
+                    usage_metadata=types.GenerateContentResponseUsageMetadata(
+                        prompt_token_count=prompt_tokens, candidates_token_count=10 * len(calls)
+                    ),
+                )
+                return
+
+        text = self.answer(request_text) if callable(self.answer) else str(self.answer or '')
+        if stream:
+            for start in range(0, len(text), 200):
+                await asyncio.sleep(self.latency.llm_chunk_s)
+                yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=text[start:start + 200])]), partial=True)
+        yield self._response(text, prompt_tokens)
+
+    @staticmethod
+    def _response(text: str, prompt_tokens: int) -> LlmResponse:
+        return LlmResponse(
+            content=types.Content(role='model', parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens, candidates_token_count=_tokens(text)
+            ),
+            turn_complete=True,
+        )
+
+
+class FakeSearchBackend:
+    """Replaces DiscoveryEngineSearchTool behind CachedVertexSearchTool (called from a worker thread)."""
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.calls = 0
+
+    def discovery_engine_search(self, query: str) -> dict:
+        self.calls += 1
+        try:
+            time.sleep(self.latency.delay(self.latency.search_s, _rng))
+        except FakeServerError as e:
+            # As DiscoveryEngineSearchTool does with GoogleAPICallError.
+            return {'status': 'error', 'error_message': f'{e.code} {e}'}
+        digest = hashlib.sha1(query.encode()).hexdigest()[:8]
+        return {
+            'status': 'success',
+            'results': [
+                {
+                    'title': f'Comarch document {digest}-{i}',
+                    'url': f'https://www.comarch.com/docs/{digest}/{i}',
+                    'content': f'Reference material {i} for "{query}". License 120 EUR per user; implementation 40,000 EUR.',
+                }
+                for i in range(3)
+            ],
+        }
+
+
+@functools.lru_cache(maxsize=8)
+def fake_png(width: int = 1024, height: int = 1024, seed: int = 0) -> bytes:
+    """A deterministic photo-like PNG (so DOCX image normalisation does real work)."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width)[None, :, None]
+    y = np.linspace(0, 255, height)[:, None, None]
+    pixels = (x * np.array([0.2, 0.4, 0.9]) + y * np.array([0.6, 0.3, 0.1])) / 1.5 + rng.normal(0, 12, (height, width, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype('uint8'), 'RGB').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FakeImagenClient:
+    """Mimics `Client().aio.models.generate_images` as used by ImageGenerationService."""
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.calls = 0
+        self.aio = self
+        self.models = self
+
+    async def generate_images(self, model: str, prompt: str, config: dict):
+        self.calls += 1
+        await asyncio.sleep(self.latency.delay(self.latency.imagen_s, _rng))
+        seed = int(hashlib.sha1(prompt.encode()).hexdigest()[:6], 16)
+        image = types.Image(image_bytes=fake_png(seed=seed))
+        count = (config or {}).get('number_of_images', 1)
+        return types.GenerateImagesResponse(generated_images=[types.GeneratedImage(image=image)] * count)
+
+
+# --- Agent scripts -------------------------------------------------------------------------------------------
+
+PROFILE_JSON = (
+    '{"status": "SUCCESS", "client_name": "Acme Logistics International", '
+    '"verification_source": "Google Search", "industry_context": "Mid-sized logistics firm, approx 500 employees.", '
+    '"pain_points": ["Manual data entry", "Fleet visibility"], "business_goals": ["Reduce TCO", "Automate dispatch"], '
+    '"user_count": 150, "deployment_preference": "saas", "contract_term_years": 3, "budget": "250k EUR", '
+    '"confirmation_needed": false}'
+)
+
+
+def profile_answer(request_text: str) -> str:
+    """PROFILE_JSON with the dispatcher count taken from the notes, so edits reach the profile."""
+    match = re.search(r'(\d+) dispatchers', request_text)
+    if not match:
+        return PROFILE_JSON
+    return PROFILE_JSON.replace('"user_count": 150', f'"user_count": {int(match.group(1))}')
+
+
+def proposal_markdown(sections: int = 8, table_rows: int = 6, paragraph_chars: int = 600) -> str:
+    """A deterministic proposal in the proposal_writer's markdown dialect."""
+    paragraph = ('Comarch delivers measurable value through **automation** and *visibility*. ' * 20)[:paragraph_chars]
+    lines = ['# Sales Proposal for Acme Logistics International', '']
+    for section in range(1, sections + 1):
+        lines += [f'## {section}. Section {section}', '', paragraph, '', f'### {section}.1 Details', '']
+        lines += [f'- Benefit {item}: faster dispatch and lower cost' for item in range(1, 4)]
+        lines.append('')
+        if section == 1:
+            lines += ['[[boilerplate:about_comarch]]', '']
+    lines += ['## Investment', '', '| Cost Category | Item/SKU | Estimated Total |', '|---|---|---|']
+    lines += [f'| OPEX / Recurring | Licence line {row} | {1000 + row:,} EUR |' for row in range(table_rows)]
+    lines += ['', '**Total First Year Investment:** 250,000 EUR', '', '[[boilerplate:terms_and_conditions]]']
+    return '\n'.join(lines)
+
+
+def _finalize_args(request_text: str) -> dict:
+    return {
+        'image_filenames': ['investment_breakdown.png', 'value_proposition.png'],
+        'output_filename': 'Comarch_Sales_Proposal.docx',
+    }
+
+
+def _assembly_args(request_text: str) -> dict:
+    return {'proposal_markdown': '', 'proposal_artifact': 'handoff_proposal_writer.md', **_finalize_args(request_text)}
+
+
+def agent_scripts(proposal_sections: int = 8, table_rows: int = 6, docx_streaming: bool = True) -> dict:
+    """Scripts keyed by agent name, shaped like the real agents' tool use."""
+    search = ('vertex_ai_search', lambda request: {'query': request[:60] or 'Comarch products'})
+    web = ('google_search_agent', lambda request: {'request': 'Comarch competitors ' + request[:40]})
+    return {
+        'interview_analyzer': (
+            [[('lookup_client', {'client_name': 'Acme Logistics', 'industry': 'logistics'})], [web]],
+            profile_answer,
+        ),
+        'product_matcher': ([[search, web]], 'Recommended: Comarch Loyalty Management (SaaS), Comarch Smart Analytics.'),
+        'competitor_analyst': ([[search, web]], '| Feature | Comarch | Competitor |\n|---|---|---|\n| Loyalty | Yes | Partial |'),
+        'pricing_calculator': (
+            [[search]],
+            '| Cost Category | Item/SKU | Estimated Total |\n|---|---|---|\n| CAPEX | Implementation | 40,000 EUR |\n'
+            '**Total First Year Investment:** 76,000 EUR',
+        ),
+        'proposal_writer': ([], lambda request: proposal_markdown(proposal_sections, table_rows)),
+        'visual_generator': (
+            [[
+                ('render_chart', {'categories': ['Implementation', 'Licenses', 'Support'], 'values': [40000, 24000, 12000], 'currency': 'EUR'}),
+                ('generate_image', {'prompt': 'Isometric logistics network in Comarch blue', 'filename': 'value_proposition.png'}),
+            ]],
+            'Assets generated: investment_breakdown.png, value_proposition.png',
+        ),
+        'docx_assembler': (
+            [[('finalize_streamed_docx', _finalize_args) if docx_streaming else ('create_docx', _assembly_args)]],
+            'Document Comarch_Sales_Proposal.docx created.',
+        ),
+    }
+
+
+def _phase_agents(root_agent) -> list:
+    """All LlmAgents reachable from the root agent (sub-agents, AgentTools and graph phases)."""
+    from google.adk.agents import LlmAgent
+    from google.adk.tools.agent_tool import AgentTool
+
+    found, stack = [], [root_agent]
+    while stack:
+        agent = stack.pop()
+        if isinstance(agent, LlmAgent) and agent not in found:
+            found.append(agent)
+        stack.extend(agent.sub_agents)
+        stack.extend(tool.agent for tool in getattr(agent, 'tools', []) if isinstance(tool, AgentTool))
+        stack.extend(phase.tool.agent for phase in getattr(agent, 'phases', []))
+    return found
+
+
+@contextmanager
+def offline_backends(root_agent, latency: FakeLatency, proposal_sections: int = 8, table_rows: int = 6):
+    """
+    Swaps every external back-end used under `root_agent` for a fake, and restores them afterwards.
+
+    Yields a dict of the fakes, and the model router the run uses, so callers can read call counts.
+    """
+    from sales_agent.resilience import ResilientLlm, resilience
+    from sales_agent.routing import ModelRouter, RoutedLlm, router
+    from sales_agent.retrieval import retrieval_cache
+    from sales_agent.retrieval.search_tool import CachedVertexSearchTool
+    from sales_agent.sub_agents.interview_analyzer import agent as interview_analyzer
+    from sales_agent.sub_agents.interview_analyzer.entity_cache import EntityCache
+    from sales_agent.sub_agents.visual_generator import agent as visual_generator
+
+    from sales_agent import agent as agent_module
+    from sales_agent.agent import DOCX_STREAMING
+
+    scripts = agent_scripts(proposal_sections, table_rows, DOCX_STREAMING)
+    search_backend = FakeSearchBackend(latency)
+    imagen = FakeImagenClient(latency)
+    restore = []
+
+    def swap(owner, attribute, rounds, answer):
+        model = getattr(owner, attribute)
+        # Keeps the configured model name: ADK decides on built-in tool support from it.
+        name = model if isinstance(model, str) else model.model
+        fake = ScriptedLlm(model=name, rounds=rounds, answer=answer, latency=latency)
+        if isinstance(model, ResilientLlm):
+            # The fake sits behind the resilience layer, which is under test as well.
+            owner, attribute = model, 'inner'
+        restore.append((owner, attribute, getattr(owner, attribute)))
+        setattr(owner, attribute, fake)
+
+    # A private router: runs neither read nor fill the persisted routing stats.
+    phase_router = ModelRouter(routes=router.routes, stats_file='')
+    for agent in _phase_agents(root_agent):
+        rounds, answer = scripts.get(agent.name, ([], 'OK'))
+        if isinstance(agent.model, RoutedLlm):
+            swap(agent.model, 'primary', rounds, answer)
+            swap(agent.model, 'fallback', rounds, answer)
+            restore.append((agent.model, 'router', agent.model.router))
+            agent.model.router = phase_router
+        else:
+            swap(agent, 'model', rounds, answer)
+        for tool in agent.tools:
+            if isinstance(tool, CachedVertexSearchTool):
+                restore.append((tool, '_backend', tool._backend))
+                tool._backend = search_backend
+
+    service = visual_generator.image_service
+    restore += [(service, 'client', service.client), (service, 'cache', service.cache)]
+    service.client, service.cache = imagen, None
+    # A private in-memory entity cache, so runs neither read nor fill the local one.
+    restore.append((interview_analyzer, 'entity_cache', interview_analyzer.entity_cache))
+    # No memoised phases or proposal memory either, unless a suite installs its own.
+    if hasattr(root_agent, 'memo'):
+        restore.append((root_agent, 'memo', root_agent.memo))
+        root_agent.memo = None
+    restore.append((agent_module, 'proposal_memory', agent_module.proposal_memory))
+    agent_module.proposal_memory = None
+    interview_analyzer.entity_cache = EntityCache(':memory:')
+    retrieval_cache.invalidate()
+    resilience.reset()
+    reseed()
+    try:
+        yield {'search': search_backend, 'imagen': imagen, 'router': phase_router}
+    finally:
+        for target, attribute, value in reversed(restore):
+            setattr(target, attribute, value)
+        retrieval_cache.invalidate()
+        resilience.reset()
@@ -0,0 +1,80 @@
+"""
+Cold-start import report, in the format of `python -X importtime`.
+
+    python -m benchmarks imports            # top modules by cumulative import time
+    python -m benchmarks imports --check    # exit 1 if a deferred module is imported eagerly
+
+Importing `sales_agent` must not load any sub-agent or the heavy libraries
+they use; those are imported on first use through the agent registry.
+"""
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules that must stay out of `import sales_agent`.
+DEFERRED_MODULES = ('sales_agent.sub_agents', 'docx', 'numpy', 'matplotlib', 'sales_agent.retrieval')
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_profile(module: str = 'sales_agent') -> list:
+    """Imports `module` in a fresh interpreter; returns (name, self_us, cumulative_us, depth) per module."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def eager_deferred_modules(rows: list) -> list:
+    return sorted({
+        name for name, *_ in rows
+        if any(name == deferred or name.startswith(deferred + '.') for deferred in DEFERRED_MODULES)
+    })
+
+
+def import_suite(repeat: int, module: str = 'sales_agent') -> list:
+    """Cold-start import time of `module` and the deferred modules it loaded."""
+    from .suites import _stats
+
+    samples, rows = [], []
+    for _ in range(repeat):
+        rows = import_profile(module)
+        samples.append(next(cumulative for name, _, cumulative, _ in rows if name == module) / 1e6)
+    packages = {}
+    for name, self_us, _, _ in rows:
+        top = name.split('.')[0] if not name.startswith('google.') else '.'.join(name.split('.')[:2])
+        packages[top] = packages.get(top, 0) + self_us
+    return [{
+        'name': f'import.{module}',
+        'params': {'repeat': repeat},
+        **_stats(samples),
+        'modules_loaded': len(rows),
+        'eager_deferred_modules': eager_deferred_modules(rows),
+        'top_packages_ms': {
+            name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda item: -item[1])[:10]
+        },
+    }]
+
+
+def report(args) -> int:
+    rows = import_profile(args.module)
+    print(f"{'self [us]':>10} | {'cumulative':>10} | imported package")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{self_us:>10} | {cumulative_us:>10} | {'  ' * depth}{name}")
+
+    eager = eager_deferred_modules(rows)
+    if eager:
+        print(f"\nDeferred modules imported eagerly: {', '.join(eager)}", file=sys.stderr)
+    return 1 if args.check and eager else 0
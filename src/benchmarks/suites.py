@@ -0,0 +1,555 @@
+"""Benchmark suites: end-to-end pipeline latency, phase parallelism, regeneration, create_docx throughput, table scaling, artifact storage, resilience, model routing, the proposal memory and the competitor matrix."""
+from dataclasses import replace
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from google.genai import types
+
+from .fakes import FakeLatency, FakeServerError, ScriptedLlm, fake_png, offline_backends, proposal_markdown, reseed
+
+NOTES = (
+    "Meeting with Acme Logistics International (Columbus, Ohio). ~500 employees, 150 dispatchers. "
+    "Pain points: manual data entry, no fleet visibility. Goals: reduce TCO, automate dispatch. "
+    "Prefers SaaS, 3-year contract, budget around 250k EUR. Currently evaluating a competitor's loyalty suite."
+)
+
+
+def _stats(samples: list) -> dict:
+    values = np.array(samples) * 1000
+    return {
+        'samples_ms': [round(float(v), 2) for v in values],
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'mean_ms': round(float(values.mean()), 2),
+    }
+
+
+def serial_graph(graph):
+    """The same phases, each depending on the previous one: the pipeline without any parallelism."""
+    from sales_agent.pipeline import PhaseGraphAgent
+
+    phases = [
+        replace(phase, depends_on=(graph.phases[index - 1].name,) if index else ())
+        for index, phase in enumerate(graph.phases)
+    ]
+    return PhaseGraphAgent(name='serial_phase_orchestrator', description=graph.description, phases=phases, gate=graph.gate)
+
+
+async def _run_pipeline(agent, notes: str = NOTES) -> dict:
+    from google.adk.runners import InMemoryRunner
+
+    runner = InMemoryRunner(agent=agent, app_name='sales_agent')
+    session = await runner.session_service.create_session(app_name='sales_agent', user_id='benchmark')
+    message = types.Content(role='user', parts=[types.Part.from_text(text=notes)])
+    phases, memo_hits = {}, []
+    started = time.perf_counter()
+    async for event in runner.run_async(user_id='benchmark', session_id=session.id, new_message=message):
+        if event.custom_metadata and 'phase' in event.custom_metadata:
+            phases[event.custom_metadata['phase']] = event.custom_metadata['elapsed_s']
+            if event.custom_metadata.get('memo_hit'):
+                memo_hits.append(event.custom_metadata['phase'])
+    elapsed = time.perf_counter() - started
+    keys = await runner.artifact_service.list_artifact_keys(app_name='sales_agent', user_id='benchmark', session_id=session.id)
+    return {'elapsed': elapsed, 'phases': phases, 'memo_hits': memo_hits, 'docx': any(key.endswith('.docx') for key in keys)}
+
+
+def _critical_path(graph, phase_seconds: dict) -> float:
+    finish = {}
+    for phase in graph.phases:  # phases are listed in dependency order
+        finish[phase.name] = phase_seconds.get(phase.name, 0.0) + max((finish[d] for d in phase.depends_on), default=0.0)
+    return max(finish.values(), default=0.0)
+
+
+def pipeline_suite(latency: FakeLatency, repeat: int) -> list:
+    """End-to-end latency of the phase graph, and of the same phases run one after another."""
+    from sales_agent.agent import phase_graph_agent
+    from sales_agent.retrieval import retrieval_cache
+
+    results = []
+    for label, agent in (('graph', phase_graph_agent), ('serial', serial_graph(phase_graph_agent))):
+        runs = []
+        with offline_backends(phase_graph_agent, latency) as fakes:
+            asyncio.run(_run_pipeline(agent))  # warm-up: lazy imports, first matplotlib/Pillow use
+            fakes['search'].calls = fakes['imagen'].calls = 0
+            for _ in range(repeat):
+                retrieval_cache.invalidate()  # every run starts cold
+                runs.append(asyncio.run(_run_pipeline(agent)))
+            calls = {'search_calls': fakes['search'].calls, 'imagen_calls': fakes['imagen'].calls}
+        phase_p50 = {
+            name: round(float(np.median([run['phases'].get(name, 0.0) for run in runs])) * 1000, 2)
+            for name in runs[0]['phases']
+        }
+        results.append({
+            'name': f'pipeline.{label}',
+            'params': {'repeat': repeat},
+            **_stats([run['elapsed'] for run in runs]),
+            'phase_p50_ms': phase_p50,
+            'critical_path_ms': round(_critical_path(phase_graph_agent, {k: v / 1000 for k, v in phase_p50.items()}) * 1000, 2),
+            'docx_produced': all(run['docx'] for run in runs),
+            **{name: count // repeat for name, count in calls.items()},
+        })
+
+    graph, serial = results
+    graph['speedup_vs_serial'] = round(serial['p50_ms'] / graph['p50_ms'], 2) if graph['p50_ms'] else None
+    return results
+
+
+EDITED_NOTES = NOTES.replace('150 dispatchers', '180 dispatchers')
+
+
+def regenerate_suite(latency: FakeLatency, repeat: int) -> list:
+    """Edit-and-regenerate turnaround: a cold run, then the same notes with the user count changed."""
+    from sales_agent.agent import phase_graph_agent
+    from sales_agent.memo import InMemoryMemoStore
+    from sales_agent.retrieval import retrieval_cache
+
+    store = InMemoryMemoStore()
+    runs = {'cold': [], 'edited': [], 'unchanged': []}
+    with offline_backends(phase_graph_agent, latency):
+        phase_graph_agent.memo = store  # restored by offline_backends
+        asyncio.run(_run_pipeline(phase_graph_agent))  # warm-up
+        for _ in range(repeat):
+            store.invalidate()
+            retrieval_cache.invalidate()
+            runs['cold'].append(asyncio.run(_run_pipeline(phase_graph_agent)))
+            runs['edited'].append(asyncio.run(_run_pipeline(phase_graph_agent, EDITED_NOTES)))
+            runs['unchanged'].append(asyncio.run(_run_pipeline(phase_graph_agent, EDITED_NOTES)))
+
+    results = [{
+        'name': f'regenerate.{label}',
+        'params': {'repeat': repeat},
+        **_stats([run['elapsed'] for run in label_runs]),
+        'memo_hits': label_runs[-1]['memo_hits'],
+        'recomputed': sorted(set(label_runs[-1]['phases']) - set(label_runs[-1]['memo_hits'])),
+        'docx_produced': all(run['docx'] for run in label_runs),
+    } for label, label_runs in runs.items()]
+    cold = results[0]['p50_ms']
+    for result in results[1:]:
+        result['speedup_vs_cold'] = round(cold / result['p50_ms'], 2) if result['p50_ms'] else None
+    return results
+
+
+async def _tool_context():
+    """A real ToolContext over in-memory ADK services, as the docx_assembler agent would get."""
+    from google.adk.agents.invocation_context import InvocationContext, new_invocation_context_id
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.sessions import InMemorySessionService
+    from google.adk.tools import ToolContext
+    from sales_agent.sub_agents.docx_assembler import docx_assembler_agent
+
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(app_name='sales_agent', user_id='benchmark')
+    context = InvocationContext(
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+        invocation_id=new_invocation_context_id(),
+        agent=docx_assembler_agent,
+        session=session,
+    )
+    return ToolContext(context)
+
+
+async def _time_create_docx(markdown: str, images: int, repeat: int) -> tuple:
+    from sales_agent.sub_agents.docx_assembler.agent import create_docx
+
+    samples, last = [], None
+    for run in range(repeat + 1):
+        tool_context = await _tool_context()
+        filenames = [f'image_{i}.png' for i in range(images)]
+        for i, filename in enumerate(filenames):
+            await tool_context.save_artifact(f'user:{filename}', types.Part.from_bytes(data=fake_png(seed=i), mime_type='image/png'))
+        started = time.perf_counter()
+        last = await create_docx(markdown, filenames, 'benchmark.docx', tool_context)
+        if run:  # the first run is a warm-up
+            samples.append(time.perf_counter() - started)
+        if last.get('status') != 'success':
+            raise RuntimeError(f"create_docx failed: {last}")
+    return samples, last
+
+
+DOCX_SWEEPS = {
+    'sections': [5, 20, 80],
+    'table_rows': [10, 100, 1000],
+    'images': [0, 2, 8],
+}
+
+
+def docx_suite(repeat: int, sweeps: dict = None) -> list:
+    """create_docx latency and throughput as markdown size, table rows and image count grow."""
+    sweeps = sweeps or DOCX_SWEEPS
+    baseline = {'sections': 8, 'table_rows': 6, 'images': 2}
+    results = []
+    for dimension, values in sweeps.items():
+        for value in values:
+            params = {**baseline, dimension: value}
+            markdown = proposal_markdown(params['sections'], params['table_rows'])
+            samples, last = asyncio.run(_time_create_docx(markdown, params['images'], repeat))
+            stats = _stats(samples)
+            results.append({
+                'name': f'create_docx.{dimension}',
+                'params': {**params, 'repeat': repeat},
+                **stats,
+                'markdown_chars': len(markdown),
+                'chars_per_s': round(len(markdown) / (stats['p50_ms'] / 1000)) if stats['p50_ms'] else None,
+                'docx_bytes': last.get('size_bytes'),
+                'timings_ms': last.get('timings_ms'),
+            })
+    return results
+
+
+TABLE_SWEEP = {'columns': 4, 'rows': [250, 1000, 4000], 'cell_by_cell_max_rows': 1000}
+
+
+def _table_block(rows: int, columns: int):
+    from sales_agent.sub_agents.docx_assembler.markdown_blocks import Table, parse_inline
+
+    header = [list(parse_inline(f'**Column {c}**')) for c in range(columns)]
+    body = [[list(parse_inline(f'SKU-{r}-{c} {1000 + r:,} EUR')) for c in range(columns)] for r in range(rows)]
+    return Table(header, body, ['left'] + ['right'] * (columns - 1))
+
+
+def _cell_by_cell(doc, block) -> None:
+    """The python-docx way: grow a table and fill it through table.rows[i].cells[j]."""
+    rows = [block.header] + block.rows
+    table = doc.add_table(rows=len(rows), cols=len(block.header))
+    for i, row in enumerate(rows):
+        for j, spans in enumerate(row):
+            table.rows[i].cells[j].text = ''.join(span.text for span in spans)
+
+
+def _scaling_exponent(cells: list, seconds: list) -> float:
+    """Slope of log(time) over log(cells): 1.0 is linear, 2.0 quadratic."""
+    return round(float(np.polyfit(np.log(cells), np.log(seconds), 1)[0]), 2)
+
+
+def table_suite(repeat: int, sweep: dict = None) -> list:
+    """Table rendering time as the cell count grows: the bulk w:tbl builder against cell-by-cell filling."""
+    from sales_agent.sub_agents.docx_assembler.rendering import DocxRenderer, new_document
+
+    sweep = sweep or TABLE_SWEEP
+    columns = sweep['columns']
+    methods = {
+        'bulk_xml': lambda doc, block: DocxRenderer(doc).render(block),
+        'cell_by_cell': _cell_by_cell,
+    }
+    results = []
+    for method, render in methods.items():
+        sizes = [rows for rows in sweep['rows'] if method == 'bulk_xml' or rows <= sweep['cell_by_cell_max_rows']]
+        entries = []
+        for rows in sizes:
+            block = _table_block(rows, columns)
+            samples = []
+            for run in range(repeat + 1):
+                doc = new_document()
+                started = time.perf_counter()
+                render(doc, block)
+                if run:  # the first run is a warm-up
+                    samples.append(time.perf_counter() - started)
+            stats = _stats(samples)
+            cells = (rows + 1) * columns
+            entries.append({
+                'name': f'tables.{method}',
+                'params': {'rows': rows, 'columns': columns, 'repeat': repeat},
+                **stats,
+                'cells': cells,
+                'us_per_cell': round(stats['p50_ms'] * 1000 / cells, 2),
+            })
+        if len(entries) > 1:
+            exponent = _scaling_exponent([e['cells'] for e in entries], [e['p50_ms'] for e in entries])
+            for entry in entries:
+                entry['scaling_exponent'] = exponent
+        results += entries
+    return results
+
+
+ARTIFACT_SESSIONS = 40
+
+
+async def _fill_artifacts(service, sessions: int, charts: list, docx_size: int) -> tuple:
+    """Saves the same charts and a distinct DOCX per session; returns per-session save and load times."""
+    saves, loads = [], []
+    for index in range(sessions):
+        session_id = f'session-{index}'
+        parts = [(f'user:chart_{n}.png', types.Part.from_bytes(data=chart, mime_type='image/png')) for n, chart in enumerate(charts)]
+        parts.append(('user:proposal.docx', types.Part.from_bytes(data=os.urandom(docx_size), mime_type='application/octet-stream')))
+        started = time.perf_counter()
+        for filename, part in parts:
+            await service.save_artifact(app_name='benchmark', user_id=session_id, session_id=session_id, filename=filename, artifact=part)
+        saves.append(time.perf_counter() - started)
+        del parts
+        started = time.perf_counter()
+        for filename in await service.list_artifact_keys(app_name='benchmark', user_id=session_id, session_id=session_id):
+            await service.load_artifact(app_name='benchmark', user_id=session_id, session_id=session_id, filename=filename)
+        loads.append(time.perf_counter() - started)
+    return saves, loads
+
+
+def artifact_suite(repeat: int, sessions: int = ARTIFACT_SESSIONS) -> list:
+    """Heap held and save/load time of many sessions' artifacts: ADK's in-memory service against the content-addressed store."""
+    from google.adk.artifacts import InMemoryArtifactService
+    from sales_agent.artifact_store import ContentAddressedArtifactService
+
+    charts = [fake_png(800, 600, seed=seed) for seed in range(2)]
+    docx_size = 400_000
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        services = {
+            'in_memory': InMemoryArtifactService,
+            'content_addressed': lambda: ContentAddressedArtifactService(os.path.join(directory, str(time.perf_counter_ns()))),
+        }
+        for name, factory in services.items():
+            saves, loads, heap = [], [], []
+            for _ in range(repeat):
+                service = factory()
+                tracemalloc.start()
+                run_saves, run_loads = asyncio.run(_fill_artifacts(service, sessions, charts, docx_size))
+                heap.append(tracemalloc.get_traced_memory()[0])
+                tracemalloc.stop()
+                saves += run_saves
+                loads += run_loads
+                stats = service.stats() if hasattr(service, 'stats') else None
+            results.append({
+                'name': f'artifacts.{name}.save',
+                'params': {'sessions': sessions, 'repeat': repeat},
+                **_stats(saves),
+                'heap_retained_mb': round(float(np.median(heap)) / 2**20, 1),
+                'stored_mb': round(stats['stored_bytes'] / 2**20, 1) if stats else None,
+                'dedup_ratio': stats['dedup_ratio'] if stats else None,
+            })
+            results.append({'name': f'artifacts.{name}.load', 'params': {'sessions': sessions, 'repeat': repeat}, **_stats(loads)})
+    return results
+
+
+async def _drive(backend, make_call, calls: int, concurrency: int) -> tuple:
+    """Issues `calls` calls through a resilience Backend; returns (latencies of successes, failures)."""
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await backend.call(make_call, site='benchmark')
+        except Exception:
+            failures += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    for start in range(0, calls, concurrency):
+        await asyncio.gather(*(one() for _ in range(min(concurrency, calls - start))))
+    return latencies, failures
+
+
+def resilience_suite(latency: FakeLatency, repeat: int, calls: int = 200) -> list:
+    """Tail latency with and without hedging on a back-end with a 5% slow tail; fail-fast time of an open circuit."""
+    from sales_agent.resilience import Backend, BackendPolicy
+
+    base_s = latency.llm_s
+    tail = replace(latency, tail_rate=latency.tail_rate or 0.05, tail_s=latency.tail_s or 10 * base_s)
+    rng = random.Random(0)
+
+    async def slow_tail():
+        await asyncio.sleep(tail.delay(base_s, rng))
+
+    results = []
+    for hedge in (False, True):
+        backend = Backend('benchmark', BackendPolicy(timeout_s=60, hedge=hedge))
+        asyncio.run(_drive(backend, slow_tail, 40, 10))  # warm-up: learn the call site's p95
+        samples = []
+        for _ in range(repeat):
+            samples += asyncio.run(_drive(backend, slow_tail, calls, 10))[0]
+        results.append({
+            'name': f"resilience.{'hedged' if hedge else 'unhedged'}",
+            'params': {'calls': calls, 'tail_rate': tail.tail_rate, 'tail_s': tail.tail_s, 'repeat': repeat},
+            **_stats(samples),
+            'p99_ms': round(float(np.percentile(samples, 99)) * 1000, 2),
+            'hedges': backend.counts['hedges'],
+            'hedge_wins': backend.counts['hedge_wins'],
+        })
+
+    async def down():
+        await asyncio.sleep(base_s)
+        raise FakeServerError('503 UNAVAILABLE')
+
+    for breaker in (False, True):
+        backend = Backend('benchmark', BackendPolicy(timeout_s=60, attempts=3, retry_base_s=base_s / 4, retry_max_s=base_s))
+        if not breaker:
+            backend.breaker.failure_threshold = float('inf')
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            failures = asyncio.run(_drive(backend, down, 30, 1))[1]
+            samples.append((time.perf_counter() - started) / 30)
+        results.append({
+            'name': f"resilience.outage_{'breaker' if breaker else 'no_breaker'}",
+            'params': {'calls': 30, 'repeat': repeat},
+            **_stats(samples),
+            'failed': failures,
+            'rejected_fast': backend.breaker.rejected,
+        })
+    return results
+
+
+def routing_suite(latency: FakeLatency, repeat: int, calls: int = 100) -> list:
+    """Per-call latency of a phase whose model degraded (30% slow tail), with and without a budgeted fallback model."""
+    from google.adk.models.llm_request import LlmRequest
+    from sales_agent.routing import ModelRoute, ModelRouter, RoutedLlm
+
+    base_s = latency.llm_s
+    degraded = replace(latency, tail_rate=0.3, tail_s=20 * base_s, error_rate=0.0)
+    fast = replace(latency, llm_s=base_s / 2, tail_rate=0.0, error_rate=0.0)
+    budget_s = 3 * base_s
+    request = LlmRequest(contents=[types.Content(role='user', parts=[types.Part(text='Client notes')])])
+
+    async def run(model) -> list:
+        samples = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            async for _response in model.generate_content_async(request):
+                pass
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    results = []
+    for routed in (False, True):
+        router = ModelRouter(routes={'phase': ModelRoute('primary', fallback='fallback', budget_s=budget_s)}, stats_file='')
+        primary = ScriptedLlm(model='primary', answer='OK', latency=degraded)
+        model = primary
+        if routed:
+            model = RoutedLlm(
+                model='primary', phase='phase', primary=primary,
+                fallback=ScriptedLlm(model='fallback', answer='OK', latency=fast), router=router,
+            )
+        samples = []
+        for _ in range(repeat):
+            reseed()
+            samples += asyncio.run(run(model))
+        stats = router.stats()
+        results.append({
+            'name': f"routing.{'fallback' if routed else 'primary_only'}",
+            'params': {'calls': calls, 'budget_s': budget_s, 'tail_rate': degraded.tail_rate, 'tail_s': degraded.tail_s, 'repeat': repeat},
+            **_stats(samples),
+            'p99_ms': round(float(np.percentile(samples, 99)) * 1000, 2),
+            'over_budget': stats.get('phase/primary', {}).get('over_budget', 0),
+            'fallback_calls': stats.get('phase/fallback', {}).get('calls', 0),
+        })
+    return results
+
+
+MEMORY_INDUSTRIES = {
+    'logistics': ['fleet utilisation', 'driver churn', 'late deliveries', 'fuel costs', 'warehouse visibility', 'manual dispatch'],
+    'retail': ['customer churn', 'loyalty program', 'basket size', 'store footfall', 'omnichannel returns', 'promotion fraud'],
+    'airline': ['frequent flyer program', 'partner accruals', 'lounge access', 'award seat availability', 'miles breakage'],
+    'telecom': ['billing errors', 'prepaid churn', 'roaming revenue', 'network faults', 'bundle pricing', 'self-care app'],
+    'banking': ['card rewards', 'onboarding time', 'cross-sell', 'fraud alerts', 'branch queues', 'mobile adoption'],
+    'healthcare': ['patient scheduling', 'medical records', 'remote monitoring', 'claims backlog', 'staff rostering'],
+    'energy': ['smart meters', 'outage response', 'tariff migration', 'field crews', 'customer self-service'],
+    'manufacturing': ['production planning', 'inventory write-offs', 'supplier delays', 'quality defects', 'shop floor data'],
+}
+
+
+def _memory_profile(rng: random.Random, number: int) -> dict:
+    industry = rng.choice(sorted(MEMORY_INDUSTRIES))
+    pains = rng.sample(MEMORY_INDUSTRIES[industry], 3)
+    return {
+        'status': 'SUCCESS',
+        'client_name': f'Client {number}',
+        'industry_context': f'{industry} company, {rng.randint(1, 40) * 50} employees',
+        'pain_points': pains,
+        'business_goals': [f'reduce {pains[0]}', f'improve {pains[1]}'],
+        'deployment_preference': rng.choice(['saas', 'on_premise']),
+    }
+
+
+def memory_suite(repeat: int, proposals: int = 4000, queries: int = 200) -> list:
+    """Proposal-memory search: full scan against the IVF index (latency, recall@3), and the cost of adding a proposal."""
+    from sales_agent.proposal_memory import ProposalMemory
+
+    rng = random.Random(0)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        memory = ProposalMemory(directory)
+        started = time.perf_counter()
+        for number in range(proposals):
+            memory.add(_memory_profile(rng, number), 'Comarch Loyalty Management', '| Item | Total |\n|---|---|\n| SaaS | 1 EUR |')
+        add_s = (time.perf_counter() - started) / proposals
+        index = memory.build_index()
+
+        probes = [_memory_profile(rng, proposals + i) for i in range(queries)]
+        exact = ProposalMemory(directory, nprobe=index['lists'])  # probing every list scans every row
+        expected = [{m['profile']['client_name'] for m in exact.search(p, 3, min_similarity=0.0)} for p in probes]
+        for name, searcher in (('full_scan', exact), ('ivf', memory)):
+            samples, hits = [], 0
+            for _ in range(repeat):
+                for probe, truth in zip(probes, expected):
+                    started = time.perf_counter()
+                    matches = searcher.search(probe, 3, min_similarity=0.0)
+                    samples.append(time.perf_counter() - started)
+                    hits += len(truth & {m['profile']['client_name'] for m in matches})
+            results.append({
+                'name': f'memory.{name}',
+                'params': {'proposals': proposals, 'lists': index['lists'], 'nprobe': searcher.nprobe, 'queries': queries, 'repeat': repeat},
+                **_stats(samples),
+                'recall_at_3': round(hits / (3 * queries * repeat), 3),
+                'add_ms': round(add_s * 1000, 3),
+            })
+    return results
+
+
+def _competitor_rows(rng: random.Random, rows: int) -> list:
+    vendors = ['Salesforce', 'SAP', 'Oracle', 'Microsoft', 'Adobe', 'Braze', 'Antavo', 'Capillary', 'IBM', 'Infor']
+    modules = ['Loyalty Management', 'Campaign Management', 'Field Service', 'Billing', 'Customer Analytics', 'ERP Finance',
+               'Partner Accruals', 'Mobile App', 'Data Platform', 'Contact Center']
+    return [{
+        'vendor': rng.choice(vendors),
+        'module': f'{rng.choice(modules)} {number % 7}',
+        'industries': rng.sample(sorted(MEMORY_INDUSTRIES), rng.randint(0, 2)),
+        'features': [f'feature {rng.randint(1, 99)}' for _ in range(4)],
+        'price_points': [f'EUR {rng.randint(5, 90)} per user / month', f'setup EUR {rng.randint(5, 80)}k'],
+        'headline_price': rng.randint(5, 90),
+        'currency': 'EUR',
+        'price_unit': 'per user / month',
+        'weaknesses': [f'weakness {rng.randint(1, 99)}' for _ in range(2)],
+        'source': f'Offer {number // 3}',
+    } for number in range(rows)]
+
+
+def competitor_suite(repeat: int, rows: int = 2000, queries: int = 200) -> list:
+    """Competitor matrix lookups: filter latency, and the context the agent reads against 10 retrieved chunks per search."""
+    from sales_agent.retrieval.local_index import CHUNK_CHARS
+    from sales_agent.sub_agents.competitor_analyst import competitor_matrix as cm
+
+    rng = random.Random(0)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'competitor_matrix.npz')
+        matrix = cm.CompetitorMatrix.from_rows([cm._normalize(row, digest='benchmark') for row in _competitor_rows(rng, rows)])
+        matrix.save(path)
+        matrix = cm.CompetitorMatrix.load(path)
+        filters = [
+            (rng.choice(['loyalty', 'campaign management', 'field service', 'billing', 'analytics']), rng.choice(sorted(MEMORY_INDUSTRIES)))
+            for _ in range(queries)
+        ]
+        samples, table_chars, matched = [], [], []
+        for _ in range(repeat):
+            for module, industry in filters:
+                started = time.perf_counter()
+                indices = matrix.query(module, industry)
+                samples.append(time.perf_counter() - started)
+                matched.append(len(indices))
+                table_chars.append(len(cm.format_matrix([matrix.row(i) for i in indices[:cm.MAX_MATRIX_ROWS]])))
+        results.append({
+            'name': 'competitors.matrix_query',
+            'params': {'rows': rows, 'queries': queries, 'repeat': repeat},
+            **_stats(samples),
+            'p50_us': round(float(np.percentile(samples, 50)) * 1e6, 1),
+            'matched_rows_mean': round(float(np.mean(matched)), 1),
+            'table_chars_mean': round(float(np.mean(table_chars))),
+            'retrieved_chars_per_search': 10 * CHUNK_CHARS,
+            'file_bytes': os.path.getsize(path),
+        })
+    return results
@@ -1,53 +1,239 @@
+import json
+import logging
+import os
+import sys
+from dataclasses import replace
 from google.adk.agents.llm_agent import Agent
-from .sub_agents.pricing_calculator import pricing_calculator_agent
-from .sub_agents.competitor_analyst import competitor_analyst_agent
-from .sub_agents.interview_analyzer import interview_analyzer_agent
-from .sub_agents.product_matcher import product_matcher_agent
-from .sub_agents.proposal_writer import proposal_writer_agent
-from .sub_agents.visual_generator import visual_generator_agent
-from .sub_agents.docx_assembler import docx_assembler_agent
-from google.adk.tools import agent_tool
+from google.adk.apps import App
+from .handoff import HandoffAgentTool, profile_view
+from .memo import default_memo_store
+from .pipeline import Phase, PhaseGraphAgent, handoff_artifact_name, parse_json_output
+from .proposal_memory import default_proposal_memory, priors_section
+from .registry import LazyAgentTool, LazyStreamingAgentTool
+from .resilience import harden_models, phase_budgets
+from .routing import model_for, route_models
+from .tracing import TracingPlugin
+
+logger = logging.getLogger(__name__)
+
+# "graph" runs the deterministic phase graph, "llm" keeps the free-form orchestrator.
+ORCHESTRATOR_MODE = os.getenv('ORCHESTRATOR_MODE', 'graph')
+# In graph mode, stream proposal_writer's text straight into the DOCX document.
+DOCX_STREAMING = os.getenv('DOCX_STREAMING', '1') == '1'
+
+# Sub-agents are imported on first use (see registry), not with this module.
+competitor_analyst_as_tool = LazyAgentTool('competitor_analyst')
+interview_analyzer_as_tool = LazyAgentTool('interview_analyzer')
+proposal_writer_as_tool = LazyAgentTool('proposal_writer')
+pricing_calculator_as_tool = LazyAgentTool('pricing_calculator')
+product_matcher_as_tool = LazyAgentTool('product_matcher')
+visual_generator_agent_as_tool = LazyAgentTool('visual_generator')
+docx_assembler_as_tool = LazyAgentTool('docx_assembler')
+
+
+# Finished proposals, searched for priors by client-profile similarity (PROPOSAL_MEMORY_DIR; empty disables).
+proposal_memory = default_proposal_memory()
+
+
+# === PHASE GRAPH ===
+
+def _section(title, text):
+    return f"**{title}:**\n{text}\n"
+
+
+def _as_text(output):
+    return output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+
+
+def _priors(outputs, include_pricing=True):
+    """Similar past proposals of other clients, as a request section ('' when there are none)."""
+    profile = parse_json_output(outputs['interview_analyzer'])
+    if proposal_memory is None or not isinstance(profile, dict):
+        return ''
+    try:
+        return priors_section(proposal_memory.search(profile), include_pricing)
+    except Exception as e:
+        logger.warning(f"⚠ Proposal memory search failed: {e}")
+        return ''
+
+
+def _profile_request(user_request, outputs):
+    return user_request
+
+
+def _strategy_request(user_request, outputs, phase):
+    return _section("Client Profile", profile_view(outputs['interview_analyzer'], phase))
+
+
+def _product_request(user_request, outputs):
+    return _strategy_request(user_request, outputs, 'product_matcher') + _priors(outputs, include_pricing=False)
+
+
+def _competitor_request(user_request, outputs):
+    return _strategy_request(user_request, outputs, 'competitor_analyst')
+
+
+def _pricing_request(user_request, outputs):
+    return (
+        _section("Client Profile", profile_view(outputs['interview_analyzer'], 'pricing_calculator'))
+        + _section("Selected Products", outputs['product_matcher'])
+    )
+
+
+def _writer_request(user_request, outputs):
+    return (
+        _section("Client Profile", profile_view(outputs['interview_analyzer'], 'proposal_writer'))
+        + _section("Product Selection", outputs['product_matcher'])
+        + _section("Competitive Analysis", outputs['competitor_analyst'])
+        + _section("Pricing Data", outputs['pricing_calculator'])
+        + _priors(outputs)
+    )
+
+
+def _visual_request(user_request, outputs):
+    return _section("Pricing Data", outputs['pricing_calculator'])
+
+
+def _stored_proposal_assembly_request(user_request, outputs):
+    # The proposal is passed by reference; the assembler never re-emits the text.
+    return (
+        "Call create_docx with proposal_markdown='', "
+        f"proposal_artifact='{handoff_artifact_name('proposal_writer')}', "
+        "image_filenames=['investment_breakdown.png', 'value_proposition.png'] "
+        "and output_filename='Comarch_Sales_Proposal.docx'.\n\n"
+        + _section("Generated Visuals", outputs['visual_generator'])
+    )
+
+
+def _assembly_request(user_request, outputs):
+    if DOCX_STREAMING:
+        return (
+            "The proposal text has already been streamed into the document. "
+            "Call finalize_streamed_docx with "
+            "image_filenames=['investment_breakdown.png', 'value_proposition.png'] "
+            "and output_filename='Comarch_Sales_Proposal.docx'.\n\n"
+            + _section("Generated Visuals", outputs['visual_generator'])
+        )
+    return _stored_proposal_assembly_request(user_request, outputs)
+
+
+def _profile_gate(result):
+    """Stops the graph when the client profile needs human input."""
+    if result.name != 'interview_analyzer':
+        return None
+    profile = parse_json_output(result.output)
+    if not isinstance(profile, dict):
+        return "interview_analyzer did not return a valid JSON profile."
+    if profile.get('status', 'SUCCESS') != 'SUCCESS':
+        return profile.get('clarification_question') or profile.get('status')
+    return None
+
+
+def _feed_proposal_chunk(tool_context, chunk: str) -> None:
+    # Imported here so python-docx loads with the first chunk, not at start-up.
+    from .sub_agents.docx_assembler.streaming import feed_proposal_chunk
+    feed_proposal_chunk(tool_context, chunk)
+
+
+def _discard_proposal_stream(stream_id: str) -> None:
+    # Nothing to discard when no chunk has loaded the streaming module.
+    streaming = sys.modules.get(f'{__package__}.sub_agents.docx_assembler.streaming')
+    if streaming is not None:
+        streaming.discard_stream(stream_id)
+
+
+proposal_writer_phase_tool = (
+    LazyStreamingAgentTool('proposal_writer', on_text=_feed_proposal_chunk, on_close=_discard_proposal_stream)
+    if DOCX_STREAMING else proposal_writer_as_tool
+)
+
+phases = [
+    Phase('interview_analyzer', interview_analyzer_as_tool, (), _profile_request),
+    Phase('product_matcher', product_matcher_as_tool, ('interview_analyzer',), _product_request),
+    Phase('competitor_analyst', competitor_analyst_as_tool, ('interview_analyzer',), _competitor_request),
+    Phase('pricing_calculator', pricing_calculator_as_tool, ('interview_analyzer', 'product_matcher'), _pricing_request),
+    Phase('proposal_writer', proposal_writer_phase_tool,
+          ('interview_analyzer', 'product_matcher', 'competitor_analyst', 'pricing_calculator'), _writer_request),
+    Phase('visual_generator', visual_generator_agent_as_tool, ('pricing_calculator',), _visual_request),
+    Phase('docx_assembler', docx_assembler_as_tool, ('proposal_writer', 'visual_generator'), _assembly_request),
+]
+
+# Seconds each phase may take before it fails instead of stalling the graph (PHASE_BUDGETS overrides).
+PHASE_BUDGETS_S = phase_budgets({
+    'interview_analyzer': 180,
+    'product_matcher': 180,
+    'competitor_analyst': 180,
+    'pricing_calculator': 180,
+    'proposal_writer': 360,
+    'visual_generator': 240,
+    'docx_assembler': 180,
+})
+phases = [replace(phase, budget_s=PHASE_BUDGETS_S.get(phase.name)) for phase in phases]
+
+
+def _remember_proposal(outputs):
+    """Adds a completed proposal to the proposal memory."""
+    profile = parse_json_output(outputs['interview_analyzer'])
+    if proposal_memory is not None and isinstance(profile, dict):
+        proposal_memory.add(profile, _as_text(outputs['product_matcher']), _as_text(outputs['pricing_calculator']))
+
+phase_graph_agent = PhaseGraphAgent(
+    name="phase_graph_orchestrator",
+    description="Deterministic coordinator running the proposal phases as a dependency graph.",
+    phases=phases,
+    gate=_profile_gate,
+    handoff_phases=('proposal_writer',),
+    # Unchanged phases are replayed on regeneration (PHASE_MEMO_DB; empty disables).
+    memo=default_memo_store(),
+    on_complete=_remember_proposal,
+)
+
+
+# === LLM ORCHESTRATOR ===
 
 instruction = """You are the Lead Project Manager for a proposal generation system.
         Your goal is to orchestrate a team of specialized AI agents to build a Comarch sales proposal.
 
         **Workflow Management:**
-        You must trigger the sub-agents or tools in the following strict order. Pass the output of one phase as context to the next.
+        You must trigger the sub-agents or tools in the following strict order. Each tool saves its full result as a
+        session artifact and forwards it to the phases that need it, so you only get a short summary back.
+        Do not copy results into requests; pass brief instructions only.
 
         1.  **Analysis Phase:** Send user input to the interview_analyzer to get a structured client profile.
         2.  **Strategy Phase:** Once the profile is ready, trigger product_matcher AND competitor_analyst (simultaneously if possible).
-        3.  **Pricing Phase:** Pass the selected products to the pricing_calculator.
-        4.  **Creation Phase:** Provide all accumulated data to the proposal_writer (for text) and visual_generator (for assets).
+        3.  **Pricing Phase:** Once the products are selected, trigger the pricing_calculator.
+        4.  **Creation Phase:** Trigger the proposal_writer (for text) and visual_generator (for assets).
         5.  **Assembly Phase:** Finally, use docx_assembler to combine the proposal text and generated images into a final DOCX document.
 
+        If interview_analyzer's profile status is not SUCCESS, stop and ask the user its clarification_question.
+
         **Constraints:**
         Do not generate the final proposal content yourself.
         If a sub-agent or tool returns incomplete data, flag it for human review."""
 
 
+# The same phases, as tools that keep the bulky outputs out of the orchestrator's context.
+handoff_tools = [
+    HandoffAgentTool(
+        phase.name,
+        inputs=phase.depends_on,
+        build_request=_stored_proposal_assembly_request if phase.name == 'docx_assembler' else phase.build_request,
+    )
+    for phase in phases
+]
 
-competitor_analyst_as_tool = agent_tool.AgentTool(agent=competitor_analyst_agent)
-interview_analyzer_as_tool = agent_tool.AgentTool(agent=interview_analyzer_agent)
-proposal_writer_as_tool = agent_tool.AgentTool(agent=proposal_writer_agent)
-pricing_calculator_as_tool = agent_tool.AgentTool(agent=pricing_calculator_agent)
-product_matcher_as_tool = agent_tool.AgentTool(agent=product_matcher_agent)
-visual_generator_agent_as_tool = agent_tool.AgentTool(agent=visual_generator_agent)
-docx_assembler_as_tool = agent_tool.AgentTool(agent=docx_assembler_agent)
-
-orchestrator_agent  = Agent(
-    model='gemini-2.5-flash',
+orchestrator_agent = Agent(
+    model=model_for('orchestrator'),
     name="orchestrator",
     description="Project Manager responsible for coordinating the proposal generation workflow.",
     instruction = instruction,
-    tools = [
-        interview_analyzer_as_tool,
-        product_matcher_as_tool,
-        competitor_analyst_as_tool,
-        pricing_calculator_as_tool,
-        proposal_writer_as_tool,
-        visual_generator_agent_as_tool,
-        docx_assembler_as_tool
-    ]
+    tools = handoff_tools,
 )
+harden_models(orchestrator_agent)
+route_models(orchestrator_agent)
+
+
+root_agent = phase_graph_agent if ORCHESTRATOR_MODE == 'graph' else orchestrator_agent
 
-root_agent = orchestrator_agent
+# Loaded by `adk web` / `adk run` in preference to root_agent, so traces are always recorded.
+app = App(name='sales_agent', root_agent=root_agent, plugins=[TracingPlugin()])
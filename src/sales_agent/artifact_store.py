@@ -0,0 +1,351 @@
+"""
+Local content-addressed artifact service.
+
+Artifact bytes (charts, Imagen images, the DOCX) are written once per SHA-256
+digest under ARTIFACT_STORE_DIR/blobs/, so an image produced by many sessions
+is stored once, and they stay on disk instead of in the process heap. A SQLite
+index maps (app, user, session, filename, version) to a digest and counts the
+references of every blob; a blob is deleted when its last reference goes.
+Reads are served from a memory map of the blob file: `open_artifact` hands
+out a zero-copy memoryview, `load_artifact` a regular `types.Part`.
+
+Sessions (and user scopes) that have not saved anything for
+ARTIFACT_TTL_HOURS are expired by `collect_garbage`, which also runs
+periodically on save:
+
+    python -m sales_agent.artifact_store stats
+    python -m sales_agent.artifact_store gc [--ttl-hours 24]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Optional
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.artifacts import artifact_util
+from google.adk.artifacts.base_artifact_service import ArtifactVersion, BaseArtifactService
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_STORE_DIR = os.getenv('ARTIFACT_STORE_DIR', '.cache/artifacts')  # empty keeps artifacts in memory
+ARTIFACT_TTL_HOURS = float(os.getenv('ARTIFACT_TTL_HOURS', '24'))
+ARTIFACT_GC_INTERVAL_S = float(os.getenv('ARTIFACT_GC_INTERVAL_S', '600'))
+
+_USER_SCOPE = ''  # `session` column of user-scoped ('user:...') artifacts
+
+
+def _scope(filename: str, session_id: Optional[str]) -> str:
+    if filename.startswith('user:'):
+        return _USER_SCOPE
+    if session_id is None:
+        raise ValueError("Session ID must be provided for session-scoped artifacts.")
+    return session_id
+
+
+class ContentAddressedArtifactService(BaseArtifactService):
+    """ADK artifact service storing blobs by content hash on the local filesystem."""
+
+    def __init__(self, root: str = ARTIFACT_STORE_DIR, ttl_hours: float = ARTIFACT_TTL_HOURS,
+                 gc_interval_s: float = ARTIFACT_GC_INTERVAL_S):
+        self.root = os.path.abspath(root)
+        self.ttl_seconds = ttl_hours * 3600
+        self.gc_interval_s = gc_interval_s
+        self._blob_dir = os.path.join(self.root, 'blobs')
+        os.makedirs(self._blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_gc = time.time()
+        self._db = sqlite3.connect(os.path.join(self.root, 'index.sqlite3'), check_same_thread=False, isolation_level=None)
+        self._db.executescript(
+            'PRAGMA journal_mode=WAL;'
+            'CREATE TABLE IF NOT EXISTS versions ('
+            ' app TEXT, user TEXT, session TEXT, filename TEXT, version INTEGER,'
+            ' digest TEXT, kind TEXT, mime_type TEXT, file_uri TEXT, custom_metadata TEXT, created_at REAL,'
+            ' PRIMARY KEY (app, user, session, filename, version));'
+            'CREATE INDEX IF NOT EXISTS versions_digest ON versions (digest);'
+            'CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER, refs INTEGER);'
+        )
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    # === WRITES ===
+
+    def _write_blob(self, digest: str, data: bytes) -> None:
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def _release(self, digests: list) -> int:
+        """Drops one reference per digest; deletes blobs left unreferenced. Call inside a transaction."""
+        for digest in digests:
+            if digest:
+                self._db.execute('UPDATE blobs SET refs = refs - 1 WHERE digest = ?', (digest,))
+        doomed = [row[0] for row in self._db.execute('SELECT digest FROM blobs WHERE refs <= 0')]
+        for digest in doomed:
+            self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+        return len(doomed)
+
+    def _save(self, app_name, user_id, filename, artifact, session_id, custom_metadata) -> int:
+        scope = _scope(filename, session_id)
+        digest = data = file_uri = None
+        if artifact.inline_data is not None:
+            kind, mime_type, data = 'bytes', artifact.inline_data.mime_type, artifact.inline_data.data or b''
+        elif artifact.text is not None:
+            kind, mime_type, data = 'text', 'text/plain', artifact.text.encode('utf-8')
+        elif artifact.file_data is not None:
+            kind, mime_type, file_uri = 'file', artifact.file_data.mime_type, artifact.file_data.file_uri
+            if artifact_util.is_artifact_ref(artifact) and not artifact_util.parse_artifact_uri(file_uri):
+                raise ValueError(f"Invalid artifact reference URI: {file_uri}")
+        else:
+            raise ValueError("Not supported artifact type.")
+        if data is not None:
+            digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute(
+                    'SELECT MAX(version) FROM versions WHERE app = ? AND user = ? AND session = ? AND filename = ?',
+                    (app_name, user_id, scope, filename),
+                ).fetchone()
+                version = 0 if row[0] is None else row[0] + 1
+                if digest:
+                    # Written under the index lock, so a concurrent GC cannot unlink it before it is referenced.
+                    self._write_blob(digest, data)
+                    self._db.execute(
+                        'INSERT INTO blobs (digest, size, refs) VALUES (?, ?, 1)'
+                        ' ON CONFLICT (digest) DO UPDATE SET refs = refs + 1',
+                        (digest, len(data)),
+                    )
+                self._db.execute(
+                    'INSERT INTO versions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        app_name, user_id, scope, filename, version, digest, kind, mime_type, file_uri,
+                        json.dumps(custom_metadata or {}), time.time(),
+                    ),
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return version
+
+    async def save_artifact(self, *, app_name: str, user_id: str, filename: str, artifact: types.Part,
+                            session_id: Optional[str] = None, custom_metadata: Optional[dict[str, Any]] = None) -> int:
+        version = await asyncio.to_thread(self._save, app_name, user_id, filename, artifact, session_id, custom_metadata)
+        if time.time() - self._last_gc > self.gc_interval_s:
+            self._last_gc = time.time()
+            await asyncio.to_thread(self.collect_garbage)
+        return version
+
+    # === READS ===
+
+    def _row(self, app_name, user_id, filename, session_id, version):
+        scope = _scope(filename, session_id)
+        query = (
+            'SELECT version, digest, kind, mime_type, file_uri, custom_metadata, created_at FROM versions'
+            ' WHERE app = ? AND user = ? AND session = ? AND filename = ?'
+        )
+        params = [app_name, user_id, scope, filename]
+        if version is None:
+            query += ' ORDER BY version DESC LIMIT 1'
+        else:
+            query += ' AND version = ?'
+            params.append(version)
+        with self._lock:
+            return self._db.execute(query, params).fetchone()
+
+    def _map(self, digest: str) -> memoryview:
+        with open(self.blob_path(digest), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b'')
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def open_artifact(self, *, app_name: str, user_id: str, filename: str,
+                      session_id: Optional[str] = None, version: Optional[int] = None):
+        """
+        Zero-copy read: (memoryview over the mapped blob, mime type), or None.
+
+        The mapping stays valid after the artifact is deleted; release the view when done.
+        """
+        row = self._row(app_name, user_id, filename, session_id, version)
+        if row is None or not row[1]:
+            return None
+        return self._map(row[1]), row[3]
+
+    async def load_artifact(self, *, app_name: str, user_id: str, filename: str,
+                            session_id: Optional[str] = None, version: Optional[int] = None) -> Optional[types.Part]:
+        row = self._row(app_name, user_id, filename, session_id, version)
+        if row is None:
+            return None
+        _, digest, kind, mime_type, file_uri, _, _ = row
+        if kind == 'file':
+            part = types.Part(file_data=types.FileData(file_uri=file_uri, mime_type=mime_type))
+            if not artifact_util.is_artifact_ref(part):
+                return part
+            ref = artifact_util.parse_artifact_uri(file_uri)
+            return await self.load_artifact(
+                app_name=ref.app_name, user_id=ref.user_id, filename=ref.filename,
+                session_id=ref.session_id, version=ref.version,
+            )
+        view = await asyncio.to_thread(self._map, digest)
+        if not view:
+            return None  # empty artifacts read as missing, as in ADK's in-memory service
+        with view:
+            # Parts are pydantic models validated as bytes: one copy out of the page cache.
+            if kind == 'text':
+                return types.Part(text=str(view, 'utf-8'))
+            return types.Part(inline_data=types.Blob(data=view.tobytes(), mime_type=mime_type))
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: Optional[str] = None) -> list[str]:
+        scopes = [_USER_SCOPE] + ([session_id] if session_id else [])
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT DISTINCT filename FROM versions WHERE app = ? AND user = ? AND session IN ({', '.join('?' * len(scopes))})",
+                (app_name, user_id, *scopes),
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, filename: str,
+                              session_id: Optional[str] = None) -> None:
+        scope = _scope(filename, session_id)
+        where = 'app = ? AND user = ? AND session = ? AND filename = ?'
+        await asyncio.to_thread(self._delete_where, where, (app_name, user_id, scope, filename))
+
+    async def list_versions(self, *, app_name: str, user_id: str, filename: str,
+                            session_id: Optional[str] = None) -> list[int]:
+        return [v.version for v in await self.list_artifact_versions(
+            app_name=app_name, user_id=user_id, filename=filename, session_id=session_id)]
+
+    def _version(self, row) -> ArtifactVersion:
+        version, digest, kind, mime_type, file_uri, custom_metadata, created_at = row
+        return ArtifactVersion(
+            version=version,
+            canonical_uri=file_uri if kind == 'file' else f'file://{self.blob_path(digest)}',
+            custom_metadata=json.loads(custom_metadata),
+            create_time=created_at,
+            mime_type=mime_type,
+        )
+
+    async def list_artifact_versions(self, *, app_name: str, user_id: str, filename: str,
+                                     session_id: Optional[str] = None) -> list[ArtifactVersion]:
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT version, digest, kind, mime_type, file_uri, custom_metadata, created_at FROM versions'
+                ' WHERE app = ? AND user = ? AND session = ? AND filename = ? ORDER BY version',
+                (app_name, user_id, _scope(filename, session_id), filename),
+            ).fetchall()
+        return [self._version(row) for row in rows]
+
+    async def get_artifact_version(self, *, app_name: str, user_id: str, filename: str,
+                                   session_id: Optional[str] = None, version: Optional[int] = None) -> Optional[ArtifactVersion]:
+        row = self._row(app_name, user_id, filename, session_id, version)
+        return self._version(row) if row else None
+
+    # === GARBAGE COLLECTION ===
+
+    def _delete_where(self, where: str, params: tuple) -> tuple:
+        """Deletes matching versions and releases their blobs; returns (versions, blobs) removed."""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                digests = [row[0] for row in self._db.execute(f'SELECT digest FROM versions WHERE {where}', params)]
+                self._db.execute(f'DELETE FROM versions WHERE {where}', params)
+                blobs = self._release(digests)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return len(digests), blobs
+
+    def collect_garbage(self, ttl_hours: float = None) -> dict:
+        """Expires sessions and user scopes idle for longer than the TTL, then sweeps orphaned blob files."""
+        ttl_seconds = self.ttl_seconds if ttl_hours is None else ttl_hours * 3600
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            expired = self._db.execute(
+                'SELECT app, user, session FROM versions GROUP BY app, user, session HAVING MAX(created_at) < ?',
+                (cutoff,),
+            ).fetchall()
+        removed_versions = removed_blobs = 0
+        for scope in expired:
+            versions, blobs = self._delete_where('app = ? AND user = ? AND session = ?', scope)
+            removed_versions += versions
+            removed_blobs += blobs
+
+        # Files left by a crash between writing a blob and committing its reference.
+        orphans = 0
+        with self._lock:
+            known = {row[0] for row in self._db.execute('SELECT digest FROM blobs')}
+            for directory, _, names in os.walk(self._blob_dir):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    if name not in known and os.path.getmtime(path) < time.time() - 3600:
+                        os.remove(path)
+                        orphans += 1
+        result = {'expired_scopes': len(expired), 'versions': removed_versions, 'blobs': removed_blobs, 'orphans': orphans}
+        if any(result.values()):
+            logger.info(f"✓ Artifact GC: {result}")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            versions, referenced = self._db.execute('SELECT COUNT(*), COUNT(digest) FROM versions').fetchone()
+            blobs, stored_bytes, logical_bytes = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * refs), 0) FROM blobs'
+            ).fetchone()
+        return {
+            'versions': versions,
+            'blobs': blobs,
+            'stored_bytes': stored_bytes,
+            'logical_bytes': logical_bytes,
+            'dedup_ratio': round(logical_bytes / stored_bytes, 2) if stored_bytes else 1.0,
+            'references': referenced,
+        }
+
+
+def default_artifact_service() -> BaseArtifactService:
+    """The store under ARTIFACT_STORE_DIR, or ADK's in-memory service when it is empty."""
+    if not ARTIFACT_STORE_DIR:
+        return InMemoryArtifactService()
+    return ContentAddressedArtifactService(ARTIFACT_STORE_DIR)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sales_agent.artifact_store', description="Inspect or collect the local artifact store.")
+    parser.add_argument('--dir', default=ARTIFACT_STORE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Versions, blobs and deduplication of the store.")
+    gc = commands.add_parser('gc', help="Expire idle sessions and delete unreferenced blobs.")
+    gc.add_argument('--ttl-hours', type=float, default=ARTIFACT_TTL_HOURS)
+    args = parser.parse_args(argv)
+
+    if not args.dir:
+        print("The artifact store is disabled (ARTIFACT_STORE_DIR is empty).", file=sys.stderr)
+        return 1
+    store = ContentAddressedArtifactService(args.dir)
+    result = store.stats() if args.command == 'stats' else store.collect_garbage(args.ttl_hours)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
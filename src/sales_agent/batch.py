@@ -0,0 +1,207 @@
+"""Batch proposal generation for many clients at once.
+
+    python -m sales_agent.batch --input interview_notes/ --output proposals/ --concurrency 8
+    python -m sales_agent.batch --input clients.jsonl --output proposals/
+
+A directory input holds one .txt/.md file of interview notes per client; a
+JSONL input holds one {"client_id": ..., "notes": ...} object per line.
+Every client gets its own session; all sessions share one RateLimitPlugin,
+so the combined load stays within the Gemini, Imagen and search quotas.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+
+from dotenv import load_dotenv
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from .artifact_store import default_artifact_service
+from .rate_limits import RateLimitPlugin, RateLimiter, is_rate_limit_error
+from .tracing import TracingPlugin
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = 'sales_agent'
+START_JITTER_SECONDS = 2.0
+
+
+class RateLimitedRun(Exception):
+    """The phase graph stopped on a phase that failed with a 429, so the whole session is retried."""
+    code = 429
+
+
+def load_clients(path: str) -> list:
+    """Reads client inputs from a directory of notes or a JSONL file."""
+    clients = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if os.path.splitext(name)[1].lower() in ('.txt', '.md'):
+                with open(os.path.join(path, name), encoding='utf-8') as f:
+                    clients.append({'client_id': os.path.splitext(name)[0], 'notes': f.read()})
+    else:
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                notes = record.get('notes') or record.get('input') or record.get('text')
+                if not notes:
+                    raise ValueError(f"{path}:{number}: missing 'notes'")
+                clients.append({'client_id': str(record.get('client_id') or f'client_{number}'), 'notes': notes})
+
+    seen = set()
+    for client in clients:
+        client['client_id'] = re.sub(r'[^\w\-]+', '_', client['client_id'])
+        if client['client_id'] in seen:
+            raise ValueError(f"Duplicate client_id: {client['client_id']}")
+        seen.add(client['client_id'])
+    return clients
+
+
+def build_runner(agent, limiter: RateLimiter) -> Runner:
+    """A runner with in-memory sessions whose artifacts go to the configured artifact store."""
+    return Runner(
+        app_name=APP_NAME,
+        agent=agent,
+        artifact_service=default_artifact_service(),
+        session_service=InMemorySessionService(),
+        memory_service=InMemoryMemoryService(),
+        plugins=[RateLimitPlugin(limiter), TracingPlugin()],
+    )
+
+
+async def _run_session(runner, client: dict) -> tuple:
+    """Runs one proposal session; returns (final text, DOCX bytes or None)."""
+    # A user id per attempt: the DOCX and images are user-scoped, so a fixed id would find an earlier run's files.
+    user_id = f"batch-{client['client_id']}-{uuid.uuid4().hex[:12]}"
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    message = types.Content(role='user', parts=[types.Part.from_text(text=client['notes'])])
+
+    try:
+        final_text = ''
+        async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+            # PhaseGraphAgent turns phase errors into a human-review stop; a rate-limited phase is worth a retry.
+            if event.custom_metadata and event.custom_metadata.get('rate_limited'):
+                raise RateLimitedRun(f"Phase '{event.custom_metadata['halted_phase']}' was rate limited")
+            if event.content and event.content.parts and not event.partial:
+                text = '\n'.join(p.text for p in event.content.parts if p.text)
+                final_text = text or final_text
+
+        return final_text, await load_docx_artifact(runner, user_id, session.id)
+    finally:
+        try:
+            await cleanup_session(runner, user_id, session.id)
+        except Exception as e:
+            logger.warning(f"⚠ Could not clean up the session of {client['client_id']}: {e}")
+
+
+async def cleanup_session(runner, user_id: str, session_id: str) -> None:
+    """Drops a session and its artifacts (and their unshared blobs) once the DOCX has been copied out."""
+    artifacts, scope = runner.artifact_service, {'app_name': runner.app_name, 'user_id': user_id, 'session_id': session_id}
+    for filename in await artifacts.list_artifact_keys(**scope):
+        await artifacts.delete_artifact(**scope, filename=filename)
+    await runner.session_service.delete_session(**scope)
+
+
+async def load_docx_artifact(runner, user_id: str, session_id: str):
+    """Returns the bytes of the DOCX a session produced, or None."""
+    artifact_keys = await runner.artifact_service.list_artifact_keys(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+    docx_keys = [key for key in artifact_keys if key.lower().endswith('.docx')]
+    if not docx_keys:
+        return None
+    part = await runner.artifact_service.load_artifact(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id, filename=docx_keys[-1]
+    )
+    return part.inline_data.data if part and part.inline_data else None
+
+
+async def run_batch(clients: list, output_dir: str, concurrency: int = 4, max_attempts: int = 3,
+                    agent=None, limiter: RateLimiter = None) -> dict:
+    """Generates one DOCX per client concurrently and writes a summary manifest."""
+    if agent is None:
+        from .agent import root_agent as agent
+    limiter = limiter or RateLimiter()
+    runner = build_runner(agent, limiter)
+    semaphore = asyncio.Semaphore(concurrency)
+    os.makedirs(output_dir, exist_ok=True)
+
+    async def process(client: dict) -> dict:
+        # Stagger the first requests so the batch does not start as a thundering herd.
+        await asyncio.sleep(random.uniform(0, START_JITTER_SECONDS))
+        entry = {'client_id': client['client_id'], 'status': 'failed', 'attempts': 0}
+        async with semaphore:
+            started = time.perf_counter()
+            for attempt in range(1, max_attempts + 1):
+                entry['attempts'] = attempt
+                try:
+                    final_text, docx_bytes = await _run_session(runner, client)
+                except Exception as e:
+                    entry['error'] = str(e)
+                    if is_rate_limit_error(e) and attempt < max_attempts:
+                        backoff = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+                        logger.warning(f"⚠ {client['client_id']}: rate limited, retrying in {backoff:.1f}s")
+                        await asyncio.sleep(backoff)
+                        continue
+                    logger.error(f"❌ {client['client_id']}: {e}")
+                    break
+
+                entry.pop('error', None)
+                entry['summary'] = final_text[:500]
+                if docx_bytes:
+                    path = os.path.join(output_dir, f"{client['client_id']}.docx")
+                    with open(path, 'wb') as f:
+                        f.write(docx_bytes)
+                    entry.update(status='success', output=path, size_bytes=len(docx_bytes))
+                else:
+                    # e.g. the profile needs human confirmation
+                    entry['status'] = 'needs_review'
+                break
+            entry['duration_s'] = round(time.perf_counter() - started, 2)
+        logger.info(f"{client['client_id']}: {entry['status']} in {entry['duration_s']}s")
+        return entry
+
+    started = time.perf_counter()
+    entries = await asyncio.gather(*(process(client) for client in clients))
+    manifest = {
+        'clients': len(clients),
+        'succeeded': sum(entry['status'] == 'success' for entry in entries),
+        'needs_review': sum(entry['status'] == 'needs_review' for entry in entries),
+        'failed': sum(entry['status'] == 'failed' for entry in entries),
+        'duration_s': round(time.perf_counter() - started, 2),
+        'concurrency': concurrency,
+        'rate_limits': limiter.stats(),
+        'results': entries,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate proposals for many clients concurrently.")
+    parser.add_argument('--input', required=True, help="Directory of .txt/.md notes or a JSONL file.")
+    parser.add_argument('--output', required=True, help="Directory for the DOCX files and manifest.json.")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('BATCH_CONCURRENCY', '4')))
+    parser.add_argument('--max-attempts', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+    clients = load_clients(args.input)
+    manifest = asyncio.run(run_batch(clients, args.output, args.concurrency, args.max_attempts))
+    print(json.dumps({k: v for k, v in manifest.items() if k != 'results'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
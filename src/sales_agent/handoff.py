@@ -0,0 +1,133 @@
+"""
+Typed, compact hand-off between proposal phases.
+
+The client profile is a schema-validated object (`ClientProfile`, the
+interview_analyzer's output_schema), and each downstream phase receives only
+the profile fields it uses (`profile_view`). Bulky phase outputs (product
+matches, competitor analysis, pricing tables, the proposal itself) are stored
+as session artifacts named by `handoff_artifact_name`; in the LLM-orchestrated
+mode HandoffAgentTool returns only a short summary and a reference to the
+orchestrator, and feeds the stored bodies straight to the phases that need them.
+"""
+import json
+import logging
+from typing import Callable, Literal, Optional
+
+from google.adk.tools import ToolContext
+from google.genai import types
+from pydantic import BaseModel, Field
+
+from .pipeline import handoff_artifact_name, parse_json_output
+from .registry import LazyAgentTool
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CHARS = 300
+
+
+class ClientProfile(BaseModel):
+    """The validated client profile produced by interview_analyzer."""
+    status: Literal['SUCCESS', 'NEEDS_CONFIRMATION', 'MISSING_DATA']
+    client_name: Optional[str] = None
+    verification_source: Optional[str] = None
+    industry_context: Optional[str] = None
+    pain_points: list[str] = Field(default_factory=list)
+    business_goals: list[str] = Field(default_factory=list)
+    user_count: Optional[int] = Field(default=None, description="Number of users/seats mentioned in the notes.")
+    deployment_preference: Optional[str] = Field(default=None, description="'saas', 'on_premise' or null if not stated.")
+    contract_term_years: Optional[int] = None
+    budget: Optional[str] = Field(default=None, description="Budget as stated, with currency.")
+    confirmation_needed: bool = False
+    reason: Optional[str] = None
+    options_found: list[str] = Field(default_factory=list)
+    missing_fields: list[str] = Field(default_factory=list)
+    clarification_question: Optional[str] = None
+
+
+# The profile fields each phase actually uses.
+PROFILE_FIELDS = {
+    'product_matcher': ('client_name', 'industry_context', 'pain_points', 'business_goals', 'deployment_preference'),
+    'competitor_analyst': ('client_name', 'industry_context', 'pain_points', 'business_goals'),
+    'pricing_calculator': ('client_name', 'user_count', 'deployment_preference', 'contract_term_years', 'budget'),
+    'proposal_writer': (
+        'client_name', 'industry_context', 'pain_points', 'business_goals',
+        'user_count', 'deployment_preference', 'contract_term_years', 'budget',
+    ),
+}
+
+
+def profile_view(profile, phase: str) -> str:
+    """The compact JSON of the profile fields `phase` needs (empty fields dropped)."""
+    parsed = parse_json_output(profile)
+    if not isinstance(parsed, dict):
+        return profile if isinstance(profile, str) else json.dumps(profile, ensure_ascii=False)
+    fields = PROFILE_FIELDS.get(phase) or tuple(parsed)
+    view = {field: parsed[field] for field in fields if parsed.get(field) not in (None, '', [])}
+    return json.dumps(view, ensure_ascii=False, separators=(',', ':'))
+
+
+def _as_text(output) -> str:
+    return output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+
+
+def summarize_output(phase: str, output) -> dict:
+    """What the orchestrator model gets back instead of the full phase output."""
+    profile = parse_json_output(output) if phase == 'interview_analyzer' else None
+    if isinstance(profile, dict):
+        keep = ('status', 'client_name', 'clarification_question', 'options_found', 'missing_fields')
+        return {'profile': {key: profile[key] for key in keep if profile.get(key)}}
+    text = _as_text(output)
+    return {'preview': text[:PREVIEW_CHARS] + ('…' if len(text) > PREVIEW_CHARS else ''), 'chars': len(text)}
+
+
+class HandoffAgentTool(LazyAgentTool):
+    """
+    Phase tool for the LLM orchestrator that keeps bulky outputs out of its context.
+
+    The full output is saved as a session artifact and only a summary plus the
+    artifact name is returned. The outputs of the phases in `inputs` are loaded
+    from their artifacts and passed to the sub-agent by `build_request`, so the
+    orchestrator never has to copy them into the request itself.
+    """
+
+    def __init__(self, name: str, inputs: tuple = (), build_request: Callable[[str, dict], str] = None):
+        super().__init__(name)
+        self.inputs = inputs
+        self.build_request = build_request
+
+    @property
+    def description(self) -> str:
+        return (
+            f"{self.agent.description} Results of earlier phases are forwarded automatically; "
+            "pass only the task and any extra guidance as `request`."
+        )
+
+    @description.setter
+    def description(self, value):
+        pass
+
+    async def _load_inputs(self, tool_context: ToolContext) -> tuple:
+        outputs, missing = {}, []
+        for phase in self.inputs:
+            part = await tool_context.load_artifact(handoff_artifact_name(phase))
+            if part is None or not part.text:
+                missing.append(phase)
+            else:
+                outputs[phase] = part.text
+        return outputs, missing
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        request = args.get('request', '')
+        if self.inputs:
+            outputs, missing = await self._load_inputs(tool_context)
+            if missing:
+                return {'status': 'failed', 'message': f"Run {', '.join(missing)} before {self.name}."}
+            request = self.build_request(request, outputs) + f"**Orchestrator Notes:**\n{request}\n"
+        elif self.build_request:
+            request = self.build_request(request, {})
+
+        output = await super().run_async(args={'request': request}, tool_context=tool_context)
+        artifact = handoff_artifact_name(self.name)
+        version = await tool_context.save_artifact(artifact, types.Part.from_text(text=_as_text(output)))
+        logger.info(f"✓ Hand-off '{artifact}' v{version}: {len(_as_text(output))} chars kept out of the orchestrator context")
+        return {'status': 'success', 'artifact': artifact, **summarize_output(self.name, output)}
@@ -0,0 +1,213 @@
+"""Background proposal jobs for the HTTP API.
+
+Jobs run on one asyncio event loop in a background thread, at most
+JOB_CONCURRENCY at a time, so a request thread only submits a job and
+returns. Progress events are kept per job for Server-Sent Events; the store
+holds at most MAX_JOBS jobs and evicts the oldest finished ones first.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+
+from google.genai import types
+
+from .batch import APP_NAME, build_runner, cleanup_session, load_docx_artifact
+from .memo import RECOMPUTE_STATE_KEY
+from .rate_limits import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '4'))
+MAX_JOBS = int(os.getenv('MAX_JOBS', '200'))
+MAX_NOTES_CHARS = int(os.getenv('MAX_NOTES_CHARS', '200000'))
+
+FINISHED = ('succeeded', 'needs_review', 'failed')
+
+
+class JobStoreFull(Exception):
+    """Raised when every slot in the job store holds an unfinished job."""
+
+
+@dataclass
+class Job:
+    id: str
+    notes: str
+    client_id: str = ''
+    recompute: tuple = ()
+    status: str = 'queued'
+    created: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    summary: str = ''
+    error: str = None
+    docx: bytes = field(default=None, repr=False)
+    events: list = field(default_factory=list, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'client_id': self.client_id,
+            'status': self.status,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'duration_s': round(self.finished - self.started, 2) if self.finished and self.started else None,
+            'summary': self.summary,
+            'error': self.error,
+            'recompute': list(self.recompute),
+            'docx_ready': self.docx is not None,
+            'events': len(self.events),
+        }
+
+
+def _progress(event) -> list:
+    """Turns a runner event into zero or more small progress records."""
+    records = []
+    if event.custom_metadata and 'phase' in event.custom_metadata:
+        records.append({'type': 'phase', **event.custom_metadata})
+    for call in event.get_function_calls():
+        records.append({'type': 'tool_call', 'tool': call.name})
+    for response in event.get_function_responses():
+        records.append({'type': 'tool_result', 'tool': response.name})
+    return records
+
+
+class JobManager:
+    """Runs proposal jobs on a background event loop and tracks their progress."""
+
+    def __init__(self, agent=None, concurrency: int = JOB_CONCURRENCY, max_jobs: int = MAX_JOBS,
+                 limiter: RateLimiter = None):
+        self._agent = agent
+        self.concurrency = concurrency
+        self.max_jobs = max_jobs
+        self.limiter = limiter or RateLimiter()
+        self._jobs = OrderedDict()
+        self._changed = threading.Condition()
+        self._loop = None
+        self._runner = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._loop:
+                return
+            agent = self._agent
+            if agent is None:
+                from .agent import root_agent as agent
+            self._runner = build_runner(agent, self.limiter)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name='proposal-jobs', daemon=True).start()
+            logger.info(f"🟢 Job worker started (concurrency={self.concurrency}, max_jobs={self.max_jobs})")
+
+    def submit(self, notes: str, client_id: str = '', recompute: list = ()) -> Job:
+        """Queues a job; `recompute` names phases to run even if memoised ('*' for all)."""
+        if not isinstance(notes, str) or not isinstance(client_id, str):
+            raise ValueError("'notes' and 'client_id' must be strings")
+        if not notes.strip():
+            raise ValueError("'notes' must not be empty")
+        if len(notes) > MAX_NOTES_CHARS:
+            raise ValueError(f"'notes' exceeds {MAX_NOTES_CHARS} characters")
+        if not isinstance(recompute, (list, tuple)) or not all(isinstance(name, str) for name in recompute):
+            raise ValueError("'recompute' must be a list of phase names")
+        self._ensure_started()
+
+        job = Job(id=uuid.uuid4().hex, notes=notes, client_id=client_id, recompute=tuple(recompute))
+        with self._changed:
+            if len(self._jobs) >= self.max_jobs:
+                finished = [job_id for job_id, old in self._jobs.items() if old.status in FINISHED]
+                if not finished:
+                    raise JobStoreFull(f"{self.max_jobs} jobs are already queued or running")
+                del self._jobs[finished[0]]
+            self._jobs[job.id] = job
+            self._record(job, {'type': 'status', 'status': job.status})
+        asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._changed:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'jobs': len(statuses),
+            **{status: statuses.count(status) for status in ('queued', 'running', *FINISHED)},
+            'concurrency': self.concurrency,
+            'max_jobs': self.max_jobs,
+        }
+
+    def _record(self, job: Job, record: dict) -> None:
+        """Appends a progress record and wakes up the SSE streams waiting on it."""
+        with self._changed:
+            job.events.append({'t': round(time.time() - job.created, 3), **record})
+            self._changed.notify_all()
+
+    def _set_status(self, job: Job, status: str, **fields) -> None:
+        with self._changed:
+            job.status = status
+            for name, value in fields.items():
+                setattr(job, name, value)
+        self._record(job, {'type': 'status', 'status': status, **({'error': job.error} if job.error else {})})
+
+    async def _run(self, job: Job) -> None:
+        async with self._semaphore:
+            self._set_status(job, 'running', started=time.time())
+            user_id = f"job-{job.id}"
+            session = None
+            try:
+                session = await self._runner.session_service.create_session(
+                    app_name=APP_NAME, user_id=user_id,
+                    state={RECOMPUTE_STATE_KEY: list(job.recompute)} if job.recompute else None,
+                )
+                message = types.Content(role='user', parts=[types.Part.from_text(text=job.notes)])
+                async for event in self._runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                    for record in _progress(event):
+                        self._record(job, record)
+                    if event.content and event.content.parts and not event.partial:
+                        text = '\n'.join(p.text for p in event.content.parts if p.text)
+                        job.summary = text or job.summary
+                docx = await load_docx_artifact(self._runner, user_id, session.id)
+            except Exception as e:
+                logger.error(f"❌ Job {job.id} failed: {e}")
+                self._set_status(job, 'failed', finished=time.time(), error=str(e))
+                return
+            finally:
+                # Failed and cancelled runs leave sessions and artifacts too.
+                if session is not None:
+                    try:
+                        await cleanup_session(self._runner, user_id, session.id)
+                    except Exception as e:
+                        logger.warning(f"⚠ Could not clean up job {job.id}: {e}")
+            job.notes = ''
+            self._set_status(job, 'succeeded' if docx else 'needs_review', finished=time.time(), docx=docx)
+
+    def stream(self, job_id: str, after: int = 0, keepalive: float = 15.0):
+        """
+        Yields (index, record) for every progress record after `after`, blocking
+        until the job finishes. Yields (None, None) after `keepalive` seconds of silence.
+        """
+        index = after
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if index >= len(job.events) and job.status not in FINISHED:
+                    self._changed.wait(timeout=keepalive)
+                pending = job.events[index:]
+                done = job.status in FINISHED
+            if not pending and not done:
+                yield None, None
+            for record in pending:
+                index += 1
+                yield index, record
+            if done and index >= len(job.events):
+                return
@@ -0,0 +1,260 @@
+"""
+Memoised phase outputs for incremental re-generation.
+
+A phase's key hashes its agent configuration (model, instruction, tools,
+output schema...), its request and the digests of the upstream phases it
+depends on. Function tools that read mutable data (the rate card, the
+competitor matrix, the local index, the entity cache) expose a
+`data_version()` that is hashed too, so rebuilding that data re-runs them. When an edited proposal is regenerated, phases whose key is
+unchanged are replayed from the store: their output, state changes and saved
+artifacts (charts, the DOCX) are restored without calling the model. Only the
+phases downstream of the change run again, as in a build system.
+
+    python -m sales_agent.memo stats
+    python -m sales_agent.memo invalidate [--phase product_matcher]
+"""
+import abc
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+PHASE_MEMO_DB = os.getenv('PHASE_MEMO_DB', '.cache/phases.sqlite3')  # empty disables memoisation
+PHASE_MEMO_TTL_DAYS = float(os.getenv('PHASE_MEMO_TTL_DAYS', '7'))
+
+# Session state key listing phases to recompute even when memoised ('*' for all).
+RECOMPUTE_STATE_KEY = 'recompute_phases'
+
+
+def _sha256(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _to_text(output) -> str:
+    return output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, sort_keys=True)
+
+
+def agent_fingerprint(agent) -> dict:
+    """The parts of an agent's configuration that change what it produces."""
+    from google.adk.tools.agent_tool import AgentTool
+
+    model = getattr(agent, 'model', None)
+    instruction = getattr(agent, 'instruction', '')
+    schema = getattr(agent, 'output_schema', None)
+    config = getattr(agent, 'generate_content_config', None)
+    tools = []
+    for tool in getattr(agent, 'tools', None) or []:
+        if isinstance(tool, AgentTool):
+            tools.append({'agent_tool': agent_fingerprint(tool.agent)})
+        else:
+            name = getattr(tool, 'name', None) or getattr(tool, '__name__', type(tool).__name__)
+            data_version = getattr(tool, 'data_version', None) or getattr(getattr(tool, 'func', None), 'data_version', None)
+            tools.append({'name': name, 'data': data_version()} if data_version else name)
+    return {
+        'name': agent.name,
+        'model': model if isinstance(model, str) else getattr(model, 'model', type(model).__name__),
+        'instruction': instruction if isinstance(instruction, str) else getattr(instruction, '__qualname__', ''),
+        'tools': tools,
+        'output_schema': schema.model_json_schema() if schema else None,
+        'config': config.model_dump(exclude_none=True, mode='json') if config else None,
+        'sub_agents': [agent_fingerprint(sub_agent) for sub_agent in agent.sub_agents],
+    }
+
+
+def phase_key(phase_name: str, agent, request: str, upstream_digests: list) -> str:
+    return _sha256(
+        phase_name,
+        json.dumps(agent_fingerprint(agent), sort_keys=True, default=str),
+        request,
+        *upstream_digests,
+    )
+
+
+def output_digest(output) -> str:
+    """Digest of a phase result that was not memoised (no artifacts captured)."""
+    return _sha256(_to_text(output))
+
+
+async def capture(output, tool_context) -> dict:
+    """Builds the memo record of a finished phase: output, state delta and saved artifacts."""
+    artifacts = []
+    for name, version in tool_context.actions.artifact_delta.items():
+        part = await tool_context.load_artifact(name, version)
+        if part is None:
+            continue
+        if part.inline_data:
+            artifacts.append({
+                'name': name,
+                'mime_type': part.inline_data.mime_type,
+                'data': base64.b64encode(part.inline_data.data).decode('ascii'),
+            })
+        elif part.text is not None:
+            artifacts.append({'name': name, 'text': part.text})
+    state_delta = {k: v for k, v in tool_context.actions.state_delta.items() if not k.startswith('_adk')}
+    return {
+        'output': output,
+        'state_delta': state_delta,
+        'artifacts': artifacts,
+        'digest': _sha256(_to_text(output), *(_sha256(json.dumps(a, sort_keys=True)) for a in artifacts)),
+    }
+
+
+async def replay(record: dict, tool, tool_context):
+    """Restores a memoised phase into the current session; returns its output."""
+    tool_context.state.update(record['state_delta'])
+    for artifact in record['artifacts']:
+        if 'data' in artifact:
+            part = types.Part.from_bytes(data=base64.b64decode(artifact['data']), mime_type=artifact['mime_type'])
+        else:
+            part = types.Part.from_text(text=artifact['text'])
+        await tool_context.save_artifact(artifact['name'], part)
+    on_text = getattr(tool, 'on_text', None)
+    if on_text and isinstance(record['output'], str):
+        on_text(tool_context, record['output'])  # rebuild what a streaming consumer would have received
+    return record['output']
+
+
+class MemoStore(abc.ABC):
+    """Interface of a phase memo store; records are JSON-serialisable dicts."""
+
+    @abc.abstractmethod
+    def get(self, key: str):
+        """The record stored under `key`, or None when there is none or it has expired."""
+
+    @abc.abstractmethod
+    def put(self, key: str, phase: str, record: dict) -> None:
+        """Stores (or replaces) the record of one phase run."""
+
+    @abc.abstractmethod
+    def invalidate(self, phase: str = None, key: str = None) -> int:
+        """Drops the records of one phase, one key, or everything; returns how many."""
+
+    @abc.abstractmethod
+    def stats(self) -> dict:
+        """Number of records, in total and per phase."""
+
+
+class InMemoryMemoStore(MemoStore):
+    """Process-local store, e.g. for tests and benchmarks."""
+
+    def __init__(self, ttl_days: float = PHASE_MEMO_TTL_DAYS):
+        self.ttl_seconds = ttl_days * 86400
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._records.get(key)
+        if entry and time.time() - entry[1] < self.ttl_seconds:
+            return entry[2]
+        return None
+
+    def put(self, key: str, phase: str, record: dict) -> None:
+        with self._lock:
+            self._records[key] = (phase, time.time(), record)
+
+    def invalidate(self, phase: str = None, key: str = None) -> int:
+        with self._lock:
+            doomed = [k for k, (p, _, _) in self._records.items() if (key is None or k == key) and (phase is None or p == phase)]
+            for k in doomed:
+                del self._records[k]
+        return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            phases = [phase for phase, _, _ in self._records.values()]
+        return {'records': len(phases), 'phases': {phase: phases.count(phase) for phase in sorted(set(phases))}}
+
+
+class SqliteMemoStore(MemoStore):
+    """Local SQLite store shared by the processes of one machine."""
+
+    def __init__(self, db_path: str = PHASE_MEMO_DB, ttl_days: float = PHASE_MEMO_TTL_DAYS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS phase_memo (key TEXT PRIMARY KEY, phase TEXT, record TEXT, created_at REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS phase_memo_phase ON phase_memo (phase)')
+        self._db.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute('SELECT record, created_at FROM phase_memo WHERE key = ?', (key,)).fetchone()
+        if row and time.time() - row[1] < self.ttl_seconds:
+            return json.loads(row[0])
+        return None
+
+    def put(self, key: str, phase: str, record: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO phase_memo (key, phase, record, created_at) VALUES (?, ?, ?, ?)',
+                (key, phase, json.dumps(record, ensure_ascii=False), time.time()),
+            )
+            self._db.commit()
+
+    def invalidate(self, phase: str = None, key: str = None) -> int:
+        clauses, params = [], []
+        if phase is not None:
+            clauses.append('phase = ?')
+            params.append(phase)
+        if key is not None:
+            clauses.append('key = ?')
+            params.append(key)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            deleted = self._db.execute(f'DELETE FROM phase_memo{where}', params).rowcount
+            self._db.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute('SELECT phase, COUNT(*) FROM phase_memo GROUP BY phase ORDER BY phase').fetchall()
+        return {'records': sum(count for _, count in rows), 'phases': dict(rows)}
+
+
+def default_memo_store():
+    """The store configured by PHASE_MEMO_DB, or None when memoisation is disabled."""
+    return SqliteMemoStore(PHASE_MEMO_DB) if PHASE_MEMO_DB else None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sales_agent.memo', description="Inspect or clear memoised phase outputs.")
+    parser.add_argument('--db', default=PHASE_MEMO_DB)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Number of memoised records per phase.")
+    invalidate = commands.add_parser('invalidate', help="Drop memoised records so those phases run again.")
+    invalidate.add_argument('--phase', help="Only this phase (default: all).")
+    args = parser.parse_args(argv)
+
+    if not args.db:
+        print("Phase memoisation is disabled (PHASE_MEMO_DB is empty).", file=sys.stderr)
+        return 1
+    store = SqliteMemoStore(args.db)
+    if args.command == 'stats':
+        print(json.dumps(store.stats(), indent=2))
+    else:
+        print(f"Dropped {store.invalidate(phase=args.phase)} memoised record(s).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
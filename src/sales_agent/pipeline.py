@@ -0,0 +1,317 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.adk.events import EventActions
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import ToolContext
+from google.adk.tools._forwarding_artifact_service import ForwardingArtifactService
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+from . import memo as phase_memo
+from .rate_limits import is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Phase:
+    """A node of the proposal phase graph.
+
+    Args:
+        name: Unique node name, also the key its output is stored under.
+        tool: The sub-agent wrapped as an AgentTool.
+        depends_on: Names of the nodes whose outputs this node consumes.
+        build_request: Builds the sub-agent request from the user input and
+            the outputs of the upstream nodes.
+        budget_s: Latency budget; the phase fails when it runs longer.
+    """
+    name: str
+    tool: AgentTool
+    depends_on: tuple = ()
+    build_request: Callable[[str, dict], str] = None
+    budget_s: float = None
+
+
+@dataclass
+class PhaseResult:
+    """The typed payload passed along an edge of the phase graph."""
+    name: str
+    output: object
+    elapsed: float
+    actions: object = None
+    error: str = None
+    digest: str = None
+    memo_hit: bool = False
+    rate_limited: bool = False  # the error was a 429, so a later run may succeed
+
+    @property
+    def text(self) -> str:
+        if isinstance(self.output, str):
+            return self.output
+        return json.dumps(self.output, ensure_ascii=False, indent=2)
+
+
+class StreamingAgentTool(AgentTool):
+    """AgentTool that runs its agent with SSE streaming and reports text as it arrives.
+
+    `on_text(tool_context, chunk)` is called for every partial text chunk, so a
+    downstream consumer (e.g. the DOCX assembler) can work while the agent is
+    still generating. The tool result is the same as AgentTool's.
+    `on_close(invocation_id)`, if set, is called by PhaseGraphAgent when the
+    run ends, to release whatever `on_text` built that no consumer took.
+    """
+
+    def __init__(self, agent: BaseAgent, on_text: Callable, skip_summarization: bool = False,
+                 on_close: Callable[[str], None] = None):
+        super().__init__(agent=agent, skip_summarization=skip_summarization)
+        self.on_text = on_text
+        self.on_close = on_close
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        invocation_context = tool_context._invocation_context
+        app_name = invocation_context.app_name or self.agent.name
+        runner = Runner(
+            app_name=app_name,
+            agent=self.agent,
+            artifact_service=ForwardingArtifactService(tool_context),
+            session_service=InMemorySessionService(),
+            memory_service=InMemoryMemoryService(),
+            credential_service=invocation_context.credential_service,
+            plugins=list(invocation_context.plugin_manager.plugins),
+        )
+        session = await runner.session_service.create_session(
+            app_name=app_name,
+            user_id=invocation_context.user_id,
+            state={k: v for k, v in tool_context.state.to_dict().items() if not k.startswith('_adk')},
+        )
+        content = types.Content(role='user', parts=[types.Part.from_text(text=args['request'])])
+
+        last_content = None
+        async for event in runner.run_async(
+            user_id=session.user_id,
+            session_id=session.id,
+            new_message=content,
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        ):
+            if event.actions.state_delta:
+                tool_context.state.update(event.actions.state_delta)
+            if not event.content:
+                continue
+            if event.partial:
+                for part in event.content.parts or []:
+                    if part.text and not part.thought:
+                        self.on_text(tool_context, part.text)
+            else:
+                last_content = event.content
+
+        if not last_content:
+            return ''
+        return '\n'.join(p.text for p in last_content.parts if p.text and not p.thought)
+
+
+def validate_graph(phases: list) -> None:
+    """Raises ValueError on unknown dependencies, duplicates or cycles."""
+    names = [phase.name for phase in phases]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate phase names in graph: {names}")
+
+    by_name = {phase.name: phase for phase in phases}
+    for phase in phases:
+        for dependency in phase.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Phase '{phase.name}' depends on unknown phase '{dependency}'")
+
+    visiting, visited = set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Cycle detected in phase graph at '{name}'")
+        visiting.add(name)
+        for dependency in by_name[name].depends_on:
+            visit(dependency)
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in names:
+        visit(name)
+
+
+def handoff_artifact_name(phase: str) -> str:
+    """Session artifact holding the full output of a phase (see handoff.py)."""
+    return f'handoff_{phase}.md'
+
+
+def parse_json_output(text: str):
+    """Parses a sub-agent JSON answer, tolerating markdown code fences."""
+    if not isinstance(text, str):
+        return text
+    cleaned = text.strip()
+    if cleaned.startswith('```'):
+        cleaned = cleaned.strip('`')
+        if cleaned.lower().startswith('json'):
+            cleaned = cleaned[4:]
+    try:
+        return json.loads(cleaned)
+    except (ValueError, TypeError):
+        return None
+
+
+class PhaseGraphAgent(BaseAgent):
+    """Deterministic orchestrator executing a declarative phase graph.
+
+    Every phase whose dependencies are satisfied is started immediately, so
+    independent phases run concurrently and the wall-clock time of a proposal
+    follows the critical path of the graph. Outputs flow along the edges
+    directly; no orchestrator LLM turn is spent between phases.
+
+    With a `memo` store, phases whose agent, request and upstream results are
+    unchanged are replayed instead of run (see memo.py).
+    """
+
+    phases: list
+    gate: Callable[[PhaseResult], str] = None
+    # Phases whose full output is also saved as a session artifact, so a
+    # downstream request can reference it instead of repeating it.
+    handoff_phases: tuple = ()
+    memo: phase_memo.MemoStore = None
+    # Called in a worker thread with every phase's output once the whole graph has completed.
+    on_complete: Callable[[dict], object] = None
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        validate_graph(self.phases)
+
+    async def _run_phase(self, phase: Phase, ctx: InvocationContext, user_request: str, outputs: dict, digests: dict) -> PhaseResult:
+        tool_context = ToolContext(ctx)
+        request = phase.build_request(user_request, outputs) if phase.build_request else user_request
+        logger.info(f"▶ Phase '{phase.name}' started")
+        started = time.perf_counter()
+        key = record = None
+        if self.memo is not None:
+            recompute = ctx.session.state.get(phase_memo.RECOMPUTE_STATE_KEY) or ()
+            key = phase_memo.phase_key(phase.name, phase.tool.agent, request, [digests[d] for d in phase.depends_on])
+            if phase.name not in recompute and '*' not in recompute:
+                record = self.memo.get(key)
+
+        error, rate_limited, memo_hit = None, False, record is not None
+        if memo_hit:
+            output = await phase_memo.replay(record, phase.tool, tool_context)
+        else:
+            try:
+                output = await asyncio.wait_for(
+                    phase.tool.run_async(args={'request': request}, tool_context=tool_context), phase.budget_s
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Phase '{phase.name}' exceeded its {phase.budget_s:g}s latency budget")
+                output, error = '', f"exceeded its latency budget of {phase.budget_s:g}s"
+            except Exception as e:
+                logger.error(f"❌ Phase '{phase.name}' failed: {e}")
+                output, error, rate_limited = '', str(e), is_rate_limit_error(e)
+            if key and not error:
+                record = await phase_memo.capture(output, tool_context)
+                try:
+                    self.memo.put(key, phase.name, record)
+                except Exception as e:
+                    logger.warning(f"⚠ Could not memoise phase '{phase.name}': {e}")
+
+        if phase.name in self.handoff_phases and not error:
+            text = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+            await tool_context.save_artifact(handoff_artifact_name(phase.name), types.Part.from_text(text=text))
+        elapsed = time.perf_counter() - started
+        logger.info(f"✓ Phase '{phase.name}' {'replayed from memo' if memo_hit else 'finished'} in {elapsed:.2f}s")
+        return PhaseResult(
+            phase.name, output, elapsed, tool_context.actions, error,
+            digest=record['digest'] if record else phase_memo.output_digest(output),
+            memo_hit=memo_hit, rate_limited=rate_limited,
+        )
+
+    def _event(self, ctx: InvocationContext, result: PhaseResult = None, text: str = None, metadata: dict = None) -> Event:
+        actions = result.actions if result else EventActions()
+        if result:
+            actions.state_delta[f'{result.name}_output'] = result.output
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role='model', parts=[types.Part.from_text(text=text)]) if text else None,
+            actions=actions,
+            custom_metadata={
+                'phase': result.name, 'elapsed_s': round(result.elapsed, 3), 'memo_hit': result.memo_hit,
+            } if result else metadata,
+        )
+
+    def _close_streams(self, ctx: InvocationContext) -> None:
+        """Releases what streaming phases fed downstream consumers in this run (e.g. a memo replay nobody finalised)."""
+        for phase in self.phases:
+            on_close = getattr(phase.tool, 'on_close', None)
+            if on_close:
+                try:
+                    on_close(ctx.invocation_id)
+                except Exception as e:
+                    logger.warning(f"⚠ Could not close the stream of phase '{phase.name}': {e}")
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        user_request = ''
+        if ctx.user_content and ctx.user_content.parts:
+            user_request = '\n'.join(p.text for p in ctx.user_content.parts if p.text)
+
+        by_name = {phase.name: phase for phase in self.phases}
+        outputs, digests, running = {}, {}, {}
+        started = time.perf_counter()
+
+        def schedule_ready():
+            for phase in self.phases:
+                if phase.name in outputs or phase.name in running.values():
+                    continue
+                if all(dependency in outputs for dependency in phase.depends_on):
+                    task = asyncio.create_task(self._run_phase(phase, ctx, user_request, dict(outputs), dict(digests)))
+                    running[task] = phase.name
+
+        schedule_ready()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.pop(task)
+                    result = task.result()
+                    outputs[result.name] = result.output
+                    digests[result.name] = result.digest
+
+                    halt = result.error or (self.gate(result) if self.gate else None)
+                    is_last = len(outputs) == len(by_name)
+                    yield self._event(ctx, result, text=result.text if is_last else None)
+
+                    if halt:
+                        message = f"Phase '{result.name}' requires human review: {halt}"
+                        logger.warning(f"⚠ {message}")
+                        yield self._event(ctx, text=message, metadata={
+                            'halted_phase': result.name, 'rate_limited': result.rate_limited,
+                        })
+                        return
+                schedule_ready()
+        finally:
+            for task in running:
+                task.cancel()
+            # Let the cancelled phases unwind (and release what they hold) before their streams are closed.
+            await asyncio.gather(*running, return_exceptions=True)
+            self._close_streams(ctx)
+
+        logger.info(f"✓ Phase graph completed in {time.perf_counter() - started:.2f}s")
+        if self.on_complete:
+            try:
+                await asyncio.to_thread(self.on_complete, outputs)
+            except Exception as e:
+                logger.warning(f"⚠ Post-completion hook failed: {e}")
@@ -0,0 +1,348 @@
+"""
+Memory of finished proposals, searched by client-profile similarity.
+
+When the phase graph completes, the client profile, product selection and
+pricing table are stored. The next proposal's profile is embedded and the
+most similar past proposals of other clients are passed to product_matcher and
+proposal_writer as priors. Most clients fall into a few industry and pain-point
+clusters, so these phases can start from a proven selection instead of a blank
+page.
+
+The store lives in PROPOSAL_MEMORY_DIR:
+- vectors.f32: an append-only float32 matrix of profile embeddings.
+- proposals.sqlite3: the records, keyed by their row in the matrix.
+- ivf/: an inverted-file ANN index of k-means lists over those rows.
+
+The matrix and the index are memory-mapped on first search, not at import.
+Rows added after the index was built are scanned exactly. The index is rebuilt
+in the background once the store has doubled.
+
+    python -m sales_agent.proposal_memory stats
+    python -m sales_agent.proposal_memory build
+    python -m sales_agent.proposal_memory query "logistics loyalty program churn"
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROPOSAL_MEMORY_DIR = os.getenv('PROPOSAL_MEMORY_DIR', '.cache/proposal_memory')  # empty disables the memory
+PROPOSAL_MEMORY_K = int(os.getenv('PROPOSAL_MEMORY_K', '3'))
+PROPOSAL_MEMORY_MIN_SIMILARITY = float(os.getenv('PROPOSAL_MEMORY_MIN_SIMILARITY', '0.35'))
+PROPOSAL_MEMORY_NPROBE = int(os.getenv('PROPOSAL_MEMORY_NPROBE', '8'))
+IVF_MIN_ROWS = 1024  # below this, a full scan is faster than probing lists
+PRIOR_CHARS = 1500  # of each past product selection / pricing table passed on
+
+# The profile fields that place a client in an industry / pain-point cluster.
+PROFILE_FIELDS = ('industry_context', 'pain_points', 'business_goals', 'deployment_preference')
+
+
+def profile_text(profile: dict) -> str:
+    parts = []
+    for field in PROFILE_FIELDS:
+        value = profile.get(field)
+        parts.extend(value if isinstance(value, list) else [value] if value else [])
+    return '\n'.join(str(part) for part in parts)
+
+
+def embed_profile(profile: dict):
+    """Unit-length embedding of the clustering fields of a profile (hashed n-grams, as the local index)."""
+    from .retrieval.local_index import embed_tokens, tokenize
+    return embed_tokens(tokenize(profile_text(profile)))
+
+
+def _client_key(profile: dict) -> str:
+    return ' '.join(str(profile.get('client_name') or '').casefold().split())
+
+
+def _truncate(text: str, limit: int = PRIOR_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit].rsplit('\n', 1)[0] + '\n…'
+
+
+def _kmeans(vectors, clusters: int, iterations: int = 10, seed: int = 0):
+    """Spherical k-means; returns the unit centroids and each row's list."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centroids = np.array(vectors[rng.choice(len(vectors), clusters, replace=False)], dtype=np.float32)
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class ProposalMemory:
+    """Proposal records plus their profile embeddings; safe for several processes of one machine."""
+
+    def __init__(self, directory: str = PROPOSAL_MEMORY_DIR, nprobe: int = PROPOSAL_MEMORY_NPROBE):
+        self.directory = directory
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._db = None
+        self._vectors = None  # memory-mapped, remapped when the file grows
+        self._ivf = None
+        self._ivf_mtime = None
+        self._build_lock = threading.Lock()
+
+    # === STORAGE ===
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, 'vectors.f32')
+
+    @property
+    def _ivf_dir(self) -> str:
+        return os.path.join(self.directory, 'ivf')
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.directory, 'proposals.sqlite3'), check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS proposals (row INTEGER PRIMARY KEY, digest TEXT UNIQUE, client TEXT, '
+                'industry TEXT, profile TEXT, products TEXT, pricing TEXT, created_at REAL)'
+            )
+        return self._db
+
+    def add(self, profile: dict, products: str, pricing: str) -> bool:
+        """Stores a finished proposal; returns False when the same one is already stored."""
+        from .retrieval.local_index import EMBEDDING_DIM
+
+        vector = embed_profile(profile)
+        digest = hashlib.sha256(json.dumps([profile, products, pricing], sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        row_bytes = EMBEDDING_DIM * 4
+        with self._lock:
+            db = self._connect()
+            db.execute('BEGIN IMMEDIATE')  # serialises writers across processes
+            try:
+                if db.execute('SELECT 1 FROM proposals WHERE digest = ?', (digest,)).fetchone():
+                    db.execute('ROLLBACK')
+                    return False
+                row = db.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM proposals').fetchone()[0]
+                with open(self._vectors_path, 'ab') as f:
+                    f.truncate(row * row_bytes)  # drops a row whose record a crashed writer never committed
+                    f.write(vector.tobytes())
+                db.execute(
+                    'INSERT INTO proposals (row, digest, client, industry, profile, products, pricing, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (row, digest, _client_key(profile), profile.get('industry_context'),
+                     json.dumps(profile, ensure_ascii=False), products, pricing, time.time()),
+                )
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        logger.info(f"✓ Proposal for '{profile.get('client_name')}' added to the proposal memory (row {row})")
+        self._maybe_rebuild(row + 1)
+        return True
+
+    # === SEARCH ===
+
+    def _load(self) -> None:
+        """Maps the vectors and the IVF index, again whenever another process has extended or rebuilt them."""
+        import numpy as np
+        from .retrieval.local_index import EMBEDDING_DIM
+
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        rows = size // (EMBEDDING_DIM * 4)
+        if self._vectors is None or len(self._vectors) != rows:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(rows, EMBEDDING_DIM)) \
+                if rows else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        manifest = os.path.join(self._ivf_dir, 'manifest.json')
+        mtime = os.path.getmtime(manifest) if os.path.exists(manifest) else None
+        if mtime != self._ivf_mtime:
+            self._ivf_mtime, self._ivf = mtime, None
+            if mtime is not None:
+                with open(manifest, encoding='utf-8') as f:
+                    rows = json.load(f)['rows']
+                self._ivf = {
+                    'rows': rows,
+                    **{name: np.load(os.path.join(self._ivf_dir, f'{name}.npy'), mmap_mode='r')
+                       for name in ('centroids', 'list_indptr', 'list_rows')},
+                }
+
+    def search(self, profile: dict, k: int = PROPOSAL_MEMORY_K, min_similarity: float = PROPOSAL_MEMORY_MIN_SIMILARITY) -> list:
+        """The `k` most similar past proposals of other clients (one per client), most similar first."""
+        import numpy as np
+
+        query = embed_profile(profile)
+        if not query.any():
+            return []
+        with self._lock:
+            self._load()
+            vectors, ivf = self._vectors, self._ivf
+        if not len(vectors):
+            return []
+        if ivf is None or ivf['rows'] > len(vectors):
+            rows = np.arange(len(vectors))
+        else:
+            # The probed lists, plus every row added after the index was built.
+            probe = np.argsort(-(ivf['centroids'] @ query))[:self.nprobe]
+            indptr = ivf['list_indptr']
+            rows = np.concatenate(
+                [ivf['list_rows'][indptr[c]:indptr[c + 1]] for c in probe] + [np.arange(ivf['rows'], len(vectors))]
+            )
+        scores = vectors[rows] @ query
+        order = np.argsort(-scores)
+
+        client = _client_key(profile)
+        matches, seen = [], {client} if client else set()
+        with self._lock:
+            db = self._connect()
+            for i in order:
+                if scores[i] < min_similarity or len(matches) >= k:
+                    break
+                record = db.execute(
+                    'SELECT client, industry, profile, products, pricing FROM proposals WHERE row = ?', (int(rows[i]),)
+                ).fetchone()
+                if record is None or record[0] in seen:
+                    continue  # another version of an already matched client, or a row still being written
+                seen.add(record[0])
+                matches.append({
+                    'similarity': round(float(scores[i]), 3),
+                    'profile': json.loads(record[2]),
+                    'products': record[3],
+                    'pricing': record[4],
+                })
+        return matches
+
+    # === INDEX ===
+
+    def build_index(self) -> dict:
+        """Clusters every stored embedding into sqrt(n) lists and swaps the new index in."""
+        with self._build_lock:
+            return self._build_index()
+
+    def _build_index(self) -> dict:
+        import numpy as np
+
+        with self._lock:
+            self._load()
+            vectors = np.asarray(self._vectors)
+        if len(vectors) < IVF_MIN_ROWS:
+            return {'rows': len(vectors), 'lists': 0}
+        started = time.perf_counter()
+        centroids, assignment = _kmeans(vectors, int(np.sqrt(len(vectors))))
+        order = np.argsort(assignment, kind='stable').astype(np.int32)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))]).astype(np.int64)
+
+        tmp_dir = f'{self._ivf_dir}.tmp-{os.getpid()}-{threading.get_ident()}'
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name, array in (('centroids', centroids), ('list_indptr', indptr), ('list_rows', order)):
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rows': len(vectors), 'lists': len(centroids), 'built_at': time.time()}, f)
+        # Readers keep their mapping of the old files until they notice the new manifest.
+        old_dir = f'{self._ivf_dir}.old-{os.getpid()}-{threading.get_ident()}'
+        if os.path.exists(self._ivf_dir):
+            os.replace(self._ivf_dir, old_dir)
+        os.replace(tmp_dir, self._ivf_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        stats = {'rows': len(vectors), 'lists': len(centroids), 'seconds': round(time.perf_counter() - started, 3)}
+        logger.info(f"✓ Proposal memory index built: {stats}")
+        return stats
+
+    def _maybe_rebuild(self, rows: int) -> None:
+        manifest = os.path.join(self._ivf_dir, 'manifest.json')
+        indexed = 0
+        if os.path.exists(manifest):
+            with open(manifest, encoding='utf-8') as f:
+                indexed = json.load(f)['rows']
+        if rows < IVF_MIN_ROWS or rows < 2 * indexed or self._build_lock.locked():
+            return
+
+        def rebuild():
+            try:
+                self.build_index()
+            except Exception as e:
+                logger.warning(f"⚠ Could not rebuild the proposal memory index: {e}")
+
+        threading.Thread(target=rebuild, name='proposal-memory-index', daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            count = self._connect().execute('SELECT COUNT(*), COUNT(DISTINCT client) FROM proposals').fetchone()
+            ivf = self._ivf
+        return {
+            'proposals': count[0],
+            'clients': count[1],
+            'indexed_rows': ivf['rows'] if ivf else 0,
+            'lists': len(ivf['centroids']) if ivf else 0,
+        }
+
+
+def priors_section(matches: list, include_pricing: bool = True) -> str:
+    """The similar past proposals as a request section, or '' when there are none."""
+    if not matches:
+        return ''
+    blocks = []
+    for number, match in enumerate(matches, 1):
+        profile = match['profile']
+        focus = '; '.join(profile.get('pain_points') or []) or profile.get('industry_context') or ''
+        block = (
+            f"*Past proposal {number}* (similarity {match['similarity']:.2f}, "
+            f"{profile.get('industry_context') or 'industry not stated'}): {focus}\n"
+            f"Product selection:\n{_truncate(match['products'])}\n"
+        )
+        if include_pricing:
+            block += f"Pricing:\n{_truncate(match['pricing'])}\n"
+        blocks.append(block)
+    return "**Similar Past Proposals (other clients; reuse what fits, never their names or figures):**\n" + '\n'.join(blocks)
+
+
+_memory = None
+
+
+def default_proposal_memory():
+    """The memory in PROPOSAL_MEMORY_DIR (opened on first use), or None when it is disabled."""
+    global _memory
+    if _memory is None and PROPOSAL_MEMORY_DIR:
+        _memory = ProposalMemory(PROPOSAL_MEMORY_DIR)
+    return _memory
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sales_agent.proposal_memory', description="Inspect or index the proposal memory.")
+    parser.add_argument('--dir', default=PROPOSAL_MEMORY_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Number of stored proposals and the state of the index.")
+    commands.add_parser('build', help="Rebuild the ANN index over every stored proposal.")
+    query = commands.add_parser('query', help="Past proposals similar to a free-text profile.")
+    query.add_argument('text')
+    query.add_argument('-k', type=int, default=PROPOSAL_MEMORY_K)
+    args = parser.parse_args(argv)
+
+    if not args.dir:
+        print("The proposal memory is disabled (PROPOSAL_MEMORY_DIR is empty).", file=sys.stderr)
+        return 1
+    logging.basicConfig(level=logging.INFO)
+    memory = ProposalMemory(args.dir)
+    if args.command == 'stats':
+        print(json.dumps(memory.stats(), indent=2))
+    elif args.command == 'build':
+        print(json.dumps(memory.build_index(), indent=2))
+    else:
+        started = time.perf_counter()
+        matches = memory.search({'industry_context': args.text}, args.k, min_similarity=0.0)
+        for match in matches:
+            print(f"{match['similarity']:.3f} {match['profile'].get('client_name')}: {match['profile'].get('industry_context')}")
+        print(f"{len(matches)} matches in {(time.perf_counter() - started) * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
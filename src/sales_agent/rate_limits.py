@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+
+def _model_rates() -> dict:
+    """Per-model Gemini quotas from MODEL_RPM ("gemini-2.5-pro=25,gemini-2.5-flash-lite=300")."""
+    rates = {}
+    for item in filter(None, os.getenv('MODEL_RPM', '').split(',')):
+        model, _, rpm = item.partition('=')
+        rates[f'gemini:{model.strip()}'] = float(rpm)
+    return rates
+
+
+# Requests per minute allowed per back-end; the buckets never exceed these rates. Every Gemini model has its own
+# bucket ('gemini:<model>'), at GEMINI_RPM unless MODEL_RPM sets another rate.
+DEFAULT_RATES_PER_MINUTE = {
+    'gemini': float(os.getenv('GEMINI_RPM', '60')),
+    'imagen': float(os.getenv('IMAGEN_RPM', '20')),
+    'vertex_search': float(os.getenv('VERTEX_SEARCH_RPM', '120')),
+    'google_search': float(os.getenv('GOOGLE_SEARCH_RPM', '60')),
+    **_model_rates(),
+}
+
+# Tool name -> back-end bucket. Tools not listed here are not rate limited.
+TOOL_BUCKETS = {
+    'vertex_ai_search': 'vertex_search',
+    'discovery_engine_search': 'vertex_search',
+    'generate_image': 'imagen',
+    'generate_images': 'imagen',
+}
+
+
+# The limiter of the runner making the current model call. A RoutedLlm acquires the bucket of the model it actually
+# calls through it, since the request names the primary even when the call goes to the fallback.
+current_limiter = ContextVar('sales_agent_current_limiter', default=None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for HTTP 429 / RESOURCE_EXHAUSTED errors from genai or google-api-core."""
+    if getattr(error, 'code', None) == 429:
+        return True
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests') or 'RESOURCE_EXHAUSTED' in str(error)
+
+
+class TokenBucket:
+    """
+    Async token bucket with additive-increase / multiplicative-decrease rate control.
+
+    The rate is halved on every 429 (down to `min_fraction` of the configured
+    rate) and creeps back up by 5% of it per successful call.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: float = None, min_fraction: float = 0.1):
+        self.name = name
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = self.max_rate * min_fraction
+        self.rate = self.max_rate
+        self.capacity = burst or max(1.0, rate_per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self.throttled = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                # Jitter spreads out waiters so they do not wake up together.
+                delay = (tokens - self.tokens) / self.rate * random.uniform(1.0, 1.2)
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+    def penalize(self) -> None:
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        logger.warning(f"⚠ 429 from {self.name}: rate lowered to {self.rate * 60:.1f}/min")
+
+    def reward(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def stats(self) -> dict:
+        return {
+            'rate_per_minute': round(self.rate * 60, 1),
+            'throttled': self.throttled,
+            'waited_s': round(self.waited, 2),
+        }
+
+
+class RateLimiter:
+    """One token bucket per back-end, shared by every session in the process."""
+
+    def __init__(self, rates_per_minute: dict = None):
+        rates = {**DEFAULT_RATES_PER_MINUTE, **(rates_per_minute or {})}
+        self._rates = rates
+        self._buckets = {}
+
+    def bucket(self, name: str) -> TokenBucket:
+        # Buckets hold an asyncio.Lock, so they are created inside the running loop.
+        loop = asyncio.get_running_loop()
+        key = (name, loop)
+        if key not in self._buckets:
+            rate = self._rates.get(name) or self._rates[name.partition(':')[0]]
+            self._buckets[key] = TokenBucket(name, rate)
+        return self._buckets[key]
+
+    def model_bucket(self, model: str) -> TokenBucket:
+        """The bucket of one Gemini model; each model has its own quota."""
+        return self.bucket(f'gemini:{model}' if model else 'gemini')
+
+    def stats(self) -> dict:
+        return {name: bucket.stats() for (name, _), bucket in self._buckets.items()}
+
+
+def _uses_google_search(llm_request) -> bool:
+    tools = (llm_request.config.tools if llm_request.config else None) or []
+    return any(getattr(tool, 'google_search', None) for tool in tools)
+
+
+def _routes_itself(callback_context) -> bool:
+    """Whether the agent's model picks the model it calls (a RoutedLlm), and so throttles that call itself."""
+    from .routing import RoutedLlm
+    return isinstance(getattr(callback_context._invocation_context.agent, 'model', None), RoutedLlm)
+
+
+class RateLimitPlugin(BasePlugin):
+    """Throttles every model and tool call in a Runner through a shared RateLimiter.
+
+    Plugins are inherited by the runners AgentTool creates, so sub-agent calls
+    are covered as well.
+    """
+
+    def __init__(self, limiter: RateLimiter = None, name: str = 'rate_limit'):
+        super().__init__(name=name)
+        self.limiter = limiter or RateLimiter()
+        # agent name -> the model its requests name, for the callbacks that only see the response
+        self._models = {}
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        current_limiter.set(self.limiter)
+        if _routes_itself(callback_context):
+            self._models.pop(callback_context.agent_name, None)
+        else:
+            self._models[callback_context.agent_name] = llm_request.model
+            await self.limiter.model_bucket(llm_request.model).acquire()
+        if _uses_google_search(llm_request):
+            await self.limiter.bucket('google_search').acquire()
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        model = self._models.get(callback_context.agent_name)
+        if model and not llm_response.partial:
+            self.limiter.model_bucket(model).reward()
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        if is_rate_limit_error(error) and not _routes_itself(callback_context):
+            self.limiter.model_bucket(llm_request.model).penalize()
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        bucket = TOOL_BUCKETS.get(tool.name)
+        if bucket:
+            tokens = len(tool_args.get('prompts') or []) or 1
+            await self.limiter.bucket(bucket).acquire(tokens)
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        bucket = TOOL_BUCKETS.get(tool.name)
+        if bucket:
+            # generate_images reports per-asset failures instead of raising.
+            if 'RESOURCE_EXHAUSTED' in str(result):
+                self.limiter.bucket(bucket).penalize()
+            else:
+                self.limiter.bucket(bucket).reward()
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        bucket = TOOL_BUCKETS.get(tool.name)
+        if bucket and is_rate_limit_error(error):
+            self.limiter.bucket(bucket).penalize()
+        return None
@@ -0,0 +1,96 @@
+"""
+Lazy registry of the sub-agents.
+
+Each sub-agent module (and what it pulls in: python-docx, Pillow, NumPy, the
+genai client...) is imported the first time the agent is actually needed,
+not when `sales_agent` is imported. LazyAgentTool stands in for AgentTool
+until then, so the orchestrators can be built without loading any sub-agent.
+"""
+import importlib
+import logging
+import threading
+import time
+
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.base_tool import BaseTool
+
+from .pipeline import StreamingAgentTool
+from .resilience import harden_models
+from .routing import route_models
+
+logger = logging.getLogger(__name__)
+
+# Agent name -> attribute of sales_agent.sub_agents.<name>.agent holding the agent.
+SUB_AGENTS = {
+    'interview_analyzer': 'interview_analyzer_agent',
+    'product_matcher': 'product_matcher_agent',
+    'competitor_analyst': 'competitor_analyst_agent',
+    'pricing_calculator': 'pricing_calculator_agent',
+    'proposal_writer': 'proposal_writer_agent',
+    'visual_generator': 'visual_generator_agent',
+    'docx_assembler': 'docx_assembler_agent',
+}
+
+_agents = {}
+_lock = threading.Lock()
+
+
+def get_agent(name: str):
+    """Imports and returns a sub-agent by name (once per process)."""
+    if name not in _agents:
+        with _lock:
+            if name not in _agents:
+                started = time.perf_counter()
+                module = importlib.import_module(f'.sub_agents.{name}.agent', package=__package__)
+                agent = getattr(module, SUB_AGENTS[name])
+                harden_models(agent)  # timeouts, hedging, retries and circuit breaking for its model calls
+                route_models(agent)  # fallback model when the phase's model is over its latency budget
+                _agents[name] = agent
+                logger.info(f"✓ Loaded sub-agent '{name}' in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return _agents[name]
+
+
+def loaded_agents() -> list:
+    return list(_agents)
+
+
+class LazyAgentTool(AgentTool):
+    """AgentTool for a registered sub-agent that is imported on first use.
+
+    The tool name is known up front; the agent, and with it the description
+    and function declaration, are resolved when first read.
+    """
+
+    def __init__(self, name: str, skip_summarization: bool = False):
+        if name not in SUB_AGENTS:
+            raise ValueError(f"Unknown sub-agent '{name}'; expected one of {list(SUB_AGENTS)}")
+        self._agent = None
+        self.skip_summarization = skip_summarization
+        BaseTool.__init__(self, name=name, description='')
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self._agent = get_agent(self.name)
+        return self._agent
+
+    @agent.setter
+    def agent(self, value):
+        self._agent = value
+
+    @property
+    def description(self) -> str:
+        return self.agent.description
+
+    @description.setter
+    def description(self, value):
+        pass  # always the agent's own description
+
+
+class LazyStreamingAgentTool(LazyAgentTool, StreamingAgentTool):
+    """StreamingAgentTool for a registered sub-agent that is imported on first use."""
+
+    def __init__(self, name: str, on_text, skip_summarization: bool = False, on_close=None):
+        super().__init__(name, skip_summarization=skip_summarization)
+        self.on_text = on_text
+        self.on_close = on_close
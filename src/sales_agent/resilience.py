@@ -0,0 +1,403 @@
+"""
+Timeouts, hedged requests, retries and circuit breakers for the back-ends.
+
+Every call to Gemini (including the built-in Google Search it runs),
+Vertex AI Search and Imagen goes through the Backend of that service:
+
+- the call is abandoned after the back-end's timeout;
+- once a call site has enough samples, a duplicate request is sent when the
+  first one is slower than the site's p95, and the first reply wins. Hedges
+  are capped at HEDGE_MAX_FRACTION of the calls, so a slow back-end never
+  receives twice the load;
+- timeouts, 429 and 5xx errors are retried with full-jitter exponential
+  backoff;
+- after BREAKER_FAILURES consecutive failures the back-end's circuit opens
+  and calls fail fast with CircuitOpenError for BREAKER_RESET_S seconds,
+  then a single trial call decides whether it closes again.
+
+Sub-agent models are wrapped in ResilientLlm when the registry loads them;
+PhaseGraphAgent enforces a latency budget per phase on top.
+"""
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import AsyncGenerator, Optional
+import asyncio
+import copy
+import logging
+import os
+import random
+import time
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+
+from .rate_limits import is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+RESILIENCE_ENABLED = os.getenv('RESILIENCE', '1') == '1'
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
+RETRY_BASE_S = float(os.getenv('RETRY_BASE_S', '1.0'))
+RETRY_MAX_S = float(os.getenv('RETRY_MAX_S', '20'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MAX_FRACTION = float(os.getenv('HEDGE_MAX_FRACTION', '0.1'))
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '5'))
+BREAKER_RESET_S = float(os.getenv('BREAKER_RESET_S', '30'))
+
+_TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+_TRANSIENT_NAMES = {'ServiceUnavailable', 'InternalServerError', 'ServerError', 'DeadlineExceeded', 'GatewayTimeout'}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a back-end whose circuit breaker is open."""
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Timeouts, connection errors, 429 and 5xx: worth retrying, and counted by the circuit breaker."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if is_rate_limit_error(error):
+        return True
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    return code in _TRANSIENT_CODES or type(error).__name__ in _TRANSIENT_NAMES
+
+
+@dataclass(frozen=True)
+class BackendPolicy:
+    timeout_s: float
+    attempts: int = RETRY_ATTEMPTS
+    hedge: bool = True
+    retry_base_s: float = RETRY_BASE_S
+    retry_max_s: float = RETRY_MAX_S
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay."""
+        return random.uniform(0, min(self.retry_max_s, self.retry_base_s * 2 ** attempt))
+
+
+DEFAULT_POLICIES = {
+    'gemini': BackendPolicy(timeout_s=float(os.getenv('GEMINI_TIMEOUT_S', '120'))),
+    # Model calls that run the built-in Google Search tool.
+    'google_search': BackendPolicy(timeout_s=float(os.getenv('GOOGLE_SEARCH_TIMEOUT_S', '150'))),
+    'vertex_search': BackendPolicy(timeout_s=float(os.getenv('VERTEX_SEARCH_TIMEOUT_S', '20'))),
+    # Imagen calls are expensive and slow by nature: no hedging.
+    'imagen': BackendPolicy(timeout_s=float(os.getenv('IMAGEN_TIMEOUT_S', '90')), hedge=False),
+}
+
+
+class LatencyTracker:
+    """Rolling latencies of one call site."""
+
+    def __init__(self, window: int = 200, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def hedge_after(self) -> Optional[float]:
+        """Seconds after which a duplicate request is sent: the p95, once enough calls were seen."""
+        return self.percentile(95) if len(self.samples) >= self.min_samples else None
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive transient failures -> half-open after `reset_s` -> closed on success."""
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_s = reset_s
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_s else 'open'
+
+    def before_call(self) -> bool:
+        """Raises CircuitOpenError while open; returns True when this call is the half-open trial."""
+        state = self.state
+        if state == 'closed':
+            return False
+        if state == 'half_open' and not self.trial_running:
+            self.trial_running = True
+            return True
+        self.rejected += 1
+        retry_in = max(0.0, self.reset_s - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open, next trial in {retry_in:.0f}s)")
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"🟢 {self.name}: circuit closed")
+        self.consecutive_failures, self.opened_at, self.trial_running = 0, None, False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.trial_running or self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None or self.trial_running:
+                logger.warning(f"⚠ {self.name}: circuit opened after {self.consecutive_failures} consecutive failures")
+            self.opened_at, self.trial_running = time.monotonic(), False
+
+    def release(self) -> None:
+        """Ends a half-open trial that failed or was cancelled for a reason unrelated to the back-end's health."""
+        self.trial_running = False
+
+
+class Backend:
+    """The resilience policy, circuit breaker and per-call-site latencies of one back-end."""
+
+    def __init__(self, name: str, policy: BackendPolicy):
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(name)
+        self.trackers = {}
+        self.counts = dict.fromkeys(('calls', 'hedges', 'hedge_wins', 'retries', 'timeouts', 'failures'), 0)
+
+    def tracker(self, site: str) -> LatencyTracker:
+        if site not in self.trackers:
+            self.trackers[site] = LatencyTracker()
+        return self.trackers[site]
+
+    def _may_hedge(self) -> bool:
+        return self.policy.hedge and self.counts['hedges'] < HEDGE_MAX_FRACTION * self.counts['calls']
+
+    async def call(self, make_call, site: str = ''):
+        """
+        Runs `make_call()` (a coroutine factory) under this back-end's policy.
+
+        Raises CircuitOpenError while the circuit is open, or the last error once
+        the attempts are used up; errors that are not transient are raised at once.
+        """
+        tracker = self.tracker(site)
+        for attempt in range(1, self.policy.attempts + 1):
+            trial = self.breaker.before_call()
+            self.counts['calls'] += 1
+            started = time.perf_counter()
+            try:
+                result = await self._attempt(make_call, tracker)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # Cancelled (CancelledError, KeyboardInterrupt): free the trial slot for the next caller.
+                    if trial:
+                        self.breaker.release()
+                    raise
+                if not is_transient_error(e):
+                    self.breaker.release()
+                    raise
+                self.counts['failures'] += 1
+                if isinstance(e, (TimeoutError, asyncio.TimeoutError)):
+                    self.counts['timeouts'] += 1
+                    tracker.record(time.perf_counter() - started)
+                self.breaker.record_failure()
+                if attempt == self.policy.attempts:
+                    raise
+                delay = self.policy.backoff(attempt)
+                logger.warning(f"⚠ {self.name} ({site or 'call'}) failed: {e!r}; retry {attempt} in {delay:.1f}s")
+                self.counts['retries'] += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            tracker.record(time.perf_counter() - started)
+            return result
+
+    async def _attempt(self, make_call, tracker: LatencyTracker):
+        hedge_after = tracker.hedge_after() if self._may_hedge() else None
+        primary = asyncio.ensure_future(make_call())
+        tasks, error = [primary], None
+        try:
+            async with asyncio.timeout(self.policy.timeout_s):
+                if hedge_after is not None:
+                    done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                    if not done:
+                        self.counts['hedges'] += 1
+                        tasks.append(asyncio.ensure_future(make_call()))
+                while tasks:
+                    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    tasks = list(pending)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is not primary:
+                                self.counts['hedge_wins'] += 1
+                            return task.result()
+                        error = error or task.exception()
+                raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            'circuit': self.breaker.state,
+            'rejected': self.breaker.rejected,
+            'p95_s': {site: round(t.percentile(95), 3) for site, t in self.trackers.items() if t.samples},
+        }
+
+
+class Resilience:
+    """The Backend of every external service, shared by all sessions in the process."""
+
+    def __init__(self, policies: dict = None):
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self._backends = {}
+
+    def backend(self, name: str) -> Backend:
+        if name not in self._backends:
+            self._backends[name] = Backend(name, self.policies[name])
+        return self._backends[name]
+
+    def configure(self, name: str, **changes) -> None:
+        """Changes a back-end's policy, e.g. `configure('gemini', hedge=False)`."""
+        self.policies[name] = replace(self.policies[name], **changes)
+        if name in self._backends:
+            self._backends[name].policy = self.policies[name]
+
+    async def call(self, backend: str, make_call, site: str = ''):
+        if not RESILIENCE_ENABLED:
+            return await make_call()
+        return await self.backend(backend).call(make_call, site)
+
+    def reset(self) -> None:
+        """Forgets latencies, counters and breaker states (e.g. between benchmark runs)."""
+        self._backends = {}
+
+    def stats(self) -> dict:
+        return {name: backend.stats() for name, backend in self._backends.items()}
+
+
+resilience = Resilience()
+
+
+# === MODELS ===
+
+def _uses_google_search(llm_request) -> bool:
+    tools = (llm_request.config.tools if llm_request.config else None) or []
+    return any(getattr(tool, 'google_search', None) for tool in tools)
+
+
+def _fresh_request(llm_request):
+    """A copy a model may mutate while a hedged twin holds the original (tools are shared, not copied)."""
+    return llm_request.model_copy(update={
+        'contents': copy.deepcopy(llm_request.contents),
+        'config': llm_request.config.model_copy(deep=True) if llm_request.config else None,
+    })
+
+
+class ResilientLlm(BaseLlm):
+    """
+    Wraps a sub-agent's model so its calls go through `resilience`.
+
+    Keeps the wrapped model's name, so ADK's built-in tool handling is
+    unchanged. Streamed calls are not hedged; they are retried only until the
+    first chunk arrives, and time out when no chunk arrives for the
+    back-end's timeout.
+    """
+
+    inner: BaseLlm
+    site: str = ''
+
+    model_config = {'arbitrary_types_allowed': True}
+
+    async def _collect(self, llm_request) -> list:
+        return [response async for response in self.inner.generate_content_async(_fresh_request(llm_request), stream=False)]
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        backend = 'google_search' if _uses_google_search(llm_request) else 'gemini'
+        if not RESILIENCE_ENABLED:
+            async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                yield response
+            return
+        if not stream:
+            for response in await resilience.call(backend, lambda: self._collect(llm_request), self.site):
+                yield response
+            return
+
+        target = resilience.backend(backend)
+        for attempt in range(1, target.policy.attempts + 1):
+            trial = target.breaker.before_call()
+            target.counts['calls'] += 1
+            responses = self.inner.generate_content_async(_fresh_request(llm_request), stream=True)
+            yielded = False
+            try:
+                while True:
+                    try:
+                        response = await asyncio.wait_for(anext(responses), target.policy.timeout_s)
+                    except StopAsyncIteration:
+                        break
+                    yielded = True
+                    yield response
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # Cancelled, or the consumer closed the stream (GeneratorExit): free the trial slot.
+                    if trial:
+                        target.breaker.release()
+                    raise
+                if not is_transient_error(e):
+                    target.breaker.release()
+                    raise
+                target.counts['failures'] += 1
+                target.breaker.record_failure()
+                if yielded or attempt == target.policy.attempts:
+                    raise
+                target.counts['retries'] += 1
+                delay = target.policy.backoff(attempt)
+                logger.warning(f"⚠ {backend} stream ({self.site}) failed: {e!r}; retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                await responses.aclose()
+            target.breaker.record_success()
+            return
+
+    def connect(self, llm_request):
+        return self.inner.connect(llm_request)
+
+
+def harden_models(agent) -> None:
+    """Wraps the models of `agent`, its sub-agents and its loaded AgentTools' agents in ResilientLlm (idempotent)."""
+    from google.adk.agents import LlmAgent
+
+    if not RESILIENCE_ENABLED:
+        return
+    seen, stack = set(), [agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if isinstance(agent, LlmAgent) and agent.model and not isinstance(agent.model, ResilientLlm):
+            inner = agent.canonical_model
+            agent.model = ResilientLlm(model=inner.model, inner=inner, site=agent.name)
+        stack.extend(agent.sub_agents)
+        stack.extend(tool_agents(agent))
+
+
+def tool_agents(agent) -> list:
+    """The agents behind `agent`'s AgentTools, leaving lazy ones unloaded (the registry handles those on load)."""
+    from google.adk.tools.agent_tool import AgentTool
+
+    return [
+        tool.agent for tool in getattr(agent, 'tools', None) or []
+        if isinstance(tool, AgentTool) and getattr(tool, '_agent', tool) is not None
+    ]
+
+
+# === PHASE BUDGETS ===
+
+def phase_budgets(defaults: dict) -> dict:
+    """Seconds allowed per phase: `defaults`, overridden by PHASE_BUDGETS ("proposal_writer=300,docx_assembler=90")."""
+    budgets = dict(defaults)
+    for item in filter(None, os.getenv('PHASE_BUDGETS', '').split(',')):
+        name, _, seconds = item.partition('=')
+        budgets[name.strip()] = float(seconds)
+    return budgets
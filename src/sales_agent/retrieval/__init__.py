@@ -0,0 +1,2 @@
+from .cache import RetrievalCache, normalize_query, retrieval_cache
+from .search_tool import CachedVertexSearchTool, LocalSearchTool, get_knowledge_base
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv('RETRIEVAL_CACHE_SIZE', '512'))
+RETRIEVAL_CACHE_TTL = float(os.getenv('RETRIEVAL_CACHE_TTL', '3600'))
+RETRIEVAL_CACHE_DB = os.getenv('RETRIEVAL_CACHE_DB')  # e.g. '.cache/retrieval.sqlite3'
+
+_STOP_WORDS = {'a', 'an', 'and', 'the', 'of', 'for', 'in', 'on', 'to', 'with', 'about', 'is', 'are', 'what', 'how'}
+
+
+def normalize_query(query: str) -> str:
+    """Reduces near-identical queries to one canonical form.
+
+    Case, punctuation, whitespace, word order and filler words are ignored,
+    so "Comarch CRM pricing?" and "pricing of the comarch  CRM" share a key.
+    """
+    text = unicodedata.normalize('NFKC', query or '').casefold()
+    tokens = re.findall(r'[\w\-\.]+', text)
+    tokens = {token.strip('.') for token in tokens} - _STOP_WORDS - {''}
+    return ' '.join(sorted(tokens))
+
+
+class RetrievalCache:
+    """Process-wide LRU + TTL cache for knowledge base searches.
+
+    Identical in-flight queries are coalesced into a single backend call.
+    Entries can optionally be persisted to a local SQLite file so they
+    survive restarts and are shared between proposals.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl_seconds: float = RETRIEVAL_CACHE_TTL, db_path: str = RETRIEVAL_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS retrieval_cache (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)'
+            )
+            self._db.commit()
+
+    def _get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, stored_at FROM retrieval_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row and now - row[1] < self.ttl_seconds:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    return value
+        return None
+
+    def _store(self, key: str, value, stored_at: float) -> None:
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _put(self, key: str, value) -> None:
+        stored_at = time.time()
+        with self._lock:
+            self._store(key, value, stored_at)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO retrieval_cache (key, value, stored_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value), stored_at),
+                )
+                self._db.commit()
+
+    async def get_or_fetch(self, key: str, fetch):
+        """Returns the cached value for `key` or awaits `fetch()` once for it.
+
+        Only results with `status == 'success'` are cached.
+        """
+        value = self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        task = loop.create_task(fetch())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+        if isinstance(value, dict) and value.get('status') == 'success':
+            self._put(key, value)
+        return value
+
+    def invalidate(self) -> None:
+        """Drops every cached entry, including the persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM retrieval_cache')
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'entries': len(self._entries),
+            'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+retrieval_cache = RetrievalCache()
@@ -0,0 +1,361 @@
+"""Offline hybrid (BM25 + dense vector) index over the knowledge base documents.
+
+Build or refresh the index (only new or changed documents are re-indexed):
+
+    python -m sales_agent.retrieval.local_index build \\
+        --source Bucket-1/ --source competitors-offers/ --index .index/knowledge_base
+
+All arrays are stored as .npy files and opened with mmap_mode='r', so every
+gunicorn worker on a host shares one copy through the page cache.
+
+Each build writes a new version directory inside the index directory and then
+atomically replaces the CURRENT pointer file, so there is always a complete
+index to open. Loaded indexes notice the new version on their next query
+(LocalIndex.is_current) and the previous version is kept for readers that are
+still opening it.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import unicodedata
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOCAL_INDEX_DIR = os.getenv('LOCAL_INDEX_DIR', '.index/knowledge_base')
+EMBEDDING_DIM = 512
+CHUNK_CHARS = 1200
+BM25_K1 = 1.2
+BM25_B = 0.75
+DENSE_WEIGHT = 0.3
+
+CURRENT_FILE = 'CURRENT'
+_VERSION_RE = re.compile(r'^v(\d+)-\d+$')
+_UNVERSIONED_FILES = re.compile(r'^(\w+\.npy|texts\.bin|vocab\.json|manifest\.json)$')
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.csv', '.json', '.html', '.htm'}
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> list:
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return [token for token in _TOKEN_RE.findall(text) if len(token) > 1]
+
+
+def _bucket(feature: str) -> tuple:
+    digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+    value = int.from_bytes(digest, 'little')
+    return value % EMBEDDING_DIM, 1.0 if value >> 63 else -1.0
+
+
+def embed_tokens(tokens: list) -> np.ndarray:
+    """Hashed unigram + bigram embedding; needs no model, so it works offline."""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    for feature in features:
+        index, sign = _bucket(feature)
+        vector[index] += sign
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def read_document(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.docx':
+        from docx import Document
+        return '\n'.join(p.text for p in Document(path).paragraphs)
+    if extension == '.pdf':
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            logger.warning(f"⚠ Skipping {path}: install pypdf to index PDF files")
+            return ''
+        return '\n'.join(page.extract_text() or '' for page in PdfReader(path).pages)
+    with open(path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    if extension in ('.html', '.htm'):
+        text = _TAG_RE.sub(' ', text)
+    return text
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS) -> list:
+    """Splits text into chunks of roughly `size` characters on paragraph boundaries."""
+    chunks, current = [], ''
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > size:
+            chunks.append(current)
+            current = ''
+        while len(paragraph) > size:
+            chunks.append(paragraph[:size])
+            paragraph = paragraph[size:]
+        current = f'{current}\n\n{paragraph}' if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _iter_source_files(sources: list):
+    for source in sources:
+        base = os.path.dirname(os.path.abspath(source.rstrip('/')))
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS | {'.docx', '.pdf'}:
+                    yield path, os.path.relpath(path, base)
+
+
+def _fingerprint(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def current_version(index_dir: str) -> str:
+    """The live version directory of an index, or '' for one built before versions (files in `index_dir` itself)."""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ''
+
+
+class LocalIndex:
+    """Read-only view of one version of a built index; all arrays are memory-mapped."""
+
+    def __init__(self, index_dir: str = LOCAL_INDEX_DIR):
+        self.index_dir = index_dir
+        self.version = current_version(index_dir)
+        data_dir = os.path.join(index_dir, self.version)
+        with open(os.path.join(data_dir, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(data_dir, 'vocab.json'), encoding='utf-8') as f:
+            self.vocab = json.load(f)
+        self.term_ids = {term: i for i, term in enumerate(self.vocab)}
+
+        def load(name):
+            return np.load(os.path.join(data_dir, f'{name}.npy'), mmap_mode='r')
+
+        self.vectors = load('vectors')
+        self.chunk_lengths = load('chunk_lengths')
+        self.chunk_docs = load('chunk_docs')
+        self.text_offsets = load('text_offsets')
+        self.tf_indptr = load('tf_indptr')
+        self.tf_terms = load('tf_terms')
+        self.tf_counts = load('tf_counts')
+        self.post_indptr = load('post_indptr')
+        self.post_chunks = load('post_chunks')
+        self.post_counts = load('post_counts')
+        self.texts = np.memmap(os.path.join(data_dir, 'texts.bin'), dtype=np.uint8, mode='r') \
+            if os.path.getsize(os.path.join(data_dir, 'texts.bin')) else np.zeros(0, dtype=np.uint8)
+        self.avg_length = float(self.chunk_lengths.mean()) if len(self.chunk_lengths) else 0.0
+
+    def is_current(self) -> bool:
+        """False once a rebuild has switched the index to a newer version."""
+        return current_version(self.index_dir) == self.version
+
+    def __len__(self) -> int:
+        return len(self.chunk_lengths)
+
+    def chunk(self, i: int) -> str:
+        return bytes(self.texts[self.text_offsets[i]:self.text_offsets[i + 1]]).decode('utf-8')
+
+    def bm25(self, tokens: list) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        lengths = np.asarray(self.chunk_lengths, dtype=np.float32)
+        for term in set(tokens):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.post_indptr[term_id], self.post_indptr[term_id + 1]
+            chunks = self.post_chunks[start:end]
+            tf = np.asarray(self.post_counts[start:end], dtype=np.float32)
+            idf = np.log1p((len(self) - len(chunks) + 0.5) / (len(chunks) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[chunks] / self.avg_length)
+            scores[chunks] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        if not len(self):
+            return []
+        tokens = tokenize(query)
+        lexical = self.bm25(tokens)
+        if lexical.max() > 0:
+            lexical /= lexical.max()
+        dense = np.clip(self.vectors @ embed_tokens(tokens), 0, None)
+        scores = (1 - DENSE_WEIGHT) * lexical + DENSE_WEIGHT * dense
+
+        k = min(max_results, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        documents = self.manifest['documents']
+        return [
+            {
+                'title': documents[self.chunk_docs[i]]['title'],
+                'url': documents[self.chunk_docs[i]]['path'],
+                'content': self.chunk(i),
+            }
+            for i in top if scores[i] > 0
+        ]
+
+
+def build_index(sources: list, index_dir: str = LOCAL_INDEX_DIR) -> dict:
+    """Builds the index, reusing the rows of documents that have not changed."""
+    previous = None
+    if os.path.exists(os.path.join(index_dir, current_version(index_dir), 'manifest.json')):
+        previous = LocalIndex(index_dir)
+    previous_docs = {d['path']: (i, d) for i, d in enumerate(previous.manifest['documents'])} if previous else {}
+    previous_chunks = {}
+    if previous:
+        for i, doc_id in enumerate(previous.chunk_docs):
+            previous_chunks.setdefault(int(doc_id), []).append(i)
+
+    documents, texts, vectors, term_counts = [], [], [], []
+    reused = indexed = 0
+    for path, rel_path in _iter_source_files(sources):
+        stat = os.stat(path)
+        old = previous_docs.get(rel_path)
+        sha = None
+        if old and (old[1]['size'], old[1]['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            sha = _fingerprint(path)
+        unchanged = old and (sha is None or sha == old[1]['sha1'])
+        doc = {
+            'path': rel_path,
+            'title': os.path.splitext(os.path.basename(rel_path))[0].replace('_', ' '),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': old[1]['sha1'] if unchanged else (sha or _fingerprint(path)),
+        }
+        doc_id = len(documents)
+        documents.append(doc)
+
+        if unchanged:
+            for i in previous_chunks.get(old[0], []):
+                start, end = previous.tf_indptr[i], previous.tf_indptr[i + 1]
+                texts.append((doc_id, previous.chunk(i)))
+                vectors.append(np.asarray(previous.vectors[i]))
+                term_counts.append({previous.vocab[t]: int(c) for t, c in zip(previous.tf_terms[start:end], previous.tf_counts[start:end])})
+            reused += 1
+            continue
+
+        for chunk in chunk_text(read_document(path)):
+            tokens = tokenize(f"{doc['title']} {chunk}")
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            texts.append((doc_id, chunk))
+            vectors.append(embed_tokens(tokens))
+            term_counts.append(counts)
+        indexed += 1
+
+    _write_index(index_dir, documents, texts, vectors, term_counts)
+    removed = len(set(previous_docs) - {d['path'] for d in documents})
+    stats = {'documents': len(documents), 'chunks': len(texts), 'reindexed': indexed, 'reused': reused, 'removed': removed}
+    logger.info(f"✓ Local index built in {index_dir}: {stats}")
+    return stats
+
+
+def _write_index(index_dir, documents, texts, vectors, term_counts):
+    vocab = sorted({term for counts in term_counts for term in counts})
+    term_ids = {term: i for i, term in enumerate(vocab)}
+
+    tf_indptr = np.zeros(len(term_counts) + 1, dtype=np.int64)
+    tf_terms, tf_counts = [], []
+    for i, counts in enumerate(term_counts):
+        tf_terms.extend(term_ids[term] for term in counts)
+        tf_counts.extend(counts.values())
+        tf_indptr[i + 1] = len(tf_terms)
+    tf_terms = np.asarray(tf_terms, dtype=np.int32)
+    tf_counts = np.asarray(tf_counts, dtype=np.int32)
+
+    # Term-major postings for BM25, derived from the chunk-major term counts.
+    chunk_of_entry = np.repeat(np.arange(len(term_counts), dtype=np.int32), np.diff(tf_indptr))
+    order = np.argsort(tf_terms, kind='stable')
+    post_indptr = np.concatenate([[0], np.cumsum(np.bincount(tf_terms, minlength=len(vocab)))]).astype(np.int64)
+
+    encoded = [text.encode('utf-8') for _, text in texts]
+    text_offsets = np.concatenate([[0], np.cumsum([len(b) for b in encoded])]).astype(np.int64)
+
+    previous_version = current_version(index_dir)
+    version = f'v{time.time_ns()}-{os.getpid()}'
+    version_dir = os.path.join(index_dir, version)
+    os.makedirs(version_dir)
+    arrays = {
+        'vectors': np.asarray(vectors, dtype=np.float32).reshape(len(vectors), EMBEDDING_DIM),
+        'chunk_lengths': np.asarray([sum(c.values()) for c in term_counts], dtype=np.int32),
+        'chunk_docs': np.asarray([doc_id for doc_id, _ in texts], dtype=np.int32),
+        'text_offsets': text_offsets,
+        'tf_indptr': tf_indptr,
+        'tf_terms': tf_terms,
+        'tf_counts': tf_counts,
+        'post_indptr': post_indptr,
+        'post_chunks': chunk_of_entry[order],
+        'post_counts': tf_counts[order],
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(version_dir, f'{name}.npy'), array)
+    with open(os.path.join(version_dir, 'texts.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+    with open(os.path.join(version_dir, 'vocab.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(version_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'built_at': time.time(), 'embedding_dim': EMBEDDING_DIM, 'documents': documents}, f, indent=2)
+
+    # Replacing the pointer is atomic: readers see either the old version or the new one, never a partial index.
+    pointer = os.path.join(index_dir, f'{CURRENT_FILE}.tmp-{os.getpid()}')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(index_dir, CURRENT_FILE))
+    _remove_old_versions(index_dir, keep={version, previous_version})
+
+
+def _remove_old_versions(index_dir: str, keep: set) -> None:
+    """Deletes versions older than the kept ones, and the files of an index built before versions."""
+    newest = max(int(_VERSION_RE.match(v).group(1)) for v in keep if v)
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        match = _VERSION_RE.match(name)
+        if match and name not in keep and int(match.group(1)) < newest:
+            shutil.rmtree(path, ignore_errors=True)
+        elif _UNVERSIONED_FILES.match(name) and os.path.isfile(path):
+            os.remove(path)  # mapped by a reader of the old layout, which keeps its copy until it unmaps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline knowledge base index.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Index new or changed documents.")
+    build.add_argument('--source', action='append', required=True, help="Directory with documents (repeatable).")
+    build.add_argument('--index', default=LOCAL_INDEX_DIR)
+
+    query = commands.add_parser('query', help="Run a test query against the index.")
+    query.add_argument('text')
+    query.add_argument('--index', default=LOCAL_INDEX_DIR)
+    query.add_argument('--max-results', type=int, default=5)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'build':
+        print(json.dumps(build_index(args.source, args.index), indent=2))
+    else:
+        started = time.perf_counter()
+        results = LocalIndex(args.index).search(args.text, args.max_results)
+        for result in results:
+            print(f"[{result['title']}] {result['content'][:120]!r}")
+        print(f"{len(results)} results in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import re
+
+from google.adk.tools import FunctionTool
+
+from ..resilience import resilience
+from .cache import normalize_query, retrieval_cache
+
+logger = logging.getLogger(__name__)
+
+_STATUS_CODE_RE = re.compile(r'^\s*(\d{3})\b')
+
+
+class SearchBackendError(Exception):
+    """An error result of DiscoveryEngineSearchTool, which catches GoogleAPICallError and returns it as a dict."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        # str(GoogleAPICallError) starts with the HTTP status, e.g. "429 Quota exceeded ...".
+        match = _STATUS_CODE_RE.match(message or '')
+        self.code = int(match.group(1)) if match else None
+
+
+class CachedVertexSearchTool(FunctionTool):
+    """Vertex AI Search over the 'Bucket-1' documentation, behind the shared retrieval cache.
+
+    The built-in VertexAiSearchTool runs inside the model, so its queries cannot
+    be cached or de-duplicated. This tool issues the same search through the
+    Discovery Engine API instead and routes every query through
+    `retrieval_cache`.
+    """
+
+    def __init__(self, search_engine_id: str = None, max_results: int = 10, cache=retrieval_cache):
+        super().__init__(self.vertex_ai_search)
+        self.search_engine_id = search_engine_id or os.getenv('SEARCH_ENGINE_ID')
+        self.max_results = max_results
+        self.cache = cache
+        self._backend = None
+
+    def _get_backend(self):
+        # Built lazily: the Discovery Engine client needs credentials.
+        if self._backend is None:
+            from google.adk.tools import DiscoveryEngineSearchTool
+            self._backend = DiscoveryEngineSearchTool(
+                search_engine_id=self.search_engine_id,
+                max_results=self.max_results,
+            )
+        return self._backend
+
+    async def vertex_ai_search(self, query: str) -> dict:
+        """Searches the Comarch knowledge base (product documentation, rate cards and competitors' offers).
+
+        Args:
+            query: The search query.
+
+        Returns:
+            A dictionary with the request status and a list of results, each with title, url and content.
+        """
+        key = f'{self.search_engine_id}|{self.max_results}|{normalize_query(query)}'
+
+        async def search():
+            result = await asyncio.to_thread(self._get_backend().discovery_engine_search, query)
+            if isinstance(result, dict) and result.get('status') == 'error':
+                raise SearchBackendError(result.get('error_message') or 'Vertex AI Search failed')
+            return result
+
+        async def fetch():
+            # Raised errors are retried (429 / 5xx), counted by the breaker and never cached.
+            return await resilience.call('vertex_search', search, site='knowledge_base')
+
+        try:
+            result = await self.cache.get_or_fetch(key, fetch)
+        except Exception as e:
+            logger.warning(f"⚠ Knowledge base search '{query[:60]}' failed: {e}")
+            return {'status': 'error', 'error_message': str(e)}
+        logger.info(f"Knowledge base search '{query[:60]}': {self.cache.stats()}")
+        return result
+
+
+class LocalSearchTool(FunctionTool):
+    """Drop-in for CachedVertexSearchTool backed by the offline index in `local_index`."""
+
+    def __init__(self, index_dir: str = None, max_results: int = 10):
+        super().__init__(self.vertex_ai_search)
+        self.index_dir = index_dir or os.getenv('LOCAL_INDEX_DIR', '.index/knowledge_base')
+        self.max_results = max_results
+        self._index = None
+
+    def _get_index(self):
+        """The loaded index, reopened once a rebuild has switched to a new version."""
+        if self._index is None or not self._index.is_current():
+            from .local_index import LocalIndex
+            self._index = LocalIndex(self.index_dir)
+        return self._index
+
+    def data_version(self) -> str:
+        """The live index version, so memoised phases that searched an older one run again (see memo.py)."""
+        from .local_index import current_version
+        return f'{os.path.abspath(self.index_dir)}:{current_version(self.index_dir)}'
+
+    async def vertex_ai_search(self, query: str) -> dict:
+        """Searches the Comarch knowledge base (product documentation, rate cards and competitors' offers).
+
+        Args:
+            query: The search query.
+
+        Returns:
+            A dictionary with the request status and a list of results, each with title, url and content.
+        """
+        try:
+            # (Re)opening the index and scoring every chunk block; keep them off the event loop.
+            results = await asyncio.to_thread(lambda: self._get_index().search(query, self.max_results))
+        except FileNotFoundError as e:
+            return {'status': 'error', 'error_message': f'Local index not built: {e}'}
+        return {'status': 'success', 'results': results}
+
+
+_knowledge_bases = {}
+
+
+def get_knowledge_base(search_engine_id: str = None, max_results: int = 10) -> FunctionTool:
+    """Returns the process-wide knowledge base tool shared by all agents.
+
+    KNOWLEDGE_BASE_BACKEND=local switches every agent to the offline index.
+    """
+    backend = os.getenv('KNOWLEDGE_BASE_BACKEND', 'vertex')
+    key = (backend, search_engine_id, max_results)
+    if key not in _knowledge_bases:
+        if backend == 'local':
+            _knowledge_bases[key] = LocalSearchTool(max_results=max_results)
+        else:
+            _knowledge_bases[key] = CachedVertexSearchTool(search_engine_id=search_engine_id, max_results=max_results)
+    return _knowledge_bases[key]
@@ -0,0 +1,336 @@
+"""
+Phase-level model routing.
+
+ROUTES assigns a model to every phase (agent name). Phases that only extract
+JSON or call tools run on the smaller FAST_MODEL. A route may name a
+`fallback` model and a per-call latency `budget_s`:
+
+- a call to the primary model that has not answered within the budget is
+  abandoned and sent to the fallback (for streamed calls: no first chunk
+  within the budget);
+- while the measured p90 of the primary exceeds the budget, calls go to the
+  fallback directly, with every ROUTING_PROBE_EVERY-th call still probing the
+  primary so the measurement stays current.
+
+Latencies are measured per phase and model and kept in ROUTING_STATS_FILE
+across restarts, so routing decisions rest on observed data:
+
+    python -m sales_agent.routing stats
+
+MODEL_ROUTES overrides routes with JSON (inline or a file path), e.g.
+'{"proposal_writer": {"model": "gemini-2.5-pro", "fallback": "gemini-2.5-flash", "budget_s": 120}}'.
+"""
+from dataclasses import asdict, dataclass
+from typing import AsyncGenerator
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+
+from .rate_limits import current_limiter, is_rate_limit_error
+from .resilience import LatencyTracker, ResilientLlm, _fresh_request, tool_agents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv('DEFAULT_MODEL', 'gemini-2.5-flash')
+FAST_MODEL = os.getenv('FAST_MODEL', 'gemini-2.5-flash-lite')
+ROUTING_STATS_FILE = os.getenv('ROUTING_STATS_FILE', '.cache/routing.json')  # empty: in memory only
+ROUTING_PROBE_EVERY = int(os.getenv('ROUTING_PROBE_EVERY', '10'))
+ROUTING_MIN_SAMPLES = int(os.getenv('ROUTING_MIN_SAMPLES', '10'))
+_SAVE_INTERVAL_S = 10.0
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    fallback: str = None
+    budget_s: float = None  # per model call
+
+
+DEFAULT_ROUTES = {
+    'orchestrator': ModelRoute(DEFAULT_MODEL),
+    'interview_analyzer': ModelRoute(FAST_MODEL, fallback=None),  # extraction into ClientProfile JSON
+    'product_matcher': ModelRoute(DEFAULT_MODEL, fallback=FAST_MODEL, budget_s=60),
+    'competitor_analyst': ModelRoute(DEFAULT_MODEL, fallback=FAST_MODEL, budget_s=60),
+    'pricing_calculator': ModelRoute(DEFAULT_MODEL, fallback=FAST_MODEL, budget_s=60),
+    'proposal_writer': ModelRoute(DEFAULT_MODEL, fallback=FAST_MODEL, budget_s=90),
+    'visual_generator': ModelRoute(FAST_MODEL),  # tool calls only
+    'docx_assembler': ModelRoute(FAST_MODEL),  # tool calls only
+}
+
+
+def load_routes(overrides: str = None) -> dict:
+    """DEFAULT_ROUTES updated with the MODEL_ROUTES JSON (inline or a file path)."""
+    overrides = os.getenv('MODEL_ROUTES', '') if overrides is None else overrides
+    routes = dict(DEFAULT_ROUTES)
+    if not overrides.strip():
+        return routes
+    if not overrides.lstrip().startswith('{'):
+        with open(overrides, encoding='utf-8') as f:
+            overrides = f.read()
+    for phase, route in json.loads(overrides).items():
+        base = asdict(routes.get(phase, ModelRoute(DEFAULT_MODEL)))
+        routes[phase] = ModelRoute(**{**base, **(route if isinstance(route, dict) else {'model': route})})
+    return routes
+
+
+class ModelRouter:
+    """Routes and measured call latencies per (phase, model)."""
+
+    def __init__(self, routes: dict = None, stats_file: str = ROUTING_STATS_FILE):
+        self.routes = load_routes() if routes is None else routes
+        self.stats_file = stats_file
+        self.trackers = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._saved = 0.0
+        self._load()
+
+    def route(self, phase: str) -> ModelRoute:
+        return self.routes.get(phase) or ModelRoute(DEFAULT_MODEL)
+
+    def model_for(self, phase: str) -> str:
+        return self.route(phase).model
+
+    def _tracker(self, phase: str, model: str) -> LatencyTracker:
+        key = (phase, model)
+        if key not in self.trackers:
+            self.trackers[key] = LatencyTracker(min_samples=ROUTING_MIN_SAMPLES)
+            self.counts[key] = {'calls': 0, 'over_budget': 0, 'errors': 0, 'routed_to_fallback': 0}
+        return self.trackers[key]
+
+    def choose(self, phase: str) -> str:
+        """The model for the next call: the fallback while the primary's p90 is over budget, bar probes."""
+        route = self.route(phase)
+        if not route.fallback or not route.budget_s:
+            return route.model
+        with self._lock:
+            tracker = self._tracker(phase, route.model)
+            p90 = tracker.percentile(90) if len(tracker.samples) >= tracker.min_samples else None
+            counts = self.counts[(phase, route.model)]
+            if p90 is None or p90 < route.budget_s:  # calls cut off at the budget are recorded as taking exactly it
+                return route.model
+            counts['routed_to_fallback'] += 1
+            if counts['routed_to_fallback'] % ROUTING_PROBE_EVERY == 0:
+                return route.model
+        return route.fallback
+
+    def record(self, phase: str, model: str, seconds: float, over_budget: bool = False, error: bool = False) -> None:
+        with self._lock:
+            self._tracker(phase, model).record(seconds)
+            counts = self.counts[(phase, model)]
+            counts['calls'] += 1
+            counts['over_budget'] += over_budget
+            counts['errors'] += error
+            due = self.stats_file and time.time() - self._saved > _SAVE_INTERVAL_S
+        if due:
+            self.save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = {}
+            for (phase, model), tracker in sorted(self.trackers.items()):
+                route = self.route(phase)
+                rows[f'{phase}/{model}'] = {
+                    'phase': phase,
+                    'model': model,
+                    'role': 'primary' if model == route.model else 'fallback' if model == route.fallback else 'other',
+                    'budget_s': route.budget_s,
+                    **self.counts[(phase, model)],
+                    'p50_s': round(tracker.percentile(50), 3) if tracker.samples else None,
+                    'p90_s': round(tracker.percentile(90), 3) if tracker.samples else None,
+                }
+            return rows
+
+    def save(self) -> None:
+        with self._lock:
+            self._saved = time.time()
+            data = {
+                f'{phase}\t{model}': {'samples': list(tracker.samples), **self.counts[(phase, model)]}
+                for (phase, model), tracker in self.trackers.items()
+            }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.stats_file)), exist_ok=True)
+            temporary = f'{self.stats_file}.{os.getpid()}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temporary, self.stats_file)
+        except OSError as e:
+            logger.warning(f"⚠ Could not save routing stats: {e}")
+
+    def _load(self) -> None:
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠ Ignoring unreadable routing stats {self.stats_file}: {e}")
+            return
+        for key, entry in data.items():
+            phase, _, model = key.partition('\t')
+            tracker = self._tracker(phase, model)
+            tracker.samples.extend(entry.pop('samples', []))
+            self.counts[(phase, model)].update(entry)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.trackers, self.counts = {}, {}
+
+
+router = ModelRouter()
+
+
+def model_for(phase: str) -> str:
+    """The configured primary model of a phase; agents use it instead of a hard-coded name."""
+    return router.model_for(phase)
+
+
+class RoutedLlm(BaseLlm):
+    """
+    A phase's model with latency-budget fallback (see module docstring).
+
+    `model` stays the primary's name; calls that go to the fallback carry the
+    fallback's name in the request.
+    """
+
+    phase: str
+    primary: BaseLlm
+    fallback: BaseLlm
+    router: ModelRouter = None
+
+    model_config = {'arbitrary_types_allowed': True}
+
+    def _router(self) -> ModelRouter:
+        return self.router or router
+
+    async def _call(self, llm, llm_request, stream: bool, budget_s: float = None):
+        """
+        Yields the responses of one model; raises TimeoutError when `budget_s` passes before the first one.
+
+        Records the time to the whole answer, or for streams to the first chunk, which is what the budget bounds.
+        Throttles the call through the runner's rate limiter (if any) in the bucket of the model called.
+        """
+        request = _fresh_request(llm_request)
+        request.model = llm.model
+        limiter = current_limiter.get()
+        if limiter:
+            await limiter.model_bucket(llm.model).acquire()
+        responses = llm.generate_content_async(request, stream=stream)
+        started = time.perf_counter()
+        first = True
+        elapsed = None
+        try:
+            while True:
+                try:
+                    if first and budget_s:
+                        response = await asyncio.wait_for(anext(responses), budget_s)
+                    else:
+                        response = await anext(responses)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self._router().record(self.phase, llm.model, time.perf_counter() - started, over_budget=True)
+                    raise
+                except Exception as e:
+                    self._router().record(self.phase, llm.model, time.perf_counter() - started, error=True)
+                    if limiter and is_rate_limit_error(e):
+                        limiter.model_bucket(llm.model).penalize()
+                    raise
+                if first and stream:
+                    elapsed = time.perf_counter() - started
+                first = False
+                yield response
+        finally:
+            await responses.aclose()
+        self._router().record(self.phase, llm.model, elapsed or time.perf_counter() - started)
+        if limiter:
+            limiter.model_bucket(llm.model).reward()
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        route = self._router().route(self.phase)
+        if self._router().choose(self.phase) != self.primary.model:
+            async for response in self._call(self.fallback, llm_request, stream):
+                yield response
+            return
+
+        yielded = False
+        try:
+            if stream:
+                # Only the wait for the first chunk is bounded: later chunks are already being consumed.
+                async for response in self._call(self.primary, llm_request, stream, route.budget_s):
+                    yielded = True
+                    yield response
+                return
+            responses = [r async for r in self._call(self.primary, llm_request, stream, route.budget_s)]
+        except asyncio.TimeoutError:
+            if yielded:
+                # A later chunk timed out (e.g. ResilientLlm's per-chunk timeout): the fallback's answer
+                # would be appended to the part of the primary's already passed on.
+                raise
+            logger.warning(
+                f"⚠ {self.phase}: {self.primary.model} exceeded its {route.budget_s:g}s budget, "
+                f"falling back to {self.fallback.model}"
+            )
+            async for response in self._call(self.fallback, llm_request, stream):
+                yield response
+            return
+        for response in responses:
+            yield response
+
+    def connect(self, llm_request):
+        return self.primary.connect(llm_request)
+
+
+def route_models(agent) -> None:
+    """Gives the agents under `agent` whose route has a fallback and a budget a RoutedLlm (idempotent)."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.registry import LLMRegistry
+
+    seen, stack = set(), [agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        route = router.routes.get(agent.name)
+        if (isinstance(agent, LlmAgent) and agent.model and not isinstance(agent.model, RoutedLlm)
+                and route and route.fallback and route.budget_s):
+            primary = agent.canonical_model
+            fallback = LLMRegistry.new_llm(route.fallback)
+            if isinstance(primary, ResilientLlm):
+                fallback = ResilientLlm(model=fallback.model, inner=fallback, site=f'{agent.name}:fallback')
+            agent.model = RoutedLlm(model=primary.model, phase=agent.name, primary=primary, fallback=fallback)
+        stack.extend(agent.sub_agents)
+        stack.extend(tool_agents(agent))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m sales_agent.routing', description="Show model routes and measured latencies.")
+    parser.add_argument('command', choices=['routes', 'stats'])
+    parser.add_argument('--stats-file', default=ROUTING_STATS_FILE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'routes':
+        print(json.dumps({phase: asdict(route) for phase, route in load_routes().items()}, indent=2))
+        return 0
+    rows = ModelRouter(stats_file=args.stats_file).stats()
+    print(f"{'phase':<22} {'model':<24} {'role':<9} {'calls':>6} {'p50_s':>7} {'p90_s':>7} {'budget':>7} {'over':>5} {'errors':>6}")
+    for row in rows.values():
+        print(
+            f"{row['phase']:<22} {row['model']:<24} {row['role']:<9} {row['calls']:>6} "
+            f"{row['p50_s'] if row['p50_s'] is not None else '-':>7} {row['p90_s'] if row['p90_s'] is not None else '-':>7} "
+            f"{row['budget_s'] or '-':>7} {row['over_budget']:>5} {row['errors']:>6}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
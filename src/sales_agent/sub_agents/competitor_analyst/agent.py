@@ -1,11 +1,16 @@
 import os
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
-from google.adk.tools import VertexAiSearchTool
+from google.adk.tools.google_search_tool import GoogleSearchTool
+from ...retrieval import get_knowledge_base
+from ...routing import model_for
+from .competitor_matrix import competitor_matrix
 
 SEARCH_ENGINE_ID = os.getenv('SEARCH_ENGINE_ID')
 
-pricing_knowledge_base = VertexAiSearchTool(
+# Built-in search cannot share a request with function tools; ADK wraps it in a sub-agent.
+google_search = GoogleSearchTool(bypass_multi_tools_limit=True)
+
+pricing_knowledge_base = get_knowledge_base(
     search_engine_id=SEARCH_ENGINE_ID,
     max_results=10
 )
@@ -19,9 +24,14 @@ Your goal is to compare the Comarch offer against competitor proposals and preci
     1. Comarch product documentation and descriptions (proprietary knowledge).
     2. Competitors' offers located in the catalog: **competitors-offers/**.
 
+**Competitor Matrix (`competitor_matrix`):**
+- A pre-extracted table of the competitors' offers: vendor, module, features, price points, weaknesses and the source document.
+
 **Instructions and Process:**
 1. Identify the key features and pricing points for the Comarch solution (based on VertexAISearch data).
-2. Based on the same data, identify the key features, pricing points, and **weaknesses** in the competitors' offers.
+2. **Matrix first:** Call `competitor_matrix` with the Comarch module and the client's industry to get the competitors' features,
+   pricing points, and **weaknesses**. Cite its Source column as is. Search VertexAISearch for competitors' offers only if the
+   matrix status is not `success` or it lacks a competitor you need.
 3. Generate "Why Comarch is Better?" arguments, focusing on specific, provable differentiators (e.g., technological superiority, lower TCO, better scalability, local compliance, superior support).
 4. **Citation Rule:** Always cite the source document title in square brackets at the end of every argument (e.g., [Source: Comarch CRM Description], [Source: Competitor X Offer 2024]).
 
@@ -36,11 +46,11 @@ Your goal is to compare the Comarch offer against competitor proposals and preci
 """
 
 competitor_analyst_agent = Agent(
-    model="gemini-2.5-flash",
+    model=model_for('competitor_analyst'),
     name="competitor_analyst",
     description="Strategic Competitive Analyst Generating Comarch Superiority Arguments.",
     instruction=instruction,
-    tools=[google_search, pricing_knowledge_base]
+    tools=[competitor_matrix, google_search, pricing_knowledge_base]
 )
 
 root_agent = competitor_analyst_agent
\ No newline at end of file
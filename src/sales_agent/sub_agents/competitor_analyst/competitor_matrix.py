@@ -0,0 +1,449 @@
+"""
+Pre-extracted matrix of competitors' features, prices and weaknesses.
+
+An offline job turns every competitor offer into structured rows:
+
+    vendor, module, industries, features, price_points, headline_price, currency, price_unit, weaknesses, source
+
+Rows come from the offer documents (extracted by Gemini with a response
+schema) and/or from a CSV / JSON file maintained by hand. Documents whose
+content has not changed keep their rows, so only new offers are sent to the
+model:
+
+    python -m sales_agent.sub_agents.competitor_analyst.competitor_matrix build --source competitors-offers/
+    python -m sales_agent.sub_agents.competitor_analyst.competitor_matrix build --rows offers.csv
+    python -m sales_agent.sub_agents.competitor_analyst.competitor_matrix query --module loyalty --industry airline
+
+The matrix is one uncompressed .npz file (COMPETITOR_MATRIX_PATH) of columns:
+- integer ids into small string tables for vendors, modules and sources;
+- a boolean row x industry matrix;
+- the headline price;
+- per-row text packed as UTF-8 bytes plus offsets.
+`competitor_matrix` filters it with NumPy masks, so the agent reasons over a
+short table with its citations instead of pages of retrieved offers.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+COMPETITOR_MATRIX_PATH = os.getenv('COMPETITOR_MATRIX_PATH', '.index/competitor_matrix.npz')
+MAX_MATRIX_ROWS = 25
+LIST_SEPARATOR = '; '
+# Words too generic to tell modules apart.
+_STOPWORDS = {'comarch', 'module', 'system', 'platform', 'solution', 'software', 'suite', 'management', 'and', 'for', 'the'}
+
+
+class CompetitorOffer(BaseModel):
+    """One competitor module as offered in a document (the extraction schema)."""
+    vendor: str
+    module: str = Field(description="The competitor's product or module name.")
+    industries: list[str] = Field(default_factory=list, description="Industries the offer targets; empty if generic.")
+    features: list[str] = Field(default_factory=list)
+    price_points: list[str] = Field(default_factory=list, description="Every price as stated, with currency and unit.")
+    headline_price: Optional[float] = Field(default=None, description="The main recurring or license price, as a number.")
+    currency: Optional[str] = None
+    price_unit: Optional[str] = Field(default=None, description="e.g. 'per user / month', 'flat / year', 'one-time'.")
+    weaknesses: list[str] = Field(default_factory=list, description="Limitations, gaps, extra fees or lock-in stated or implied.")
+
+
+EXTRACTION_PROMPT = """Extract every competitor product or module offered in the document below as a structured row.
+Only use facts stated in the document; leave fields empty when the document does not state them.
+Weaknesses are limitations, missing features, extra fees, long implementation times or lock-in the document reveals.
+
+Document title: {title}
+
+{text}"""
+
+
+def _words(text: str) -> set:
+    from ...retrieval.local_index import tokenize
+    return {token for token in tokenize(text or '') if token not in _STOPWORDS}
+
+
+def _split(value) -> list:
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or '').replace('|', ';').split(';') if v.strip()]
+
+
+_NUMBER_RE = re.compile(r"\d[\d\s.,'’]*")
+_CURRENCY_SYMBOLS = {'€': 'EUR', '$': 'USD', '£': 'GBP', 'zł': 'PLN'}
+
+
+def parse_price(value) -> float:
+    """
+    A price as a number, leniently: "1,200", "1.200 EUR", "€900", "1.200,50 EUR" and "USD 99 / user" all parse.
+
+    With both '.' and ',' the last one is the decimal point; a repeated separator, or a single one followed
+    by exactly three digits ("1.200" is 1200, "0.500" and "1.25" are decimals), groups thousands.
+    Raises ValueError when there is no number.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(str(value))
+    if not match:
+        raise ValueError(f'no number in {value!r}')
+    number = re.sub(r"[\s'’]", '', match.group()).rstrip('.,')
+    if '.' in number and ',' in number:
+        decimal = max('.,', key=number.rfind)
+    elif number.count(',') + number.count('.') == 1:
+        separator = ',' if ',' in number else '.'
+        whole, _, fraction = number.partition(separator)
+        decimal = None if len(fraction) == 3 and whole != '0' else separator
+    else:
+        decimal = None
+    whole, _, fraction = number.rpartition(decimal) if decimal else (number, '', '')
+    return float(re.sub(r'[.,]', '', whole) + (f'.{fraction}' if decimal else ''))
+
+
+def _normalize(row: dict, source: str = None, digest: str = '') -> dict:
+    price = row.get('headline_price')
+    currency = str(row.get('currency') or '').strip().upper()
+    headline_price = float('nan')
+    if price not in (None, ''):
+        try:
+            headline_price = parse_price(price)
+        except ValueError:
+            logger.warning(f"⚠ {row.get('vendor')} / {row.get('module')}: unreadable headline price {price!r}, left empty")
+        if not currency:
+            currency = next((code for symbol, code in _CURRENCY_SYMBOLS.items() if symbol in str(price)), '')
+    return {
+        'vendor': str(row.get('vendor') or '').strip(),
+        'module': str(row.get('module') or '').strip(),
+        'industries': sorted({i.casefold() for i in _split(row.get('industries'))}),
+        'features': _split(row.get('features')),
+        'price_points': _split(row.get('price_points')),
+        'headline_price': headline_price if math.isfinite(headline_price) else float('nan'),
+        'currency': currency,
+        'price_unit': str(row.get('price_unit') or '').strip(),
+        'weaknesses': _split(row.get('weaknesses')),
+        'source': source or str(row.get('source') or '').strip(),
+        'digest': digest,
+    }
+
+
+# === MATRIX ===
+
+# Per-row text columns, stored as `<name>_bytes` (UTF-8) and `<name>_offsets`.
+TEXT_COLUMNS = ('features', 'price_points', 'weaknesses', 'currency', 'price_unit', 'digest')
+
+
+def _pack(values: list) -> tuple:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.concatenate([[0], np.cumsum([len(b) for b in encoded], dtype=np.int64)]).astype(np.int64)
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+class CompetitorMatrix:
+    """The columns of a built matrix; `query` returns the row indices matching a filter."""
+
+    def __init__(self, columns: dict, source_path: str = None):
+        self.columns = columns
+        self.source_path = source_path
+        self.module_words = [_words(module) for module in columns['modules']]
+        # Query-independent parts of the filters, computed once per load.
+        self.generic = ~columns['industry_matrix'].any(axis=1)
+        self.price_order = np.nan_to_num(columns['headline_price'], nan=np.inf)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompetitorMatrix':
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files}, path)
+
+    def __len__(self) -> int:
+        return len(self.columns['vendor_id'])
+
+    @classmethod
+    def from_rows(cls, rows: list) -> 'CompetitorMatrix':
+        def table(values):
+            names = sorted(set(values))
+            ids = {name: i for i, name in enumerate(names)}
+            return names, np.array([ids[v] for v in values], dtype=np.int32)
+
+        vendors, vendor_id = table([r['vendor'] for r in rows])
+        modules, module_id = table([r['module'] for r in rows])
+        sources, source_id = table([r['source'] for r in rows])
+        industries = sorted({i for r in rows for i in r['industries']})
+        industry_ids = {name: i for i, name in enumerate(industries)}
+        industry_matrix = np.zeros((len(rows), len(industries)), dtype=bool)
+        for i, row in enumerate(rows):
+            industry_matrix[i, [industry_ids[name] for name in row['industries']]] = True
+
+        def text(values):
+            return np.array(values, dtype=str) if values else np.zeros(0, dtype='<U1')
+
+        columns = {
+            'vendors': text(vendors), 'modules': text(modules), 'sources': text(sources), 'industries': text(industries),
+            'vendor_id': vendor_id, 'module_id': module_id, 'source_id': source_id,
+            'industry_matrix': industry_matrix,
+            'headline_price': np.array([r['headline_price'] for r in rows], dtype=np.float64),
+        }
+        for name in TEXT_COLUMNS:
+            values = [r[name] if isinstance(r[name], str) else LIST_SEPARATOR.join(r[name]) for r in rows]
+            columns[f'{name}_bytes'], columns[f'{name}_offsets'] = _pack(values)
+        return cls(columns)
+
+    def _text(self, name: str, i: int) -> str:
+        offsets = self.columns[f'{name}_offsets']
+        return self.columns[f'{name}_bytes'][offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def row(self, i: int) -> dict:
+        c = self.columns
+        price = float(c['headline_price'][i])
+        return {
+            'vendor': str(c['vendors'][c['vendor_id'][i]]),
+            'module': str(c['modules'][c['module_id'][i]]),
+            'industries': [str(c['industries'][j]) for j in np.flatnonzero(c['industry_matrix'][i])],
+            'features': _split(self._text('features', i)),
+            'price_points': _split(self._text('price_points', i)),
+            'headline_price': None if np.isnan(price) else price,
+            'currency': self._text('currency', i),
+            'price_unit': self._text('price_unit', i),
+            'weaknesses': _split(self._text('weaknesses', i)),
+            'source': str(c['sources'][c['source_id'][i]]),
+            'digest': self._text('digest', i),
+        }
+
+    def rows(self) -> list:
+        return [self.row(i) for i in range(len(self))]
+
+    def query(self, module: str = '', industry: str = '', vendor: str = '') -> np.ndarray:
+        """Indices of the rows matching every given filter, cheapest headline price first.
+
+        `module` matches modules sharing a significant word with it, `industry`
+        matches rows targeting that industry or no industry in particular, and
+        `vendor` is a case-insensitive substring.
+        """
+        c = self.columns
+        mask = np.ones(len(self), dtype=bool)
+        if module.strip():
+            wanted = _words(module)
+            mask &= np.array([bool(words & wanted) for words in self.module_words], dtype=bool)[c['module_id']]
+        if industry.strip():
+            needle = industry.casefold()
+            industry_ids = [i for i, name in enumerate(c['industries']) if name in needle or needle in name]
+            mask &= c['industry_matrix'][:, industry_ids].any(axis=1) | self.generic
+        if vendor.strip():
+            needle = vendor.casefold()
+            mask &= np.array([needle in name.casefold() for name in c['vendors']], dtype=bool)[c['vendor_id']]
+        indices = np.flatnonzero(mask)
+        return indices[np.argsort(self.price_order[indices], kind='stable')]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temporary, **self.columns)
+        os.replace(temporary, path)
+
+
+def format_matrix(rows: list) -> str:
+    """Renders matrix rows as the markdown table the agent reasons over."""
+    lines = [
+        '| Vendor | Module | Key Features | Price Points | Weaknesses | Source |',
+        '|---|---|---|---|---|---|',
+    ]
+    for row in rows:
+        cells = [
+            row['vendor'], row['module'], LIST_SEPARATOR.join(row['features']),
+            LIST_SEPARATOR.join(row['price_points']) or 'not stated', LIST_SEPARATOR.join(row['weaknesses']) or '-',
+            f"[Source: {row['source']}]",
+        ]
+        lines.append('| ' + ' | '.join(cell.replace('|', '/').replace('\n', ' ') for cell in cells) + ' |')
+    return '\n'.join(lines)
+
+
+_matrix_cache = {}
+
+
+def get_competitor_matrix():
+    """Loads the matrix once per process (reloaded when the file changes); None when it is not built."""
+    path = COMPETITOR_MATRIX_PATH
+    if not path or not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    cached = _matrix_cache.get(path)
+    if not cached or cached[0] != mtime:
+        _matrix_cache[path] = (mtime, CompetitorMatrix.load(path))
+    return _matrix_cache[path][1]
+
+
+def matrix_version() -> str:
+    """Identifies the built matrix (path, modification time and size), '' when it is not built."""
+    path = COMPETITOR_MATRIX_PATH
+    if not path or not os.path.exists(path):
+        return ''
+    stat = os.stat(path)
+    return f'{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def competitor_matrix(module: str = '', industry: str = '', vendor: str = '') -> dict:
+    """
+    Looks up competitors' features, price points and weaknesses in the pre-extracted competitor matrix.
+
+    Args:
+        module: The Comarch module or capability to compare (e.g., 'loyalty management'); empty for all.
+        industry: The client's industry (e.g., 'airline'); empty for all. Offers not aimed at an industry always match.
+        vendor: Only this competitor (e.g., 'Salesforce'); empty for all.
+
+    Returns:
+        A markdown table of matching competitor rows, cheapest first, with a source citation per row.
+    """
+    matrix = get_competitor_matrix()
+    if matrix is None:
+        return {'status': 'unavailable', 'message': 'The competitor matrix is not built. Use the knowledge base search instead.'}
+    started = time.perf_counter()
+    indices = matrix.query(module, industry, vendor)
+    elapsed_us = (time.perf_counter() - started) * 1e6
+    logger.info(f"Competitor matrix: {len(indices)} of {len(matrix)} row(s) for module={module!r} industry={industry!r} in {elapsed_us:.0f} µs")
+    if not len(indices):
+        return {'status': 'no_match', 'message': 'No pre-extracted competitor offer matches; search the knowledge base for this module.'}
+    return {
+        'status': 'success',
+        'rows': int(len(indices)),
+        'matrix_markdown': format_matrix([matrix.row(i) for i in indices[:MAX_MATRIX_ROWS]]),
+        'truncated': bool(len(indices) > MAX_MATRIX_ROWS),
+    }
+
+
+competitor_matrix.data_version = matrix_version  # part of the competitor phase's memo key (see memo.py)
+
+
+# === EXTRACTION JOB ===
+
+def _offer_files(sources: list):
+    from ...retrieval.local_index import TEXT_EXTENSIONS
+
+    for source in sources:
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS | {'.docx', '.pdf'}:
+                    yield os.path.join(root, name)
+
+
+def extract_offers(text: str, title: str, client=None, model: str = None) -> list:
+    """Asks Gemini for the structured rows of one offer document."""
+    from google.genai import Client, types
+    from ...routing import DEFAULT_MODEL
+
+    client = client or Client()
+    response = client.models.generate_content(
+        model=model or DEFAULT_MODEL,
+        contents=EXTRACTION_PROMPT.format(title=title, text=text),
+        config=types.GenerateContentConfig(
+            response_mime_type='application/json', response_schema=list[CompetitorOffer], temperature=0.0,
+        ),
+    )
+    return [offer.model_dump() for offer in response.parsed or []]
+
+
+def load_rows(path: str) -> list:
+    """Hand-maintained rows from a CSV (lists separated by ';') or JSON file."""
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = json.load(f) if path.endswith('.json') else list(csv.DictReader(f))
+    return [_normalize(row, digest=f'rows:{os.path.basename(path)}') for row in rows]
+
+
+def build_matrix(sources: list = (), rows_files: list = (), path: str = COMPETITOR_MATRIX_PATH, extract=extract_offers) -> dict:
+    """
+    Builds the matrix, extracting only offer documents that are new or changed since the last build.
+
+    Document rows are rebuilt from `sources` and hand-maintained rows from `rows_files`; when one of the two
+    is not given, that kind of row is kept from the previous build.
+    """
+    from ...retrieval.local_index import read_document
+
+    previous = {}
+    if os.path.exists(path):
+        for row in CompetitorMatrix.load(path).rows():
+            previous.setdefault(row['digest'], []).append(row)
+
+    rows, extracted, reused = [], 0, 0
+    for file_path in _offer_files(sources):
+        with open(file_path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        if digest in previous:
+            rows += previous[digest]
+            reused += 1
+            continue
+        title = os.path.splitext(os.path.basename(file_path))[0].replace('_', ' ')
+        try:
+            offers = extract(read_document(file_path), title)
+        except Exception as e:
+            logger.warning(f"⚠ Skipping {file_path}: extraction failed: {e}")
+            continue
+        rows += [_normalize(offer, source=title, digest=digest) for offer in offers]
+        extracted += 1
+    for rows_file in rows_files:
+        rows += load_rows(rows_file)
+    kept = [
+        row for digest, previous_rows in previous.items() for row in previous_rows
+        if (not sources and not digest.startswith('rows:')) or (not rows_files and digest.startswith('rows:'))
+    ]
+    rows += kept
+
+    complete = [row for row in rows if row['vendor'] and row['module']]
+    if len(complete) < len(rows):
+        logger.warning(f"⚠ Skipped {len(rows) - len(complete)} row(s) without a vendor or module")
+    rows = complete
+    CompetitorMatrix.from_rows(rows).save(path)
+    stats = {
+        'rows': len(rows), 'extracted_documents': extracted, 'reused_documents': reused, 'kept_rows': len(kept),
+        'bytes': os.path.getsize(path),
+    }
+    logger.info(f"✓ Competitor matrix built in {path}: {stats}")
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m sales_agent.sub_agents.competitor_analyst.competitor_matrix',
+        description="Build or query the pre-extracted competitor matrix.",
+    )
+    parser.add_argument('--matrix', default=COMPETITOR_MATRIX_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser(
+        'build', help="Extract new or changed offers and write the matrix.",
+        description="Document rows are rebuilt from --source and hand-maintained rows from --rows; "
+                    "whichever of the two is omitted is kept from the previous build.",
+    )
+    build.add_argument('--source', action='append', default=[], help="Directory with competitor offers (repeatable).")
+    build.add_argument('--rows', action='append', default=[], help="CSV or JSON file of hand-maintained rows (repeatable).")
+    query = commands.add_parser('query', help="Print the rows matching a filter.")
+    query.add_argument('--module', default='')
+    query.add_argument('--industry', default='')
+    query.add_argument('--vendor', default='')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'build':
+        if not args.source and not args.rows:
+            parser.error("build needs --source and/or --rows")
+        print(json.dumps(build_matrix(args.source, args.rows, args.matrix), indent=2))
+        return 0
+    if not os.path.exists(args.matrix):
+        print(f"No competitor matrix at {args.matrix}; run the build command first.", file=sys.stderr)
+        return 1
+    matrix = CompetitorMatrix.load(args.matrix)
+    started = time.perf_counter()
+    indices = matrix.query(args.module, args.industry, args.vendor)
+    elapsed_us = (time.perf_counter() - started) * 1e6
+    print(format_matrix([matrix.row(i) for i in indices]))
+    print(f"{len(indices)} of {len(matrix)} rows in {elapsed_us:.0f} µs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
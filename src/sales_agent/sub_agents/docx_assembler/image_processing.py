@@ -0,0 +1,156 @@
+from collections import OrderedDict
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+DOCX_IMAGE_WIDTH_INCHES = 6
+DOCX_IMAGE_DPI = int(os.getenv('DOCX_IMAGE_DPI', '200'))
+DOCX_IMAGE_FORMAT = os.getenv('DOCX_IMAGE_FORMAT', 'auto')  # auto | jpeg | png | off
+DOCX_JPEG_QUALITY = int(os.getenv('DOCX_JPEG_QUALITY', '88'))
+DOCX_IMAGE_CACHE_SIZE = int(os.getenv('DOCX_IMAGE_CACHE_SIZE', '64'))
+
+# Above this many distinct colours (on a thumbnail) an image is treated as photographic.
+PHOTO_COLOR_THRESHOLD = 4096
+
+# PNG chunks and JPEG segments that carry metadata rather than pixels (ICC profiles and Adobe colour markers stay).
+_PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+_JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}  # APP1 (EXIF, XMP), APP13 (IPTC), COM
+# Image.info entries Pillow may write back on save that are still needed to render the pixels.
+_RENDERING_INFO = ('transparency', 'icc_profile')
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _is_photographic(image) -> bool:
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail((256, 256))
+    return thumbnail.getcolors(maxcolors=PHOTO_COLOR_THRESHOLD) is None
+
+
+def _strip_png_metadata(data: bytes) -> bytes:
+    out, position = [data[:8]], 8
+    while position + 12 <= len(data):
+        length = int.from_bytes(data[position:position + 4], 'big')
+        chunk_type = data[position + 4:position + 8]
+        end = position + 12 + length
+        if chunk_type not in _PNG_METADATA_CHUNKS:
+            out.append(data[position:end])
+        position = end
+    return b''.join(out)
+
+
+def _strip_jpeg_metadata(data: bytes) -> bytes:
+    out, position = [data[:2]], 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            raise ValueError('Malformed JPEG segment')
+        marker = data[position + 1]
+        if marker == 0xFF:  # fill byte
+            position += 1
+            continue
+        if marker == 0xDA:  # start of scan: the rest is entropy-coded image data
+            out.append(data[position:])
+            return b''.join(out)
+        end = position + 2 + int.from_bytes(data[position + 2:position + 4], 'big')
+        if marker not in _JPEG_METADATA_MARKERS:
+            out.append(data[position:end])
+        position = end
+    out.append(data[position:])
+    return b''.join(out)
+
+
+def strip_metadata(image_bytes: bytes, reencoded: bytes) -> bytes:
+    """
+    The original image without its metadata, losslessly for PNG and JPEG.
+
+    Other formats cannot be edited in place, so their metadata-free re-encoding is returned.
+    """
+    if image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
+        return _strip_png_metadata(image_bytes)
+    if image_bytes.startswith(b'\xff\xd8'):
+        return _strip_jpeg_metadata(image_bytes)
+    return reencoded
+
+
+def normalize_image(
+    image_bytes: bytes,
+    width_inches: float = DOCX_IMAGE_WIDTH_INCHES,
+    dpi: int = DOCX_IMAGE_DPI,
+    output_format: str = DOCX_IMAGE_FORMAT,
+    jpeg_quality: int = DOCX_JPEG_QUALITY,
+) -> bytes:
+    """
+    Prepares an image for embedding in the DOCX.
+
+    Downscales to the pixel width needed for `width_inches` at `dpi`, re-encodes
+    photographic images as JPEG and the rest as optimised PNG, and drops all
+    metadata. If re-encoding would not make the image smaller, the original
+    pixels are kept and only the metadata is dropped.
+    """
+    if output_format == 'off':
+        return image_bytes
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("⚠ Pillow is not installed; embedding images unchanged")
+        return image_bytes
+
+    key = hashlib.sha256(image_bytes).hexdigest() + f'|{width_inches}|{dpi}|{output_format}|{jpeg_quality}'
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+
+    max_width = int(width_inches * dpi)
+    if image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        image = image.resize((max_width, height), Image.LANCZOS)
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if output_format == 'auto':
+        output_format = 'jpeg' if not has_alpha and _is_photographic(image) else 'png'
+
+    buffer = io.BytesIO()
+    if output_format == 'jpeg':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    # Pillow writes some info entries (e.g. a JPEG comment) back on save.
+    image.info = {name: value for name, value in image.info.items() if name in _RENDERING_INFO}
+    if output_format == 'jpeg':
+        image.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True, progressive=True, dpi=(dpi, dpi))
+    else:
+        image.save(buffer, format='PNG', optimize=True, dpi=(dpi, dpi))
+    result = buffer.getvalue()
+    if len(result) >= len(image_bytes):
+        result = strip_metadata(image_bytes, result)
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > DOCX_IMAGE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    logger.info(f"✓ Image normalised: {len(image_bytes)} -> {len(result)} bytes ({output_format})")
+    return result
+
+
+async def normalize_images(images: list) -> list:
+    """Normalises images concurrently in worker threads; failures keep the original bytes."""
+    async def normalize(image_bytes):
+        if not image_bytes:
+            return image_bytes
+        try:
+            return await asyncio.to_thread(normalize_image, image_bytes)
+        except Exception as e:
+            logger.error(f"❌ Image normalisation failed, embedding original: {e}")
+            return image_bytes
+
+    return await asyncio.gather(*(normalize(image_bytes) for image_bytes in images))
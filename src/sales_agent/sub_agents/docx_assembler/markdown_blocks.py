@@ -0,0 +1,352 @@
+"""
+Markdown tokenizer for proposal documents.
+
+Markdown is compiled once into a tree of blocks (headings, paragraphs, nested
+lists, tables, quotes, code, rules and boilerplate directives) whose text is
+split into inline spans (bold, italic, code, links). BlockParser accepts the
+text line by line and returns each block as soon as it is complete, so the
+same tokenizer serves the streamed and the one-shot DOCX paths.
+"""
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional
+import functools
+import re
+
+
+class Span(NamedTuple):
+    """A run of inline text with uniform formatting."""
+    text: str
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+    url: Optional[str] = None
+
+
+@dataclass
+class Heading:
+    level: int
+    spans: list
+
+
+@dataclass
+class Paragraph:
+    spans: list
+
+
+@dataclass
+class ListItem:
+    spans: list
+    children: list = field(default_factory=list)  # nested ListBlocks
+
+
+@dataclass
+class ListBlock:
+    ordered: bool
+    items: list = field(default_factory=list)
+
+
+@dataclass
+class Table:
+    header: list  # list of cells, each a list of spans
+    rows: list  # may be ragged; the table builder pads them
+    aligns: list  # 'left' | 'center' | 'right' | None per column
+
+
+@dataclass
+class CodeBlock:
+    text: str
+    language: str = ''
+
+
+@dataclass
+class Quote:
+    children: list
+
+
+@dataclass
+class Rule:
+    pass
+
+
+@dataclass
+class Boilerplate:
+    """`[[boilerplate:<name>]]`: a pre-built section spliced in by the renderer."""
+    name: str
+
+
+# === INLINE ===
+
+_INLINE_RE = re.compile(
+    r'(?P<escape>\\[\\`*_\[\]()#+\-.!|])'
+    r'|(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<url>[^)\s]+)\)'
+    r'|(?P<delim>\*\*|__|\*|_)'
+)
+
+
+def _is_flanking(text: str, start: int, end: int, delim: str) -> tuple:
+    """Whether a delimiter run can open and/or close emphasis (simplified CommonMark rules)."""
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    can_open = not after.isspace()
+    can_close = not before.isspace()
+    if delim[0] == '_':  # no intraword emphasis with underscores (snake_case, file_names)
+        can_open = can_open and not before.isalnum()
+        can_close = can_close and not after.isalnum()
+    return can_open, can_close
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_inline(text: str) -> tuple:
+    """Splits inline markdown into Spans; unmatched delimiters stay literal text."""
+    tokens = []  # ('text', str) | ('code', str) | ('link', text, url) | ('delim', str, can_open, can_close)
+    position = 0
+    for match in _INLINE_RE.finditer(text):
+        if match.start() > position:
+            tokens.append(('text', text[position:match.start()]))
+        if match.group('escape'):
+            tokens.append(('text', match.group('escape')[1]))
+        elif match.group('code'):
+            tokens.append(('code', match.group('code_text').strip()))
+        elif match.group('link_text'):
+            tokens.append(('link', match.group('link_text'), match.group('url')))
+        else:
+            delim = match.group('delim')
+            tokens.append(('delim', delim, *_is_flanking(text, match.start(), match.end(), delim)))
+        position = match.end()
+    if position < len(text):
+        tokens.append(('text', text[position:]))
+
+    # Pair openers with the nearest following closer of the same kind.
+    paired, open_at = set(), {}
+    for index, token in enumerate(tokens):
+        if token[0] != 'delim':
+            continue
+        _, delim, can_open, can_close = token
+        if can_close and delim in open_at:
+            paired.update((open_at.pop(delim), index))
+        elif can_open:
+            open_at[delim] = index
+
+    spans, bold, italic = [], False, False
+
+    def add(span_text, **style):
+        if span_text:
+            style = {'bold': bold, 'italic': italic, **style}
+            if spans and spans[-1][1:] == Span(span_text, **style)[1:]:
+                spans[-1] = spans[-1]._replace(text=spans[-1].text + span_text)
+            else:
+                spans.append(Span(span_text, **style))
+
+    for index, token in enumerate(tokens):
+        kind = token[0]
+        if kind == 'delim' and index in paired:
+            if len(token[1]) == 2:
+                bold = not bold
+            else:
+                italic = not italic
+        elif kind == 'delim':
+            add(token[1])
+        elif kind == 'code':
+            add(token[1], code=True)
+        elif kind == 'link':
+            for span in parse_inline(token[1]):
+                add(span.text, bold=bold or span.bold, italic=italic or span.italic, code=span.code, url=token[2])
+        else:
+            add(token[1])
+    return tuple(spans)
+
+
+# === BLOCKS ===
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+_RULE_RE = re.compile(r'^(?:(?:\*\s*){3,}|(?:-\s*){3,}|(?:_\s*){3,})$')
+_LIST_RE = re.compile(r'^(\s*)(?:([-*+])|(\d{1,9})[.)])\s+(.*)$')
+_FENCE_RE = re.compile(r'^\s*(```+|~~~+)\s*([\w+-]*)\s*$')
+_QUOTE_RE = re.compile(r'^\s*>\s?(.*)$')
+_TABLE_SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+_BOILERPLATE_RE = re.compile(r'^\s*\[\[boilerplate:([\w-]+)\]\]\s*$')
+
+
+def _indent_width(whitespace: str) -> int:
+    return len(whitespace.replace('\t', '    '))
+
+
+def split_table_row(line: str) -> list:
+    """The cells of a `| a | b |` row; escaped pipes stay inside their cell."""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r'(?<!\\)\|', line)]
+
+
+def _alignment(cell: str):
+    cell = cell.strip()
+    if cell.startswith(':') and cell.endswith(':'):
+        return 'center'
+    if cell.endswith(':'):
+        return 'right'
+    if cell.startswith(':'):
+        return 'left'
+    return None
+
+
+def _build_list(items: list) -> ListBlock:
+    """Nests (indent, ordered, text) list lines by indentation."""
+    root = ListBlock(ordered=items[0][1])
+    stack = [(items[0][0], root)]
+    for indent, ordered, text in items:
+        while len(stack) > 1 and indent < stack[-1][0]:
+            stack.pop()
+        if indent > stack[-1][0] and stack[-1][1].items:
+            child = ListBlock(ordered=ordered)
+            stack[-1][1].items[-1].children.append(child)
+            stack.append((indent, child))
+        stack[-1][1].items.append(ListItem(list(parse_inline(text))))
+    return root
+
+
+class BlockParser:
+    """
+    Line-oriented block tokenizer.
+
+    `feed_line` returns the blocks the line completed (often none: a paragraph,
+    list or table stays open until a line that cannot continue it arrives);
+    `close` returns whatever is still open.
+    """
+
+    def __init__(self):
+        self._kind = None  # None | 'paragraph' | 'list' | 'table' | 'code' | 'quote'
+        self._lines = []
+        self._fence = None
+        self._language = ''
+        self._blank_in_list = False
+
+    def feed_line(self, line: str) -> list:
+        line = line.rstrip('\r\n')
+        if self._kind == 'code':
+            if line.strip().startswith(self._fence) and not line.strip().strip(self._fence[0]):
+                return self._finish()
+            self._lines.append(line)
+            return []
+
+        stripped = line.strip()
+        if self._kind == 'table':
+            if stripped and '|' in stripped:
+                self._lines.append(stripped)
+                return []
+            return self._finish() + self.feed_line(line)
+
+        if self._kind == 'list':
+            list_match = _LIST_RE.match(line)
+            if list_match and not _RULE_RE.match(stripped):
+                item = (_indent_width(list_match.group(1)), list_match.group(3) is not None, list_match.group(4))
+                if item[0] <= self._lines[0][0] and item[1] != self._lines[0][1]:
+                    return self._finish() + self.feed_line(line)  # bullets <-> numbers: a new list
+                self._blank_in_list = False
+                self._lines.append(item)
+                return []
+            if not stripped:
+                self._blank_in_list = True
+                return []
+            if line[:1].isspace() or not self._blank_in_list and not self._starts_block(stripped):
+                indent, ordered, text = self._lines[-1]
+                self._lines[-1] = (indent, ordered, f'{text} {stripped}')
+                self._blank_in_list = False
+                return []
+            return self._finish() + self.feed_line(line)
+
+        if self._kind == 'quote':
+            quote_match = _QUOTE_RE.match(line)
+            if quote_match:
+                self._lines.append(quote_match.group(1))
+                return []
+            if stripped and not self._starts_block(stripped):
+                self._lines.append(stripped)  # lazy continuation
+                return []
+            return self._finish() + (self.feed_line(line) if stripped else [])
+
+        if self._kind == 'paragraph':
+            if _TABLE_SEPARATOR_RE.match(stripped) and '|' in self._lines[-1] and ('|' in stripped or '-' in stripped):
+                header = self._lines.pop()
+                blocks = self._finish() if self._lines else self._reset()
+                self._kind, self._lines = 'table', [header, stripped]
+                return blocks
+            if stripped and not self._starts_block(stripped):
+                self._lines.append(stripped)
+                return []
+            return self._finish() + (self.feed_line(line) if stripped else [])
+
+        return self._start(line, stripped)
+
+    def close(self) -> list:
+        return self._finish() if self._kind else []
+
+    @staticmethod
+    def _starts_block(stripped: str) -> bool:
+        return bool(
+            _HEADING_RE.match(stripped) or _RULE_RE.match(stripped) or _LIST_RE.match(stripped)
+            or _FENCE_RE.match(stripped) or _QUOTE_RE.match(stripped) or _BOILERPLATE_RE.match(stripped)
+        )
+
+    def _start(self, line: str, stripped: str) -> list:
+        if not stripped:
+            return []
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            return [Heading(len(heading.group(1)), list(parse_inline(heading.group(2))))]
+        if _RULE_RE.match(stripped):
+            return [Rule()]
+        boilerplate = _BOILERPLATE_RE.match(stripped)
+        if boilerplate:
+            return [Boilerplate(boilerplate.group(1))]
+        fence = _FENCE_RE.match(stripped)
+        if fence:
+            self._kind, self._fence, self._language = 'code', fence.group(1), fence.group(2)
+            return []
+        list_match = _LIST_RE.match(line)
+        if list_match:
+            self._kind, self._blank_in_list = 'list', False
+            self._lines = [(_indent_width(list_match.group(1)), list_match.group(3) is not None, list_match.group(4))]
+            return []
+        quote = _QUOTE_RE.match(line)
+        if quote:
+            self._kind, self._lines = 'quote', [quote.group(1)]
+            return []
+        self._kind, self._lines = 'paragraph', [stripped]
+        return []
+
+    def _reset(self) -> list:
+        self._kind, self._lines = None, []
+        return []
+
+    def _finish(self) -> list:
+        kind, lines = self._kind, self._lines
+        self._reset()
+        if kind == 'paragraph':
+            return [Paragraph(list(parse_inline(' '.join(lines))))]
+        if kind == 'list':
+            return [_build_list(lines)]
+        if kind == 'code':
+            return [CodeBlock('\n'.join(lines), self._language)]
+        if kind == 'quote':
+            return [Quote(parse_markdown('\n'.join(lines)))]
+        if kind == 'table':
+            header, separator, *rows = lines
+            return [Table(
+                [list(parse_inline(cell)) for cell in split_table_row(header)],
+                [[list(parse_inline(cell)) for cell in split_table_row(row)] for row in rows],
+                [_alignment(cell) for cell in split_table_row(separator)],
+            )]
+        return []
+
+
+def parse_markdown(text: str) -> list:
+    """Compiles a whole markdown document into its block tree."""
+    parser = BlockParser()
+    blocks = []
+    for line in (text or '').split('\n'):
+        blocks += parser.feed_line(line)
+    return blocks + parser.close()
@@ -0,0 +1,246 @@
+"""
+Renders markdown block trees into DOCX documents built from a styled template.
+
+The template (DOCX_TEMPLATE_PATH, or python-docx's default with the Comarch
+styles applied) is loaded once per process and deep-copied for every
+document, so fonts and heading colours live in the styles rather than being
+set run by run. Boilerplate sections (`<DOCX_BOILERPLATE_DIR>/<name>.md`) are
+rendered once into XML fragments and spliced into documents with
+`[[boilerplate:<name>]]`. The sections shipped in `boilerplate/` are
+placeholders; the approved texts come from the business.
+"""
+from dataclasses import dataclass
+import copy
+import logging
+import os
+import threading
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+
+from .markdown_blocks import (
+    Boilerplate, CodeBlock, Heading, ListBlock, Paragraph, Quote, Rule, Table, parse_markdown,
+)
+from .tables import PROPOSAL_TABLE_STYLE, build_table, ensure_table_style
+
+logger = logging.getLogger(__name__)
+
+DOCX_TEMPLATE_PATH = os.getenv('DOCX_TEMPLATE_PATH', '')  # optional corporate .docx with the styles to use
+PLACEHOLDER_BOILERPLATE_DIR = os.path.join(os.path.dirname(__file__), 'boilerplate')
+BOILERPLATE_DIR = os.getenv('DOCX_BOILERPLATE_DIR', PLACEHOLDER_BOILERPLATE_DIR)  # approved company and legal texts
+
+COMARCH_BLUE = RGBColor(31, 60, 136)  # #1F3C88
+LINK_COLOR = RGBColor(5, 99, 193)
+
+
+# === TEMPLATE ===
+
+def _ensure_code_style(doc, name: str, style_type, size=None) -> None:
+    """Adds a Consolas style unless the template already defines one with that name."""
+    if any(style.name == name for style in doc.styles):
+        return
+    style = doc.styles.add_style(name, style_type)
+    if style_type == WD_STYLE_TYPE.PARAGRAPH:
+        style.base_style = doc.styles['Normal']
+    style.font.name = 'Consolas'
+    if size:
+        style.font.size = size
+
+
+def build_template(path: str = DOCX_TEMPLATE_PATH):
+    """Opens the template document and adds the styles the renderer relies on."""
+    doc = Document(path or None)
+    if not path:
+        normal = doc.styles['Normal']
+        normal.font.name = 'Calibri'
+        normal.font.size = Pt(11)
+        for name in ('Heading 1', 'Heading 2'):
+            doc.styles[name].font.color.rgb = COMARCH_BLUE
+
+    _ensure_code_style(doc, 'Code', WD_STYLE_TYPE.PARAGRAPH, Pt(9.5))
+    _ensure_code_style(doc, 'Code Char', WD_STYLE_TYPE.CHARACTER)
+    ensure_table_style(doc, str(COMARCH_BLUE))
+    return doc
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def new_document():
+    """A fresh document: a deep copy of the process-wide template."""
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = build_template()
+            logger.info(f"✓ DOCX template loaded: {DOCX_TEMPLATE_PATH or 'built-in default'}")
+        return copy.deepcopy(_template)
+
+
+# === BOILERPLATE FRAGMENTS ===
+
+@dataclass(frozen=True)
+class Fragment:
+    """Pre-rendered body elements of a boilerplate section."""
+    elements: tuple
+    links: dict  # relationship id in `elements` -> URL
+    sections: int
+
+
+_fragments = {}
+_fragments_lock = threading.RLock()  # a section may splice another
+
+
+def boilerplate_names() -> list:
+    if not os.path.isdir(BOILERPLATE_DIR):
+        return []
+    return sorted(name[:-3] for name in os.listdir(BOILERPLATE_DIR) if name.endswith('.md'))
+
+
+def boilerplate_fragment(name: str):
+    """Renders `boilerplate/<name>.md` once per process; None if there is no such section."""
+    if name in _fragments:
+        return _fragments[name]
+    with _fragments_lock:
+        if name not in _fragments:
+            path = os.path.join(BOILERPLATE_DIR, f'{name}.md')
+            if name not in boilerplate_names():
+                return None
+            with open(path, encoding='utf-8') as f:
+                blocks = parse_markdown(f.read())
+            scratch = new_document()
+            renderer = DocxRenderer(scratch)
+            renderer.render_all(blocks)
+            body = scratch.element.body
+            _fragments[name] = Fragment(
+                elements=tuple(child for child in body if child.tag != qn('w:sectPr')),
+                links={rel_id: rel.target_ref for rel_id, rel in scratch.part.rels.items() if rel.reltype == RT.HYPERLINK},
+                sections=renderer.sections_added,
+            )
+            logger.info(f"✓ Boilerplate '{name}' compiled: {len(_fragments[name].elements)} elements")
+            if os.path.samefile(BOILERPLATE_DIR, PLACEHOLDER_BOILERPLATE_DIR):
+                logger.warning(f"⚠ Boilerplate '{name}' is a placeholder; set DOCX_BOILERPLATE_DIR to the approved texts")
+    return _fragments[name]
+
+
+def splice_fragment(doc, fragment: Fragment) -> None:
+    """Appends copies of the fragment's elements to the document body."""
+    body = doc.element.body
+    for element in fragment.elements:
+        element = copy.deepcopy(element)
+        for hyperlink in element.iter(qn('w:hyperlink')):
+            url = fragment.links.get(hyperlink.get(qn('r:id')))
+            if url:
+                hyperlink.set(qn('r:id'), doc.part.relate_to(url, RT.HYPERLINK, is_external=True))
+        if body.sectPr is not None:
+            body.sectPr.addprevious(element)
+        else:
+            body.append(element)
+
+
+# === RENDERER ===
+
+def _add_spans(paragraph, spans) -> None:
+    for span in spans:
+        run = paragraph.add_run(span.text)
+        if span.bold:
+            run.bold = True
+        if span.italic:
+            run.italic = True
+        if span.code:
+            run.style = 'Code Char'
+        if span.url:
+            run.font.color.rgb = LINK_COLOR
+            run.font.underline = True
+            hyperlink = OxmlElement('w:hyperlink')
+            hyperlink.set(qn('r:id'), paragraph.part.relate_to(span.url, RT.HYPERLINK, is_external=True))
+            run._r.addprevious(hyperlink)
+            hyperlink.append(run._r)
+
+
+class DocxRenderer:
+    """Appends rendered blocks to a document; counts level 1-2 headings as sections."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.sections_added = 0
+
+    def render_all(self, blocks) -> None:
+        for block in blocks:
+            self.render(block)
+
+    def render(self, block, paragraph_style: str = None) -> None:
+        doc = self.doc
+        if isinstance(block, Heading):
+            heading = doc.add_heading('', level=min(block.level, 9))
+            _add_spans(heading, block.spans)
+            if block.level <= 2:
+                self.sections_added += 1
+        elif isinstance(block, Paragraph):
+            _add_spans(doc.add_paragraph(style=paragraph_style), block.spans)
+        elif isinstance(block, ListBlock):
+            self._render_list(block, depth=0)
+        elif isinstance(block, Table):
+            self._render_table(block)
+        elif isinstance(block, CodeBlock):
+            run = doc.add_paragraph(style='Code').add_run()
+            for index, line in enumerate(block.text.split('\n')):
+                if index:
+                    run.add_break()
+                run.add_text(line)
+        elif isinstance(block, Quote):
+            for child in block.children:
+                self.render(child, paragraph_style='Quote')
+        elif isinstance(block, Rule):
+            self._render_rule()
+        elif isinstance(block, Boilerplate):
+            fragment = boilerplate_fragment(block.name)
+            if fragment is None:
+                logger.warning(f"⚠ Unknown boilerplate section: {block.name}")
+                doc.add_paragraph().add_run(f'[Missing boilerplate section: {block.name}]').italic = True
+                return
+            splice_fragment(doc, fragment)
+            self.sections_added += fragment.sections
+
+    def _render_list(self, block: ListBlock, depth: int) -> None:
+        kind = 'Number' if block.ordered else 'Bullet'
+        style = f'List {kind}' if depth == 0 else f'List {kind} {min(depth + 1, 3)}'
+        for item in block.items:
+            _add_spans(self.doc.add_paragraph(style=style), item.spans)
+            for child in item.children:
+                self._render_list(child, depth + 1)
+
+    def _render_table(self, block: Table) -> None:
+        styles = self.doc.styles
+        table = build_table(
+            self.doc, block.header, block.rows, block.aligns,
+            style_id=styles[PROPOSAL_TABLE_STYLE].style_id,
+            code_style_id=styles['Code Char'].style_id,
+        )
+        body = self.doc.element.body
+        if body.sectPr is not None:
+            body.sectPr.addprevious(table)
+        else:
+            body.append(table)
+        self.doc.add_paragraph()
+
+    def _render_rule(self) -> None:
+        paragraph = self.doc.add_paragraph()
+        border = OxmlElement('w:pBdr')
+        bottom = OxmlElement('w:bottom')
+        for key, value in (('w:val', 'single'), ('w:sz', '6'), ('w:space', '1'), ('w:color', '1F3C88')):
+            bottom.set(qn(key), value)
+        border.append(bottom)
+        paragraph._p.get_or_add_pPr().append(border)
+
+
+def render_markdown(markdown: str):
+    """Compiles the markdown and renders it into a new document; returns (doc, sections)."""
+    doc = new_document()
+    renderer = DocxRenderer(doc)
+    renderer.render_all(parse_markdown(markdown))
+    return doc, renderer.sections_added
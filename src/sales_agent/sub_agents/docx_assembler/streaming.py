@@ -0,0 +1,85 @@
+from collections import OrderedDict
+import logging
+
+from .markdown_blocks import BlockParser
+from .rendering import DocxRenderer, new_document
+
+logger = logging.getLogger(__name__)
+
+MAX_OPEN_STREAMS = 32
+
+
+class StreamingDocxAssembler:
+    """
+    Converts proposal markdown into a DOCX document while it is still being generated.
+
+    Chunks can be fed in any size; complete lines go through the block tokenizer
+    and every block it completes (heading, paragraph, list, table...) is rendered
+    right away. Only the unfinished line and the lines of the open block are buffered.
+    """
+
+    def __init__(self):
+        self.doc = new_document()
+        self.characters_received = 0
+        self._renderer = DocxRenderer(self.doc)
+        self._parser = BlockParser()
+        self._partial_line = ''
+
+    @property
+    def sections_added(self) -> int:
+        return self._renderer.sections_added
+
+    def feed(self, chunk: str) -> None:
+        """Adds a markdown chunk and renders every block it completes."""
+        self.characters_received += len(chunk)
+        self._partial_line += chunk
+        while True:
+            line, newline, rest = self._partial_line.partition('\n')
+            if not newline:
+                break
+            self._partial_line = rest
+            self._renderer.render_all(self._parser.feed_line(line))
+
+    def close(self):
+        """Flushes the buffered line and block; returns the document."""
+        if self._partial_line:
+            self._renderer.render_all(self._parser.feed_line(self._partial_line))
+            self._partial_line = ''
+        self._renderer.render_all(self._parser.close())
+        return self.doc
+
+
+# === OPEN STREAMS ===
+# Documents being streamed by proposal_writer, keyed by the `proposal_stream_id`
+# session state value (the invocation id of the run), until docx_assembler
+# finalises them.
+
+_open_streams = OrderedDict()
+
+
+def get_stream(stream_id: str, create: bool = False):
+    assembler = _open_streams.get(stream_id)
+    if assembler is None and create:
+        assembler = _open_streams[stream_id] = StreamingDocxAssembler()
+        while len(_open_streams) > MAX_OPEN_STREAMS:
+            stale_id, _ = _open_streams.popitem(last=False)
+            logger.warning(f"⚠ Dropping unfinished DOCX stream: {stale_id}")
+    return assembler
+
+
+def pop_stream(stream_id: str):
+    return _open_streams.pop(stream_id, None)
+
+
+def discard_stream(stream_id: str) -> None:
+    """Drops a document that was streamed but never finalised, e.g. when the assembly was replayed from the memo."""
+    if pop_stream(stream_id) is not None:
+        logger.info(f"Discarded unfinalised DOCX stream: {stream_id}")
+
+
+def feed_proposal_chunk(tool_context, chunk: str) -> None:
+    """`on_text` hook for the proposal_writer phase: streams text into the document."""
+    stream_id = tool_context.invocation_id
+    if tool_context.state.get('proposal_stream_id') != stream_id:
+        tool_context.state['proposal_stream_id'] = stream_id
+    get_stream(stream_id, create=True).feed(chunk)
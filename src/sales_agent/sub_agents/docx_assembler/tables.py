@@ -0,0 +1,114 @@
+"""
+One-pass `w:tbl` builder for large tables.
+
+The whole table is written as a single XML string and parsed once, instead of
+growing a python-docx table cell by cell. Header formatting comes from the
+first-row conditional formatting of the PROPOSAL_TABLE_STYLE table style
+(plus `w:tblHeader`, so the header repeats on every page), not from per-run
+properties.
+"""
+from xml.sax.saxutils import escape
+import re
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+PROPOSAL_TABLE_STYLE = 'Comarch Table'
+BASE_TABLE_STYLES = ('Light Grid Accent 1', 'Table Grid')
+
+_TWIPS_PER_EMU = 1 / 635
+_JC = {'left': 'left', 'center': 'center', 'right': 'right'}
+_XML_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def ensure_table_style(doc, header_color: str) -> None:
+    """Adds PROPOSAL_TABLE_STYLE (bold, coloured header row) unless the template defines it."""
+    if any(style.name == PROPOSAL_TABLE_STYLE for style in doc.styles):
+        return
+    names = {style.name: style for style in doc.styles}
+    base = next((names[name] for name in BASE_TABLE_STYLES if name in names), None)
+    style = doc.styles.add_style(PROPOSAL_TABLE_STYLE, WD_STYLE_TYPE.TABLE)
+    if base is not None:
+        style.base_style = base
+    style.element.append(parse_xml(
+        f'<w:tblStylePr {nsdecls("w")} w:type="firstRow">'
+        f'<w:rPr><w:b/><w:bCs/><w:color w:val="{header_color}"/></w:rPr>'
+        '</w:tblStylePr>'
+    ))
+
+
+def _block_width_twips(doc) -> int:
+    section = doc.sections[-1]
+    return int((section.page_width - section.left_margin - section.right_margin) * _TWIPS_PER_EMU)
+
+
+def _runs_xml(spans, relate, code_style_id: str) -> str:
+    parts = []
+    for span in spans:
+        properties = ''
+        if span.code:
+            properties += f'<w:rStyle w:val="{code_style_id}"/>'
+        if span.bold:
+            properties += '<w:b/>'
+        if span.italic:
+            properties += '<w:i/>'
+        if span.url:
+            properties += '<w:color w:val="0563C1"/><w:u w:val="single"/>'
+        text = escape(_XML_INVALID_RE.sub('', span.text))
+        run = (
+            f'<w:r>{f"<w:rPr>{properties}</w:rPr>" if properties else ""}'
+            f'<w:t xml:space="preserve">{text}</w:t></w:r>'
+        )
+        parts.append(f'<w:hyperlink r:id="{relate(span.url)}">{run}</w:hyperlink>' if span.url else run)
+    return ''.join(parts)
+
+
+def build_table(doc, header: list, rows: list, aligns: list = (), style_id: str = None, code_style_id: str = 'CodeChar'):
+    """
+    Builds a `w:tbl` element; cells are lists of Spans.
+
+    Ragged rows are padded with empty cells to the widest row; `aligns` gives
+    'left' / 'center' / 'right' / None per column.
+    """
+    columns = max([len(header)] + [len(row) for row in rows]) or 1
+    width = max(_block_width_twips(doc) // columns, 1)
+    urls = {}
+
+    def relate(url):
+        if url not in urls:
+            urls[url] = doc.part.relate_to(url, RT.HYPERLINK, is_external=True)
+        return urls[url]
+
+    paragraph_properties = []
+    for column in range(columns):
+        align = _JC.get(aligns[column]) if column < len(aligns) else None
+        paragraph_properties.append(f'<w:pPr><w:jc w:val="{align}"/></w:pPr>' if align else '')
+    cell_properties = f'<w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+
+    def row_xml(cells, is_header=False):
+        cells = list(cells) + [()] * (columns - len(cells))
+        return ''.join((
+            '<w:tr>',
+            '<w:trPr><w:tblHeader/></w:trPr>' if is_header else '',
+            *(
+                f'<w:tc>{cell_properties}<w:p>{paragraph_properties[column]}{_runs_xml(spans, relate, code_style_id)}</w:p></w:tc>'
+                for column, spans in enumerate(cells)
+            ),
+            '</w:tr>',
+        ))
+
+    xml = ''.join((
+        f'<w:tbl {nsdecls("w", "r")}>',
+        '<w:tblPr>',
+        f'<w:tblStyle w:val="{style_id}"/>' if style_id else '',
+        '<w:tblW w:type="auto" w:w="0"/><w:jc w:val="center"/>',
+        '<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="1" w:lastColumn="0" w:noHBand="0" w:noVBand="1"/>',
+        '</w:tblPr>',
+        '<w:tblGrid>', f'<w:gridCol w:w="{width}"/>' * columns, '</w:tblGrid>',
+        row_xml(header, is_header=True),
+        *(row_xml(row) for row in rows),
+        '</w:tbl>',
+    ))
+    return parse_xml(xml)
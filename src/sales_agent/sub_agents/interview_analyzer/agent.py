@@ -1,12 +1,84 @@
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
+from google.adk.tools import ToolContext
+from google.adk.tools.google_search_tool import GoogleSearchTool
+from ...handoff import ClientProfile
+from ...routing import model_for
+from .entity_cache import ENTITY_CACHE_DB, EntityCache, normalize_company_name
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Combined with the function tools below, so it must run as its own search agent.
+google_search = GoogleSearchTool(bypass_multi_tools_limit=True)
+
+entity_cache = EntityCache() if ENTITY_CACHE_DB else None
+
+# What lookup_client returned during this run, read back by remember_client; `temp:` state is never persisted.
+LOOKUPS_KEY = 'temp:entity_lookups'
+
+
+async def lookup_client(client_name: str, industry: str, tool_context: ToolContext):
+    """
+    Looks a company up in the local cache of previously verified client profiles.
+
+    Args:
+        client_name: Company name as written in the input (e.g., 'Acme Logistics')
+        industry: Industry the input suggests (e.g., 'logistics'), or an empty string if unknown
+
+    Returns:
+        'fresh' with the cached profile (no search needed), 'stale' with the outdated
+        profile (verify with search), or 'miss'.
+    """
+    if entity_cache is None:
+        return {'status': 'success', 'cache': 'miss', 'message': 'Entity cache is disabled.'}
+    result = entity_cache.lookup(client_name, industry)
+    run = tool_context.state.get(LOOKUPS_KEY) or {'fresh': [], 'ambiguous': []}
+    if result['cache'] == 'fresh':
+        run['fresh'].append(result['name_key'])
+    if result['cache'] != 'miss' and result['profile_status'] == 'NEEDS_CONFIRMATION':
+        run['ambiguous'].append([client_name, industry])
+    tool_context.state[LOOKUPS_KEY] = run
+    logger.info(f"Entity cache {result['cache']} for '{client_name}' ({industry or 'any industry'})")
+    return {'status': 'success', **result}
+
+
+# Part of the analyzer phase's memo key (see memo.py), so a replay never bypasses a changed cache.
+lookup_client.data_version = lambda: entity_cache.version() if entity_cache else ''
+
+
+def remember_client(callback_context: CallbackContext):
+    """Stores the profile this run verified by search, and how a cached ambiguity was resolved."""
+    run = callback_context.state.get(LOOKUPS_KEY) or {'fresh': [], 'ambiguous': []}
+    callback_context.state[LOOKUPS_KEY] = None
+    profile = callback_context.state.get('client_profile')
+    if entity_cache is None or not isinstance(profile, dict):
+        return None
+    try:
+        if profile.get('status') == 'SUCCESS':
+            for ambiguous_name, industry in run['ambiguous']:
+                entity_cache.store_alias(ambiguous_name, industry or profile.get('industry_context', ''), profile['client_name'])
+        if normalize_company_name(profile.get('client_name')) not in run['fresh']:
+            entity_cache.store(profile)
+    except Exception as e:
+        logger.warning(f"⚠ Could not update the entity cache: {e}")
+    return None
 
 
 instruction = """You are an expert Business Analyst acting as a rigorous data gatekeeper.
 Your task is to analyze raw inputs (notes, transcripts) to construct a validated client profile JSON.
 
+**Entity Cache (check first):**
+Before any search, call `lookup_client(client_name=..., industry=...)` with the company name and industry from the input.
+- `cache: "fresh"` with `profile_status: "SUCCESS"`: reuse that verified profile (set `verification_source` to
+  "Entity cache (verified <verified>)"), update pain points and goals from the input, and do NOT search.
+- `cache: "fresh"` with `profile_status: "NEEDS_CONFIRMATION"`: the name is known to be ambiguous. If the input now says
+  which company is meant, call `lookup_client` again with that company's full name (search only if that is a miss);
+  otherwise return NEEDS_CONFIRMATION with the cached options without searching.
+- `cache: "stale"` or `"miss"`: verify with `GoogleSearch` as described below.
+
 **Tool Usage Strategy (GoogleSearch):**
-1.  **Mandatory Verification:** You MUST use the `GoogleSearch` tool to verify the `client_name` and `industry` derived from the input.
+1.  **Mandatory Verification:** Unless the entity cache returned a fresh profile, you MUST use the `GoogleSearch` tool to verify the `client_name` and `industry` derived from the input.
 2.  **Ambiguity Check:** If the company name is common (e.g., "ABC Corp", "Delta"), search for it in the context of the input's industry to pinpoint the correct entity.
 3.  **Enrichment:** Once the specific entity is identified, use search to find their size, HQ location, and recent news.
 
@@ -18,8 +90,13 @@ Your task is to analyze raw inputs (notes, transcripts) to construct a validated
 - **Scenario C (Missing Data):** Neither input nor search yields a company name.
   -> Set `status`: "MISSING_DATA".
 
+**Commercial Details:**
+When the notes state them, also fill `user_count` (number of users/seats), `deployment_preference`
+("saas" or "on_premise"), `contract_term_years` and `budget` (as stated, with currency). Leave them null otherwise;
+never guess. Downstream phases receive only these fields, not the raw notes.
+
 **Output Requirement:**
-Output ONLY a valid JSON object. No markdown blocks.
+Output ONLY a valid JSON object matching the client profile schema. No markdown blocks.
 
 **JSON Schema & Examples:**
 
@@ -31,6 +108,10 @@ Output ONLY a valid JSON object. No markdown blocks.
   "industry_context": "Mid-sized logistics firm, approx 500 employees.",
   "pain_points": ["Manual data entry", "Fleet visibility"],
   "business_goals": ["Reduce TCO", "Automate dispatch"],
+  "user_count": 150,
+  "deployment_preference": "saas",
+  "contract_term_years": 3,
+  "budget": "250k EUR",
   "confirmation_needed": false
 }
 
@@ -55,12 +136,15 @@ Output ONLY a valid JSON object. No markdown blocks.
 }
 
 **Instruction:**
-Analyze the input, use `GoogleSearch` to verify, and generate the JSON profile now."""
+Analyze the input, check the entity cache, use `GoogleSearch` to verify when needed, and generate the JSON profile now."""
                 
 interview_analyzer_agent = Agent(
-    model='gemini-2.5-flash',
+    model=model_for('interview_analyzer'),
     name="interview_analyzer",
     description="Business Analyst transforming raw notes into structured requirements. When needed, it searches additional information in Google.",
     instruction=instruction,
-    tools = [google_search]
+    tools = [lookup_client, google_search],
+    output_schema=ClientProfile,
+    output_key='client_profile',
+    after_agent_callback=remember_client,
 )
\ No newline at end of file
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CACHE_DB = os.getenv('ENTITY_CACHE_DB', '.cache/entities.sqlite3')  # empty disables the cache
+ENTITY_CACHE_TTL_DAYS = float(os.getenv('ENTITY_CACHE_TTL_DAYS', '30'))
+
+# Unambiguous legal forms only, as token sequences ("Sp. z o.o." -> sp z o o); words such as "group" or "company"
+# may be part of the name itself.
+_LEGAL_FORMS = {
+    ('inc',), ('incorporated',), ('corp',), ('corporation',), ('ltd',), ('limited',), ('llc',), ('l', 'l', 'c'),
+    ('plc',), ('gmbh',), ('ag',), ('sa',), ('s', 'a'), ('spa',), ('s', 'p', 'a'), ('bv',), ('b', 'v'), ('nv',),
+    ('n', 'v'), ('oy',), ('oyj',), ('sp', 'z', 'o', 'o'), ('spolka', 'z', 'o', 'o'), ('s', 'r', 'o'),
+}
+_LONGEST_FORM = max(len(form) for form in _LEGAL_FORMS)
+_INDUSTRY_STOP_WORDS = {
+    'a', 'an', 'and', 'the', 'of', 'for', 'in', 'firm', 'company', 'business', 'industry', 'sector',
+    'approx', 'about', 'around', 'mid', 'sized', 'large', 'small', 'employees',
+}
+
+
+def normalize_company_name(name: str) -> str:
+    """Reduces spellings of one company name to a single key.
+
+    Case, accents, punctuation, a trailing "(?)" and legal-form suffixes are
+    ignored, so "ACME Logistics, Inc." and "Acme Logistics" share a key.
+    """
+    text = unicodedata.normalize('NFKD', (name or '').replace('ł', 'l').replace('Ł', 'L'))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    tokens = re.findall(r'[a-z0-9]+', text.replace('&', ' and '))
+    stripped = True
+    while stripped:
+        stripped = False
+        for size in range(min(_LONGEST_FORM, len(tokens) - 1), 0, -1):
+            if tuple(tokens[-size:]) in _LEGAL_FORMS:
+                del tokens[-size:]
+                stripped = True
+                break
+    return ' '.join(tokens)
+
+
+def industry_terms(industry: str) -> set:
+    """The distinctive words of an industry description ("Mid-sized logistics firm" -> {'logistics'})."""
+    tokens = re.findall(r'[a-z]+', (industry or '').casefold())
+    return {token for token in tokens if len(token) > 2 and token not in _INDUSTRY_STOP_WORDS}
+
+
+class EntityCache:
+    """SQLite store of verified client profiles, so known accounts are not re-searched.
+
+    `entities` holds the last verified profile per normalised company name and
+    industry, either a SUCCESS profile or a NEEDS_CONFIRMATION result with the
+    options found; a profile from another industry is a miss, so "Delta" in
+    dentistry never returns Delta Air Lines. `aliases` records how an ambiguous name was resolved in a given
+    industry ("Delta" + aviation -> "Delta Air Lines"), so an answered
+    ambiguity is looked up directly next time.
+    """
+
+    def __init__(self, db_path: str = ENTITY_CACHE_DB, ttl_days: float = ENTITY_CACHE_TTL_DAYS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        columns = self._db.execute('PRAGMA table_info(entities)').fetchall()
+        if columns and not any(name == 'industry' and pk for _, name, _, _, _, pk in columns):
+            self._db.execute('DROP TABLE entities')  # keyed by name alone before industries were told apart
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS entities ('
+            ' name_key TEXT, status TEXT, industry TEXT, profile TEXT, verified_at REAL, PRIMARY KEY (name_key, industry));'
+            'CREATE TABLE IF NOT EXISTS aliases ('
+            ' alias_key TEXT, industry TEXT, name_key TEXT, resolved_at REAL, PRIMARY KEY (alias_key, industry));'
+        )
+        self._db.commit()
+
+    def _resolve_alias(self, key: str, terms: set):
+        rows = self._db.execute('SELECT industry, name_key FROM aliases WHERE alias_key = ?', (key,)).fetchall()
+        matching = [name_key for industry, name_key in rows if terms & set(industry.split())]
+        if not matching and not terms and len(rows) == 1:
+            matching = [rows[0][1]]
+        return matching[0] if len(matching) == 1 else None
+
+    @staticmethod
+    def _select(rows: list, terms: set):
+        """The newest row of the requested industry: one sharing the most terms, or one without a known industry."""
+        if not terms:
+            return rows[0] if len(rows) == 1 else None
+        matching = [row for row in rows if not row[0] or terms & set(row[0].split())]
+        return max(matching, key=lambda row: len(terms & set(row[0].split())), default=None)
+
+    def lookup(self, client_name: str, industry: str = '') -> dict:
+        """Returns {'cache': 'fresh' | 'stale' | 'miss', ...} with the cached profile on a hit."""
+        key = normalize_company_name(client_name)
+        if not key:
+            return {'cache': 'miss', 'name_key': key}
+        terms = industry_terms(industry)
+        with self._lock:
+            resolved = self._resolve_alias(key, terms)
+            rows = self._db.execute(
+                'SELECT industry, status, profile, verified_at FROM entities WHERE name_key = ?'
+                ' ORDER BY verified_at DESC', (resolved or key,)
+            ).fetchall()
+        # An alias was already resolved for this industry; otherwise the profile must be from the same industry.
+        row = (rows[0] if rows else None) if resolved else self._select(rows, terms)
+        if row is None:
+            self.misses += 1
+            return {'cache': 'miss', 'name_key': key}
+
+        _, status, profile, verified_at = row
+        age_days = (time.time() - verified_at) / 86400
+        fresh = age_days * 86400 < self.ttl_seconds
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale += 1
+        result = {
+            'cache': 'fresh' if fresh else 'stale',
+            'name_key': resolved or key,
+            'profile_status': status,
+            'profile': json.loads(profile),
+            'verified': time.strftime('%Y-%m-%d', time.gmtime(verified_at)),
+            'age_days': round(age_days, 1),
+        }
+        if resolved:
+            result['resolved_from'] = client_name
+        return result
+
+    def store(self, profile: dict) -> None:
+        """Stores a SUCCESS or NEEDS_CONFIRMATION profile under its normalised client name and industry."""
+        key = normalize_company_name(profile.get('client_name'))
+        if not key or profile.get('status') not in ('SUCCESS', 'NEEDS_CONFIRMATION'):
+            return
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entities (name_key, status, industry, profile, verified_at) VALUES (?, ?, ?, ?, ?)',
+                (
+                    key, profile['status'], ' '.join(sorted(industry_terms(profile.get('industry_context')))),
+                    json.dumps(profile, ensure_ascii=False), time.time(),
+                ),
+            )
+            self._db.commit()
+        logger.info(f"✓ Entity cache: stored {profile['status']} profile for '{key}'")
+
+    def store_alias(self, ambiguous_name: str, industry: str, client_name: str) -> None:
+        """Remembers which company an ambiguous name turned out to be in this industry."""
+        alias_key, name_key = normalize_company_name(ambiguous_name), normalize_company_name(client_name)
+        if not alias_key or not name_key or alias_key == name_key:
+            return
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO aliases (alias_key, industry, name_key, resolved_at) VALUES (?, ?, ?, ?)',
+                (alias_key, ' '.join(sorted(industry_terms(industry))), name_key, time.time()),
+            )
+            self._db.commit()
+        logger.info(f"✓ Entity cache: '{alias_key}' resolved to '{name_key}'")
+
+    def invalidate(self, client_name: str = None) -> None:
+        """Drops one company (and the aliases pointing to it), or everything."""
+        with self._lock:
+            if client_name is None:
+                self._db.executescript('DELETE FROM entities; DELETE FROM aliases;')
+            else:
+                key = normalize_company_name(client_name)
+                self._db.execute('DELETE FROM entities WHERE name_key = ?', (key,))
+                self._db.execute('DELETE FROM aliases WHERE name_key = ? OR alias_key = ?', (key, key))
+            self._db.commit()
+
+    def version(self) -> str:
+        """Changes whenever a profile or alias is stored or dropped."""
+        with self._lock:
+            entities = self._db.execute('SELECT COUNT(*), MAX(verified_at) FROM entities').fetchone()
+            aliases = self._db.execute('SELECT COUNT(*), MAX(resolved_at) FROM aliases').fetchone()
+        return f'{self.db_path}:{entities[0]}:{entities[1]}:{aliases[0]}:{aliases[1]}'
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale + self.misses
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM entities').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'stale': self.stale,
+            'misses': self.misses,
+            'entries': entries,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
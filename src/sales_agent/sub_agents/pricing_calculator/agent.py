@@ -1,16 +1,14 @@
 import os
-from dotenv import load_dotenv
 from google.adk.agents import Agent
-from google.adk.tools import VertexAiSearchTool
-
-load_dotenv()
+from ...retrieval import get_knowledge_base
+from ...routing import model_for
+from .pricing_engine import calculate_pricing
 
 SEARCH_ENGINE_ID = os.getenv('SEARCH_ENGINE_ID')
 # SEARCH_DATASTORE_ID = os.getenv('SEARCH_DATASTORE_ID') 
-MODEL_NAME = "gemini-2.5-flash"
 
 
-pricing_knowledge_base = VertexAiSearchTool(
+pricing_knowledge_base = get_knowledge_base(
     search_engine_id=SEARCH_ENGINE_ID,
     max_results=10
 )
@@ -33,6 +31,9 @@ You are a Senior Pricing & Licensing Specialist. Your mandate is to construct ac
         * *OPEX / Recurring:* SaaS fees, Annual Software Assurance/Maintenance (SLA).
 
 3.  **CALCULATION STRATEGY:**
+    * **Rate card first:** Call `calculate_pricing` with the products, user counts, contract terms and deployment models. It computes exact, reproducible totals from the structured rate card, for every combination in one call (use it for "what if" questions too, e.g. `user_counts=[150, 200]`, `deployment_models=['saas', 'on_premise']`). If it returns `success`, use its `breakdown_markdown` and `scenarios_markdown` as-is. Do NOT redo its arithmetic.
+    * If it returns `ambiguous_products`, call it again with one of the listed product names (or the SKU) for each. If it reports mixed `currencies`, price each currency's products in a separate call and never add the totals together.
+    * Only for products listed in `missing_products` (or if the rate card is `unavailable`) fall back to the knowledge base search below.
     * If specific prices are found: Use them to calculate the total.
     * If prices are dynamic (e.g., "per user"): Ask clarifying questions or provide a "per unit" estimate.
     * If exact pricing is missing in the documents: Provide a realistic **market standard range** but explicitly flag this as an *assumption* in the output.
@@ -48,11 +49,12 @@ If the search tool yields no results for a specific product, strictly state: "Cu
 
 # --- 3. Definicja Agenta ---
 root_agent = Agent(
-    model=MODEL_NAME,
+    model=model_for('pricing_calculator'),
     name="pricing_calculator",
     description="Expert Pricing Specialist capable of estimating project budgets using internal pricing documentation.",
     instruction=pricing_specialist_instruction,
     tools=[
+        calculate_pricing,
         pricing_knowledge_base
     ]
 )
@@ -0,0 +1,306 @@
+"""
+Deterministic pricing engine over a structured rate card.
+
+The rate card is a CSV or JSON file (RATE_CARD_PATH) with one row per priced item:
+
+    sku, product, item, category, deployment, pricing_unit, billing, unit_price, currency, source
+
+- category:     license | implementation | training | setup | subscription | maintenance
+- deployment:   saas | on_premise | any
+- pricing_unit: per_user | flat | percent_of_licenses  (unit_price is then a percentage)
+- billing:      one_time | monthly | annual
+
+Without RATE_CARD_PATH, rate_card.csv or rate_card.json next to this module is used.
+
+Totals for a whole grid of scenarios (user counts x terms x deployment models)
+are computed with NumPy in one pass.
+"""
+import csv
+import itertools
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RATE_CARD_PATH = os.getenv('RATE_CARD_PATH', '')
+DEFAULT_RATE_CARD_PATHS = [
+    os.path.join(os.path.dirname(__file__), 'rate_card.csv'),
+    os.path.join(os.path.dirname(__file__), 'rate_card.json'),
+]
+DEPLOYMENTS = ('saas', 'on_premise')
+MAX_SCENARIOS = 100_000
+MAX_SCENARIO_ROWS = 50
+
+_BILLING_PER_YEAR = {'one_time': 0, 'monthly': 12, 'annual': 1}
+
+
+def _normalize_name(name) -> str:
+    """Case, punctuation and spacing do not matter: "Comarch  Loyalty-Management" == "comarch loyalty management"."""
+    return ' '.join(re.findall(r'\w+', str(name).casefold()))
+
+
+@dataclass
+class RateCard:
+    rows: list
+    source_path: str
+
+    @classmethod
+    def load(cls, path: str) -> 'RateCard':
+        if path.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                rows = json.load(f)
+        else:
+            with open(path, encoding='utf-8', newline='') as f:
+                rows = list(csv.DictReader(f))
+        for row in rows:
+            row['unit_price'] = float(row['unit_price'])
+            row['currency'] = str(row.get('currency') or '').strip().upper()
+            for field in ('category', 'deployment', 'pricing_unit', 'billing'):
+                row[field] = str(row[field]).strip().lower().replace('-', '_')
+        return cls(rows, path)
+
+    def select(self, products: list) -> tuple:
+        """
+        Returns the rows of `products` (each an exact SKU or product name), the names not on the card, and
+        {name: [candidate products]} for names that only partially match one or more products.
+        """
+        selected, missing, ambiguous = [], [], {}
+        for product in products:
+            needle = _normalize_name(product)
+            matches = [
+                row for row in self.rows
+                if needle in (_normalize_name(row['sku']), _normalize_name(row['product']))
+            ]
+            if not matches:
+                candidates = sorted({
+                    row['product'] for row in self.rows if needle and needle in _normalize_name(row['product'])
+                })
+                if candidates:
+                    ambiguous[product] = candidates
+                else:
+                    missing.append(product)
+            selected.extend(row for row in matches if row not in selected)
+        return selected, missing, ambiguous
+
+
+_rate_card_cache = {}
+
+
+def _rate_card_path():
+    candidates = [RATE_CARD_PATH] if RATE_CARD_PATH else DEFAULT_RATE_CARD_PATHS
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+def get_rate_card():
+    """Loads the rate card once per process (reloaded when the file changes)."""
+    path = _rate_card_path()
+    if path is None:
+        return None
+    mtime = os.path.getmtime(path)
+    cached = _rate_card_cache.get(path)
+    if not cached or cached[0] != mtime:
+        _rate_card_cache[path] = (mtime, RateCard.load(path))
+    return _rate_card_cache[path][1]
+
+
+def rate_card_version() -> str:
+    """Identifies the rate card in use (path, modification time and size), '' when there is none."""
+    path = _rate_card_path()
+    if path is None:
+        return ''
+    stat = os.stat(path)
+    return f'{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}'
+
+
+def _positive_ints(values) -> list:
+    """The values as ints, or None when one of them is not a positive whole number."""
+    try:
+        numbers = [float(value) for value in values]
+    except (TypeError, ValueError):
+        return None
+    if any(isinstance(value, bool) for value in values) or not all(n > 0 and n.is_integer() for n in numbers):
+        return None
+    return [int(n) for n in numbers]
+
+
+def compute_scenarios(rows: list, user_counts, term_years, deployment_models) -> dict:
+    """
+    Computes one-time, annual recurring, first-year and TCO totals for every combination
+    of user count, term and deployment model.
+
+    Returns a dict of NumPy arrays, one entry per scenario, plus the per-item matrices
+    (`item_one_time`, `item_annual`) of shape (scenarios, items).
+    """
+    grid = np.array(list(itertools.product(user_counts, term_years, range(len(deployment_models)))), dtype=np.float64)
+    users, terms, deployment_index = grid[:, 0], grid[:, 1], grid[:, 2].astype(int)
+
+    price = np.array([row['unit_price'] for row in rows], dtype=np.float64)
+    per_user = np.array([row['pricing_unit'] == 'per_user' for row in rows])
+    percent = np.array([row['pricing_unit'] == 'percent_of_licenses' for row in rows])
+    one_time = np.array([row['billing'] == 'one_time' for row in rows])
+    per_year = np.array([_BILLING_PER_YEAR[row['billing']] for row in rows], dtype=np.float64)
+    license_item = np.array([row['category'] == 'license' for row in rows]) & one_time
+    applies = np.array([
+        [row['deployment'] in ('any', deployment) for row in rows]
+        for deployment in deployment_models
+    ]).reshape(len(deployment_models), len(rows))[deployment_index]
+
+    quantity = np.where(per_user[None, :], users[:, None], 1.0)
+    base = np.where(percent[None, :], 0.0, price[None, :] * quantity) * applies
+
+    license_total = (base * license_item[None, :]).sum(axis=1)
+    percent_amount = np.where(percent[None, :], price[None, :] / 100.0 * license_total[:, None], 0.0) * applies
+    amounts = base + percent_amount
+
+    item_one_time = amounts * one_time[None, :]
+    item_annual = amounts * per_year[None, :]
+    one_time_total = item_one_time.sum(axis=1)
+    annual_total = item_annual.sum(axis=1)
+
+    return {
+        'users': users.astype(int),
+        'term_years': terms.astype(int),
+        'deployment': np.array(deployment_models)[deployment_index],
+        'one_time': np.round(one_time_total, 2),
+        'annual_recurring': np.round(annual_total, 2),
+        'first_year': np.round(one_time_total + annual_total, 2),
+        'tco': np.round(one_time_total + annual_total * terms, 2),
+        'item_one_time': np.round(item_one_time, 2),
+        'item_annual': np.round(item_annual, 2),
+    }
+
+
+def _money(value: float, currency: str) -> str:
+    return f"{value:,.2f} {currency}".strip()
+
+
+def _calculation(row: dict, users: int, currency: str) -> str:
+    unit = row['pricing_unit']
+    suffix = {'one_time': '', 'monthly': ' / month', 'annual': ' / year'}[row['billing']]
+    if unit == 'per_user':
+        return f"{_money(row['unit_price'], currency)}{suffix} x {users} users"
+    if unit == 'percent_of_licenses':
+        return f"{row['unit_price']:g}% of licenses{suffix}"
+    return f"{_money(row['unit_price'], currency)}{suffix}"
+
+
+def format_breakdown(rows: list, results: dict, index: int = 0) -> str:
+    """Renders the itemised table for one scenario in the pricing agent's output format."""
+    currency = rows[0].get('currency', '') if rows else ''
+    users = int(results['users'][index])
+    lines = [
+        '| Cost Category | Item/SKU | Unit Price / Calculation | Estimated Total | Source/Assumption |',
+        '|---|---|---|---|---|',
+    ]
+    for j, row in enumerate(rows):
+        one_time, annual = results['item_one_time'][index, j], results['item_annual'][index, j]
+        if not one_time and not annual:
+            continue
+        category = 'CAPEX / One-Time' if row['billing'] == 'one_time' else 'OPEX / Recurring (annual)'
+        total = one_time if row['billing'] == 'one_time' else annual
+        lines.append(
+            f"| {category} | {row.get('item') or row['product']} ({row['sku']}) | "
+            f"{_calculation(row, users, currency)} | {_money(total, currency)} | "
+            f"{row.get('source') or 'Rate card'} |"
+        )
+    lines += [
+        '',
+        f"**Total First Year Investment:** {_money(results['first_year'][index], currency)}",
+        f"**Annual Recurring Cost:** {_money(results['annual_recurring'][index], currency)}",
+        f"**Total Cost of Ownership ({results['term_years'][index]} years):** {_money(results['tco'][index], currency)}",
+    ]
+    return '\n'.join(lines)
+
+
+def format_scenarios(rows: list, results: dict, limit: int = MAX_SCENARIO_ROWS) -> str:
+    """Renders the scenario comparison table (first `limit` scenarios)."""
+    currency = rows[0].get('currency', '') if rows else ''
+    lines = [
+        '| Users | Term (years) | Deployment | One-Time | Annual Recurring | First Year | TCO |',
+        '|---|---|---|---|---|---|---|',
+    ]
+    for i in range(min(limit, len(results['users']))):
+        lines.append(
+            f"| {results['users'][i]} | {results['term_years'][i]} | {results['deployment'][i]} | "
+            f"{_money(results['one_time'][i], currency)} | {_money(results['annual_recurring'][i], currency)} | "
+            f"{_money(results['first_year'][i], currency)} | {_money(results['tco'][i], currency)} |"
+        )
+    return '\n'.join(lines)
+
+
+def calculate_pricing(products: list[str], user_counts: list[int], term_years: list[int], deployment_models: list[str]) -> dict:
+    """
+    Calculates exact budgets from the structured rate card for every combination of the given scenarios.
+
+    Args:
+        products: Product names or SKUs to price (e.g., ['Comarch Loyalty Management']).
+        user_counts: Numbers of users to evaluate (e.g., [150, 200]).
+        term_years: Contract terms in years to evaluate (e.g., [3, 5]).
+        deployment_models: Deployment models to compare: 'saas' and/or 'on_premise'.
+
+    Returns:
+        The itemised markdown table for the first scenario, a comparison table of all scenarios,
+        and the products missing from the rate card.
+    """
+    rate_card = get_rate_card()
+    if rate_card is None:
+        return {'status': 'unavailable', 'message': 'No structured rate card is configured. Use the knowledge base search instead.'}
+
+    deployment_models = [d.strip().lower().replace('-', '_').replace(' ', '_') for d in deployment_models] or list(DEPLOYMENTS)
+    unknown = [d for d in deployment_models if d not in DEPLOYMENTS]
+    if unknown:
+        return {'status': 'failed', 'message': f'Unknown deployment models {unknown}; use {list(DEPLOYMENTS)}.'}
+    users, terms = _positive_ints(user_counts), _positive_ints(term_years)
+    if users is None or terms is None:
+        return {
+            'status': 'failed',
+            'message': f'User counts {list(user_counts)} and terms {list(term_years)} must be positive whole numbers.',
+        }
+    user_counts, term_years = users or [1], terms or [1]
+    scenario_count = len(user_counts) * len(term_years) * len(deployment_models)
+    if scenario_count > MAX_SCENARIOS:
+        return {'status': 'failed', 'message': f'Too many scenarios ({scenario_count}); the limit is {MAX_SCENARIOS}.'}
+
+    rows, missing, ambiguous = rate_card.select(products)
+    if ambiguous:
+        return {
+            'status': 'failed',
+            'ambiguous_products': ambiguous,
+            'message': 'Some products only partially match rate card products; call again with the exact product names or SKUs.',
+        }
+    currencies = {}
+    for row in rows:
+        currencies.setdefault(row['currency'], set()).add(row['product'])
+    if len(currencies) > 1:
+        by_currency = {currency or 'unspecified': sorted(names) for currency, names in currencies.items()}
+        return {
+            'status': 'failed',
+            'currencies': by_currency,
+            'message': f"The selected rate card items are priced in different currencies ({', '.join(by_currency)}); "
+                       'price the products of each currency in a separate call.',
+        }
+    if not rows:
+        return {
+            'status': 'unavailable',
+            'missing_products': missing,
+            'message': f"Current pricing documentation for {', '.join(missing)} is unavailable in the rate card.",
+        }
+
+    results = compute_scenarios(rows, user_counts, term_years, deployment_models)
+    logger.info(f"Priced {scenario_count} scenario(s) for {len(rows)} rate card item(s)")
+    return {
+        'status': 'success',
+        'scenarios': scenario_count,
+        'breakdown_markdown': format_breakdown(rows, results),
+        'scenarios_markdown': format_scenarios(rows, results),
+        'missing_products': missing,
+        'rate_card': os.path.basename(rate_card.source_path),
+    }
+
+
+calculate_pricing.data_version = rate_card_version  # part of the pricing phase's memo key (see memo.py)
@@ -1,11 +1,14 @@
 import os
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
-from google.adk.tools import VertexAiSearchTool
+from google.adk.tools.google_search_tool import GoogleSearchTool
+from ...retrieval import get_knowledge_base
+from ...routing import model_for
 
 SEARCH_ENGINE_ID = os.getenv('SEARCH_ENGINE_ID')
 
-pricing_knowledge_base = VertexAiSearchTool(
+google_search = GoogleSearchTool(bypass_multi_tools_limit=True)
+
+pricing_knowledge_base = get_knowledge_base(
     search_engine_id=SEARCH_ENGINE_ID,
     max_results=10
 )
@@ -19,6 +22,8 @@ instruction = """You are a Solution Architect specializing in Comarch software.
                 1. For every 'pain_point' identified, search the documentation for a matching Comarch module.
                 2. Use ONLY the information from the retrieved excerpts to justify your choice.
                 3. **Citation Rule:** Always cite the source document title in square brackets at the end of the justification (e.g., [Source: Comarch ERP Standard]).
+                4. **Similar Past Proposals:** When the request lists them, reuse their module selection (with its citations) for the pain points
+                   this client shares with them, and search only for the pain points they do not cover.
 
                 **Output Format:**
                 - **Selected Module:** [Name]
@@ -29,7 +34,7 @@ instruction = """You are a Solution Architect specializing in Comarch software.
                 If no suitable product is found in the documentation, state this clearly."""
 
 root_agent = Agent(
-    model="gemini-2.5-flash",
+    model=model_for('product_matcher'),
     name="product_matcher",
     description="Solution Architect matching client needs to Comarch products.",
     instruction=instruction,
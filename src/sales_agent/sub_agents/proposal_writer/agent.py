@@ -1,4 +1,5 @@
 from google.adk.agents.llm_agent import Agent
+from ...routing import model_for
 
 instruction = """You are a Senior B2B Copywriter. 
 Your task is to synthesize structured outputs from specialized sub-agents (Analyst, Architect, Competitor Analyst, Pricing) into a cohesive, persuasive sales proposal.
@@ -9,6 +10,8 @@ You will receive a compilation of data including:
 - Product Selection (`product_matcher`)
 - Competitive Analysis (`competitor_analyst`)
 - Pricing Data (`pricing_calculator`)
+- Optionally, Similar Past Proposals for other clients: reuse their product framing and table layouts where they fit, but
+  take every name, figure and price from this client's data only.
 
 **Formatting Rules (CRITICAL):**
 1. **Markdown:** Use proper Markdown headers (#, ##) to structure the document.
@@ -18,6 +21,10 @@ You will receive a compilation of data including:
    |-----------|----------|-----------------|
    | License   | One-time | $10,000         |
    | Service   | Monthly  | $500            |
+3. **Emphasis & Lists:** Use **bold** and *italic* for emphasis; nested lists are indented by two spaces.
+4. **Boilerplate:** Do NOT write a company introduction or legal terms yourself. Put `[[boilerplate:about_comarch]]`
+   on its own line right after the Executive Summary, and `[[boilerplate:terms_and_conditions]]` on its own line at the
+   very end of the proposal. The document assembler replaces each marker with a pre-written section.
 
 **Structure & Content Guide:**
 
@@ -46,7 +53,7 @@ Professional, confident, client-focused, and concise.
 """
 
 proposal_writer_agent = Agent(
-    model='gemini-2.5-flash',
+    model=model_for('proposal_writer'),
     name='proposal_writer',
     description="Senior B2B Copywriter creating the final proposal document.",
     instruction=instruction,
@@ -1,35 +1,58 @@
+from typing import Optional
 from google.adk.agents.llm_agent import Agent
 from google.adk.tools import ToolContext
-from google.genai import types, Client
+from google.genai import types
+import asyncio
+import math
+from ...routing import model_for
+from .charts import render_chart_png
+from .image_cache import IMAGE_CACHE_DIR, ImageCache
+from .image_service import ImageGenerationService
+import logging
 
-client = Client()
+logger = logging.getLogger(__name__)
 
-async def generate_image(prompt: str, filename: str, tool_context: 'ToolContext'):
+image_service = ImageGenerationService(cache=ImageCache() if IMAGE_CACHE_DIR else None)
+
+
+def _variant_filename(filename: str, index: int) -> str:
+    """Names the extra images of a batch: chart.png, chart_2.png, chart_3.png..."""
+    if index == 0:
+        return filename
+    stem, dot, extension = filename.rpartition('.')
+    return f'{stem}_{index + 1}.{extension}' if dot else f'{filename}_{index + 1}'
+
+
+async def _save_images(images: list, filename: str, tool_context: 'ToolContext') -> list:
+    saved = []
+    for index, image_bytes in enumerate(images):
+        name = _variant_filename(filename, index)
+        await tool_context.save_artifact(
+            f'user:{name}',
+            types.Part.from_bytes(data=image_bytes, mime_type='image/png'),
+        )
+        saved.append(name)
+    return saved
+
+
+async def generate_image(prompt: str, filename: str, tool_context: 'ToolContext', template_key: str = ''):
     """
     Generates an image based on the prompt and saves it with the specified filename.
     
     Args:
         prompt: The description of the image to generate.
         filename: The name of the file to save (e.g., 'cost_chart.png'). MUST end with .png.
+        template_key: Optional fixed name for a recurring brand visual; the image is then generated once and reused.
     """
-    print(f"--- Generating image: {filename} with prompt: {prompt[:50]}... ---")
+    logger.info(f"--- Generating image: {filename} with prompt: {prompt[:50]}... ---")
     
-    response = client.models.generate_images(
-        model='imagen-4.0-generate-001',
-        prompt=prompt,
-        config={'number_of_images': 1},
-    )
+    images = await image_service.generate(prompt, template_key=template_key or None)
     
-    if not response.generated_images:
+    if not images:
         return {'status': 'failed', 'reason': 'No images generated by the model.'}
     
-    image_bytes = response.generated_images[0].image.image_bytes
-    
     # Zapisujemy pod nazwą wybraną przez agenta
-    await tool_context.save_artifact(
-        f'user:{filename}',
-        types.Part.from_bytes(data=image_bytes, mime_type='image/png'),
-    )
+    await _save_images(images[:1], filename, tool_context)
     
     return {
         'status': 'success',
@@ -38,6 +61,81 @@ async def generate_image(prompt: str, filename: str, tool_context: 'ToolContext'
     }
 
 
+async def generate_images(prompts: list[str], filenames: list[str], tool_context: 'ToolContext', number_of_images: int = 1, template_keys: Optional[list[str]] = None):
+    """
+    Generates several images concurrently and saves each under its filename.
+    
+    Args:
+        prompts: The descriptions of the images to generate, one per asset.
+        filenames: The file names to save, in the same order as prompts (e.g., ['cost_chart.png']). MUST end with .png.
+        number_of_images: How many variants to generate per prompt (1-4). Extra variants are saved as name_2.png, name_3.png...
+        template_keys: Optional, in the same order as prompts: a fixed name for recurring brand visuals ('' for client-specific assets).
+    """
+    if len(prompts) != len(filenames):
+        return {'status': 'failed', 'reason': 'prompts and filenames must have the same length.'}
+
+    logger.info(f"--- Generating {len(prompts)} image(s) concurrently: {filenames} ---")
+    results = await image_service.generate_many(prompts, max(1, min(number_of_images, 4)), template_keys)
+
+    assets = []
+    for filename, result in zip(filenames, results):
+        if isinstance(result, Exception):
+            logger.error(f"❌ Image generation failed for {filename}: {result}")
+            assets.append({'filename': filename, 'status': 'failed', 'reason': str(result)})
+        elif not result:
+            assets.append({'filename': filename, 'status': 'failed', 'reason': 'No images generated by the model.'})
+        else:
+            saved = await _save_images(result, filename, tool_context)
+            assets.append({'filename': filename, 'status': 'success', 'files': saved})
+
+    succeeded = sum(asset['status'] == 'success' for asset in assets)
+    return {
+        'status': 'success' if succeeded == len(assets) else ('partial' if succeeded else 'failed'),
+        'detail': f'{succeeded}/{len(assets)} assets generated.',
+        'assets': assets,
+    }
+
+
+async def render_chart(
+    categories: list[str],
+    values: list[float],
+    tool_context: 'ToolContext',
+    filename: str = 'investment_breakdown.png',
+    title: str = 'Investment Breakdown',
+    chart_type: str = 'donut',
+    currency: str = '',
+):
+    """
+    Renders an accurate chart of real pricing figures locally (Comarch blue) and saves it as an image artifact.
+    
+    Args:
+        categories: Cost categories, e.g. ['Implementation', 'Licenses', 'Support'].
+        values: The amount for each category, in the same order as categories.
+        filename: The name of the file to save. MUST end with .png.
+        title: Chart title.
+        chart_type: 'donut' or 'bar' (stacked bar).
+        currency: Currency label for the figures (e.g. 'EUR').
+    """
+    if len(categories) != len(values) or not values:
+        return {'status': 'failed', 'reason': 'categories and values must be non-empty and of the same length.'}
+    if any(not math.isfinite(value) or value < 0 for value in values):
+        return {'status': 'failed', 'reason': 'values must be finite and not negative.'}
+    if sum(values) <= 0:
+        return {'status': 'failed', 'reason': 'values must have a positive total; there is nothing to chart.'}
+
+    logger.info(f"--- Rendering {chart_type} chart: {filename} ({len(values)} categories) ---")
+    image_bytes = await asyncio.to_thread(
+        render_chart_png, categories, [float(v) for v in values], title, chart_type, currency
+    )
+    await _save_images([image_bytes], filename, tool_context)
+
+    return {
+        'status': 'success',
+        'detail': f'Chart rendered locally and stored as {filename}.',
+        'filename': filename,
+    }
+
+
 instruction = """
 You are a **Creative Director & Data Visualization Expert** specializing in B2B sales proposals.
 
@@ -45,12 +143,12 @@ You are a **Creative Director & Data Visualization Expert** specializing in B2B
 You have access to the output from the `pricing_calculator` (Price tables, investment summaries, ROI estimates).
 
 **Your Task:**
-Your goal is to generate **two distinct visual assets** that make the pricing proposal persuasive and easy to understand. You must use the `generate_image` tool twice.
+Your goal is to produce **two distinct visual assets** that make the pricing proposal persuasive and easy to understand.
 
 **Asset 1: The "Investment Breakdown" (Analytical)**
 * **Goal:** Visualize the cost structure clearly so the client sees transparency.
-* **Content:** Based on the pricing figures, create a prompt for a **modern donut chart or stacked bar chart**.
-* **Prompt Requirements:** Request a clean, 3D isometric chart showing the split between 'Implementation', 'Licenses', and 'Support'. Use Comarch Corporate Blue (#1F3C88) and White.
+* **Content:** A **donut chart or stacked bar chart** of the real pricing figures, rendered locally with the `render_chart` tool (do NOT use Imagen for it: the numbers must be exact).
+* **Data Requirements:** Sum the pricing figures into categories such as 'Implementation', 'Licenses', and 'Support' and pass them as `categories` and `values` (with the `currency`). The tool uses Comarch Corporate Blue (#1F3C88) and White.
 * **Filename:** `investment_breakdown.png`
 
 **Asset 2: The "Value & ROI" Infographic (Persuasive)**
@@ -68,15 +166,19 @@ Your goal is to generate **two distinct visual assets** that make the pricing pr
 * **Text:** Keep text in the image minimal (e.g., just "$" symbols or "%"). The image generator handles text poorly, so focus on *visual metaphors* and *charts*.
 
 **Execution:**
-Call `generate_image` for Asset 1, then call it again for Asset 2.
+In the same turn, call both tools so they run in parallel:
+- `render_chart(categories=[...], values=[...], currency="...", filename="investment_breakdown.png")` for Asset 1.
+- `generate_image(prompt=<Asset 2 prompt>, filename="value_proposition.png")` for Asset 2.
+Only if Asset 2 is a generic brand visual that does not depend on this client's figures, pass a stable `template_key` (e.g. "comarch_value_generic") so it is reused from cache.
+Use `generate_images` only when several Imagen assets (or variants) are requested. Check the `status` of every result and retry only failed assets.
 """
 
 root_agent = Agent(
-    model='gemini-2.5-flash',
+    model=model_for('visual_generator'),
     name='visual_generator',
     description="Creative Director responsible for generating pricing charts and value infographics.",
     instruction=instruction,
-    tools=[generate_image], 
+    tools=[render_chart, generate_image, generate_images],
 )
 
 visual_generator_agent = root_agent
\ No newline at end of file
@@ -0,0 +1,66 @@
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+COMARCH_BLUE = '#1F3C88'
+# Comarch blue and progressively lighter tints of it, for chart segments.
+PALETTE = ['#1F3C88', '#3E5BA6', '#6A84C2', '#9DB0DA', '#C9D4EE', '#0F1F4A']
+CHART_DPI = 200
+
+
+def _label(value: float, currency: str) -> str:
+    return f"{value:,.0f} {currency}".strip()
+
+
+def render_chart_png(categories: list, values: list, title: str = 'Investment Breakdown',
+                     chart_type: str = 'donut', currency: str = '') -> bytes:
+    """
+    Renders a donut or stacked bar chart of real figures to PNG bytes with headless matplotlib.
+
+    CPU-bound; call it from a worker thread in async code. Raises ValueError unless the values have a positive total.
+    """
+    total = sum(values)
+    if not total > 0:
+        raise ValueError(f'Cannot chart values with a total of {total}')
+
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import FuncFormatter
+
+    colors = [PALETTE[i % len(PALETTE)] for i in range(len(values))]
+
+    # Figure (not pyplot) keeps rendering thread-safe and free of global state.
+    figure = Figure(figsize=(8, 5), dpi=CHART_DPI, facecolor='white')
+    axes = figure.add_subplot()
+
+    if chart_type == 'bar':
+        left = 0.0
+        for category, value, color in zip(categories, values, colors):
+            axes.barh([0], [value], left=left, color=color, edgecolor='white', height=0.5,
+                      label=f"{category}: {_label(value, currency)}")
+            if total and value / total > 0.08:
+                axes.text(left + value / 2, 0, f"{value / total:.0%}", ha='center', va='center', color='white', fontsize=11, fontweight='bold')
+            left += value
+        axes.set_yticks([])
+        axes.set_xlim(0, total or 1)
+        axes.xaxis.set_major_formatter(FuncFormatter(lambda x, _: _label(x, currency)))
+        for side in ('top', 'right', 'left'):
+            axes.spines[side].set_visible(False)
+        axes.legend(loc='upper center', bbox_to_anchor=(0.5, -0.15), ncol=min(3, len(values)), frameon=False)
+    else:
+        wedges, _ = axes.pie(values, colors=colors, startangle=90, counterclock=False,
+                             wedgeprops={'width': 0.38, 'edgecolor': 'white', 'linewidth': 2})
+        axes.text(0, 0.06, _label(total, currency), ha='center', va='center', fontsize=16, fontweight='bold', color=COMARCH_BLUE)
+        axes.text(0, -0.12, 'Total', ha='center', va='center', fontsize=10, color='#555555')
+        axes.legend(wedges, [f"{c}: {_label(v, currency)} ({v / total:.0%})" if total else c for c, v in zip(categories, values)],
+                    loc='center left', bbox_to_anchor=(1.0, 0.5), frameon=False)
+        axes.set_aspect('equal')
+
+    axes.set_title(title, color=COMARCH_BLUE, fontsize=16, fontweight='bold', loc='left')
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', facecolor='white', bbox_inches='tight')
+    return buffer.getvalue()
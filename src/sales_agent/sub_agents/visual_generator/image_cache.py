@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', '.cache/images')
+IMAGE_CACHE_MAX_MB = float(os.getenv('IMAGE_CACHE_MAX_MB', '512'))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Ignores case, whitespace and trailing punctuation differences between prompts."""
+    return re.sub(r'\s+', ' ', prompt or '').strip().rstrip('.!').casefold()
+
+
+class ImageCache:
+    """
+    Content-addressed on-disk store for generated images.
+
+    The key is a SHA-256 of the model name, the normalised prompt (or a fixed
+    template key) and the generation config. Files are evicted least recently
+    used first once the directory grows past `max_bytes`; a hit refreshes the
+    file's mtime.
+    """
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = int(IMAGE_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, prompt: str, config: dict, template_key: str = None) -> str:
+        """Template keys replace the prompt, so recurring brand visuals are generated once."""
+        subject = f'template:{template_key}' if template_key else f'prompt:{normalize_prompt(prompt)}'
+        payload = json.dumps([model, subject, config], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, index: int) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.{index}.png')
+
+    def get(self, key: str, count: int):
+        """Returns the list of `count` cached images, or None on a miss."""
+        images = []
+        for index in range(count):
+            path = self._path(key, index)
+            try:
+                with open(path, 'rb') as f:
+                    images.append(f.read())
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return images
+
+    def put(self, key: str, images: list) -> None:
+        for index, image_bytes in enumerate(images):
+            path = self._path(key, index)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+            with open(tmp_path, 'wb') as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith('.png'):
+                        path = os.path.join(root, name)
+                        stat = os.stat(path)
+                        files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                logger.info(f"Evicted cached image {os.path.basename(path)}")
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import time
+
+from ...resilience import resilience
+
+logger = logging.getLogger(__name__)
+
+IMAGEN_MODEL = 'imagen-4.0-generate-001'
+IMAGEN_MAX_CONCURRENCY = int(os.getenv('IMAGEN_MAX_CONCURRENCY', '4'))
+
+
+class ImageGenerationService:
+    """
+    Non-blocking Imagen front-end shared by every session in the process.
+
+    Uses the async genai client, so the event loop keeps serving other sessions
+    while images are generated. A semaphore bounds the number of concurrent
+    Imagen calls to stay within quota. When an ImageCache is given, it is
+    consulted before Imagen and filled after every successful call.
+    """
+
+    def __init__(self, client=None, model: str = IMAGEN_MODEL, max_concurrency: int = IMAGEN_MAX_CONCURRENCY, cache=None):
+        # Without a client, a genai Client is created on the first call (it reads credentials).
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._semaphores = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the event loop they are first used in.
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    async def generate(self, prompt: str, number_of_images: int = 1, template_key: str = None) -> list:
+        """Returns the PNG bytes of up to `number_of_images` images for one prompt."""
+        config = {'number_of_images': number_of_images}
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.model, prompt, config, template_key)
+            cached = await asyncio.to_thread(self.cache.get, key, number_of_images)
+            if cached:
+                logger.info(f"Image cache hit {key[:12]} ({self.cache.stats()})")
+                return cached
+
+        async def call():
+            async with self._semaphore():
+                started = time.perf_counter()
+                if self.client is None:
+                    from google.genai import Client
+                    self.client = Client()
+                response = await self.client.aio.models.generate_images(
+                    model=self.model,
+                    prompt=prompt,
+                    config=config,
+                )
+                logger.info(f"Imagen call took {time.perf_counter() - started:.2f}s ({number_of_images} image(s))")
+                return response
+
+        # Timeout, retries on 429/5xx and circuit breaking; a retry waits for the semaphore again.
+        response = await resilience.call('imagen', call, site='generate_images')
+        images = [generated.image.image_bytes for generated in response.generated_images or []]
+
+        if key and len(images) == number_of_images:
+            await asyncio.to_thread(self.cache.put, key, images)
+        return images
+
+    async def generate_many(self, prompts: list, number_of_images: int = 1, template_keys: list = None) -> list:
+        """Generates all prompts concurrently; returns bytes lists or exceptions, in order."""
+        template_keys = list(template_keys or []) + [None] * (len(prompts) - len(template_keys or []))
+        return await asyncio.gather(
+            *(self.generate(prompt, number_of_images, template_key or None) for prompt, template_key in zip(prompts, template_keys)),
+            return_exceptions=True,
+        )
@@ -0,0 +1,311 @@
+"""
+Per-agent tracing for the proposal pipeline.
+
+TracingPlugin opens a span for every agent invocation (including the sub-agents
+run through AgentTool, whose runners inherit the plugin) and for every tool
+call. Agent spans count LLM calls, input/output tokens, tool calls and
+retrievals; all spans carry the ID of the top-level session.
+
+Finished spans are kept in memory and, with TRACE_FILE set, appended as JSON
+lines so runs can be compared later:
+
+    python -m sales_agent.tracing summary traces.jsonl
+    python -m sales_agent.tracing prometheus traces.jsonl
+    python -m sales_agent.tracing otel traces.jsonl --output traces.otel.json
+"""
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '10000'))
+
+# Tools whose calls count as knowledge retrievals.
+RETRIEVAL_TOOLS = {'vertex_ai_search', 'discovery_engine_search', 'google_search', 'load_artifacts'}
+
+_current_span = ContextVar('sales_agent_current_span', default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str  # agent | tool
+    session_id: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: str = None
+    start: float = field(default_factory=time.time)
+    end: float = None
+    status: str = 'ok'
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def add(self, name: str, amount: int = 1) -> None:
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+
+class Tracer:
+    """Collects finished spans in a bounded buffer and optionally a JSONL file."""
+
+    def __init__(self, path: str = TRACE_FILE, buffer_size: int = TRACE_BUFFER_SIZE):
+        self.path = path
+        self.spans = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(asdict(span)) + '\n')
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self.spans)
+
+
+tracer = Tracer()
+
+
+def load_spans(paths: list) -> list:
+    spans = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            spans.extend(Span(**json.loads(line)) for line in f if line.strip())
+    return spans
+
+
+class TracingPlugin(BasePlugin):
+    """Records agent and tool spans through the ADK plugin callbacks."""
+
+    def __init__(self, tracer: Tracer = tracer, name: str = 'tracing'):
+        super().__init__(name=name)
+        self.tracer = tracer
+        self._agent_spans = {}
+        self._tool_spans = {}
+
+    def _agent_span(self, context) -> Span:
+        return self._agent_spans.get((context.invocation_id, context.agent_name))
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        parent = _current_span.get()
+        session_id = parent.session_id if parent else callback_context._invocation_context.session.id
+        span = Span(
+            name=agent.name,
+            kind='agent',
+            session_id=session_id,
+            trace_id=parent.trace_id if parent else hashlib.md5(session_id.encode()).hexdigest(),
+            parent_id=parent.span_id if parent else None,
+            attributes={'llm_calls': 0, 'input_tokens': 0, 'output_tokens': 0, 'tool_calls': 0, 'retrievals': 0},
+        )
+        self._agent_spans[(callback_context.invocation_id, agent.name)] = span
+        _current_span.set(span)
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        span = self._agent_spans.pop((callback_context.invocation_id, agent.name), None)
+        if span:
+            span.end = time.time()
+            self.tracer.record(span)
+            # Not ContextVar.reset: the callbacks may run in different contexts.
+            _current_span.set(next((s for s in self._agent_spans.values() if s.span_id == span.parent_id), None))
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        span = self._agent_span(callback_context)
+        if span is None or llm_response.partial:
+            return None
+        span.add('llm_calls')
+        usage = llm_response.usage_metadata
+        if usage:
+            span.add('input_tokens', usage.prompt_token_count or 0)
+            span.add('output_tokens', usage.candidates_token_count or 0)
+        grounding = llm_response.grounding_metadata
+        if grounding and grounding.web_search_queries:
+            span.add('retrievals', len(grounding.web_search_queries))
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        span = self._agent_span(callback_context)
+        if span:
+            span.status = 'error'
+            span.add('model_errors')
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        agent_span = self._agent_span(tool_context)
+        if agent_span is None:
+            return None
+        agent_span.add('tool_calls')
+        if tool.name in RETRIEVAL_TOOLS:
+            agent_span.add('retrievals')
+        self._tool_spans[(tool_context.function_call_id, tool.name)] = Span(
+            name=tool.name,
+            kind='tool',
+            session_id=agent_span.session_id,
+            trace_id=agent_span.trace_id,
+            parent_id=agent_span.span_id,
+            attributes={'agent': agent_span.name},
+        )
+        return None
+
+    def _finish_tool(self, tool, tool_context, status: str) -> None:
+        span = self._tool_spans.pop((tool_context.function_call_id, tool.name), None)
+        if span:
+            span.end = time.time()
+            span.status = status
+            self.tracer.record(span)
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        failed = isinstance(result, dict) and result.get('status') in ('failed', 'error')
+        self._finish_tool(tool, tool_context, 'error' if failed else 'ok')
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        self._finish_tool(tool, tool_context, 'error')
+        return None
+
+
+def summarize(spans: list) -> dict:
+    """p50/p95 wall time and mean tokens/tool calls per agent across runs."""
+    import numpy as np
+
+    by_name = defaultdict(list)
+    for span in spans:
+        if span.kind == 'agent' and span.end:
+            by_name[span.name].append(span)
+    summary = {}
+    for name, group in sorted(by_name.items()):
+        durations = np.array([span.duration for span in group])
+        summary[name] = {
+            'runs': len(group),
+            'p50_s': round(float(np.percentile(durations, 50)), 3),
+            'p95_s': round(float(np.percentile(durations, 95)), 3),
+            'mean_input_tokens': round(float(np.mean([span.attributes.get('input_tokens', 0) for span in group])), 1),
+            'mean_output_tokens': round(float(np.mean([span.attributes.get('output_tokens', 0) for span in group])), 1),
+            'mean_tool_calls': round(float(np.mean([span.attributes.get('tool_calls', 0) for span in group])), 2),
+            'mean_retrievals': round(float(np.mean([span.attributes.get('retrievals', 0) for span in group])), 2),
+        }
+    return summary
+
+
+def to_prometheus(spans: list) -> str:
+    """Renders spans as Prometheus text exposition format."""
+    duration_count, duration_sum = defaultdict(int), defaultdict(float)
+    counters = defaultdict(int)
+    tool_calls = defaultdict(int)
+    for span in spans:
+        if not span.end:
+            continue
+        if span.kind == 'agent':
+            duration_count[span.name] += 1
+            duration_sum[span.name] += span.duration
+            for attribute in ('llm_calls', 'input_tokens', 'output_tokens', 'retrievals'):
+                counters[(attribute, span.name)] += span.attributes.get(attribute, 0)
+        else:
+            tool_calls[(span.attributes.get('agent', ''), span.name, span.status)] += 1
+
+    lines = [
+        '# HELP sales_agent_phase_duration_seconds Wall time of agent invocations.',
+        '# TYPE sales_agent_phase_duration_seconds summary',
+    ]
+    for name in sorted(duration_count):
+        lines.append(f'sales_agent_phase_duration_seconds_count{{agent="{name}"}} {duration_count[name]}')
+        lines.append(f'sales_agent_phase_duration_seconds_sum{{agent="{name}"}} {duration_sum[name]:.6f}')
+    for attribute, help_text in (
+        ('llm_calls', 'LLM calls.'),
+        ('input_tokens', 'LLM input tokens.'),
+        ('output_tokens', 'LLM output tokens.'),
+        ('retrievals', 'Knowledge base and web searches.'),
+    ):
+        lines += [f'# HELP sales_agent_{attribute}_total {help_text}', f'# TYPE sales_agent_{attribute}_total counter']
+        for (counter, name), value in sorted(counters.items()):
+            if counter == attribute:
+                lines.append(f'sales_agent_{attribute}_total{{agent="{name}"}} {value}')
+    lines += ['# HELP sales_agent_tool_calls_total Tool calls.', '# TYPE sales_agent_tool_calls_total counter']
+    for (agent, tool, status), value in sorted(tool_calls.items()):
+        lines.append(f'sales_agent_tool_calls_total{{agent="{agent}",tool="{tool}",status="{status}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _otel_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otel_json(spans: list, service_name: str = 'sales_agent') -> dict:
+    """Renders spans in the OpenTelemetry OTLP/JSON trace format."""
+    otel_spans = []
+    for span in spans:
+        attributes = {'session.id': span.session_id, 'span.kind': span.kind, **span.attributes}
+        otel_spans.append({
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'parentSpanId': span.parent_id or '',
+            'name': f'{span.kind} {span.name}',
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(int(span.start * 1e9)),
+            'endTimeUnixNano': str(int((span.end or span.start) * 1e9)),
+            'attributes': [{'key': key, 'value': _otel_value(value)} for key, value in attributes.items()],
+            'status': {'code': 2 if span.status == 'error' else 1},
+        })
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'sales_agent.tracing'}, 'spans': otel_spans}],
+        }]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise and export proposal pipeline traces.")
+    parser.add_argument('command', choices=['summary', 'prometheus', 'otel'])
+    parser.add_argument('traces', nargs='+', help="JSONL trace files written with TRACE_FILE.")
+    parser.add_argument('--output', help="Write to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    spans = load_spans(args.traces)
+    if args.command == 'summary':
+        rows = summarize(spans)
+        text = f"{'agent':<32} {'runs':>5} {'p50_s':>8} {'p95_s':>8} {'in_tok':>9} {'out_tok':>9} {'tools':>6} {'search':>6}\n"
+        for name, row in rows.items():
+            text += (
+                f"{name:<32} {row['runs']:>5} {row['p50_s']:>8.2f} {row['p95_s']:>8.2f} "
+                f"{row['mean_input_tokens']:>9.0f} {row['mean_output_tokens']:>9.0f} "
+                f"{row['mean_tool_calls']:>6.1f} {row['mean_retrievals']:>6.1f}\n"
+            )
+    elif args.command == 'prometheus':
+        text = to_prometheus(spans)
+    else:
+        text = json.dumps(to_otel_json(spans), indent=2)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == '__main__':
+    main()